@@ -1,9 +1,13 @@
+import asyncio
+import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor, TimeoutError, as_completed
 from dataclasses import dataclass, field
 from enum import Enum, unique
+from functools import partial
 from logging import Logger
-from typing import Any, Dict, List, Optional
+from types import TracebackType
+from typing import Any, Callable, Dict, List, Optional, Type, TypeVar
 
 from botocore.exceptions import ClientError
 from mypy_boto3_athena.client import AthenaClient as AthenaSdkClient
@@ -11,6 +15,8 @@ from typing_extensions import TypeAlias
 
 AthenaQueryResult: TypeAlias = List[Dict[str, Any]]
 
+T = TypeVar("T")
+
 
 class QueryExecutionFailed(Exception):
     pass
@@ -28,6 +34,13 @@ class AthenaQueryStatus(Enum):
         return str(self.value)
 
 
+FINISHED_STATES = [
+    str(AthenaQueryStatus.SUCCEEDED),
+    str(AthenaQueryStatus.FAILED),
+    str(AthenaQueryStatus.CANCELLED),
+]
+
+
 @dataclass(frozen=True)
 class AthenaClientConfig:
     s3_output_location: str
@@ -55,6 +68,143 @@ class AthenaQuery:
         return self.status == AthenaQueryStatus.SUCCEEDED
 
 
+class QueryStatusPoller:
+    """
+    Checks the state of all outstanding queries with one `batch_get_query_execution` call per
+    `BATCH_SIZE` queries on every tick, instead of a `get_query_execution` call per query. Callers
+    get a future which resolves with the query execution once the query has finished.
+
+    The polling thread starts with the first outstanding query and stops when none are left.
+    Throttled calls and other transient errors keep the queries outstanding, and the delay between
+    ticks doubles up to `MAXIMUM_DELAY` until a tick goes through. Only a permanent error fails them.
+    """
+
+    BATCH_SIZE = 50  # the maximum number of ids accepted by `batch_get_query_execution`
+    MAXIMUM_DELAY = 5.0  # seconds
+    TRANSIENT_ERROR_CODES = ["ThrottlingException", "TooManyRequestsException", "InternalServerException"]
+
+    def __init__(self, sdk: AthenaSdkClient, logger: Logger, delay: float) -> None:
+        self._sdk = sdk
+        self._logger = logger
+        self._delay = delay
+        self._pending: Dict[str, "Future[Dict[str, Any]]"] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, query_execution_id: str) -> "Future[Dict[str, Any]]":
+        with self._lock:
+            future = self._pending.setdefault(query_execution_id, Future())
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="athena-poller", daemon=True)
+                self._thread.start()
+
+        return future
+
+    def cancel(self, query_execution_id: str) -> None:
+        with self._lock:
+            future = self._pending.pop(query_execution_id, None)
+
+        if future is not None:
+            future.cancel()
+
+    def _run(self) -> None:
+        delay = self._delay
+        try:
+            while True:
+                with self._lock:
+                    query_execution_ids = list(self._pending)
+                    if not query_execution_ids:
+                        self._thread = None
+                        return
+
+                try:
+                    polled = all(
+                        [
+                            self._poll(query_execution_ids[start : start + self.BATCH_SIZE])
+                            for start in range(0, len(query_execution_ids), self.BATCH_SIZE)
+                        ]
+                    )
+                except Exception as error:
+                    self._logger.exception("Could not check the state of queries. Error = %s", str(error))
+                    polled = False
+
+                delay = self._delay if polled else min(delay * 2, self.MAXIMUM_DELAY)
+                time.sleep(delay)
+        finally:
+            with self._lock:
+                if self._thread is threading.current_thread():
+                    # the next `submit` starts a new thread
+                    self._thread = None
+
+    def _poll(self, query_execution_ids: List[str]) -> bool:
+        """
+        Returns False when the queries could not be checked this time and stay outstanding.
+        """
+        try:
+            response = self._sdk.batch_get_query_execution(QueryExecutionIds=query_execution_ids)
+        except ClientError as error:
+            if error.response.get("Error", {}).get("Code") in self.TRANSIENT_ERROR_CODES:
+                self._logger.warning("Checking the state of queries has been throttled. Error = %s", str(error))
+                return False
+
+            self._logger.error(
+                "An unexpected error occurred. Error = %s",
+                str(error),
+            )
+            for query_execution_id in query_execution_ids:
+                self._fail(query_execution_id, "An unexpected error occurred during query execution", error)
+            return True
+        except Exception as error:
+            # e.g. a dropped connection, the next tick tries again
+            self._logger.warning("Could not check the state of queries. Error = %s", str(error))
+            return False
+
+        for query_execution in response["QueryExecutions"]:
+            if query_execution["Status"]["State"] in FINISHED_STATES:
+                future = self._pop(query_execution["QueryExecutionId"])
+                if future is not None:
+                    try:
+                        future.set_result(dict(query_execution))
+                    except InvalidStateError:
+                        # cancelled by a caller which stopped waiting in the meantime
+                        pass
+
+        polled = True
+        for unprocessed in response.get("UnprocessedQueryExecutionIds", []):
+            if unprocessed.get("ErrorCode") in self.TRANSIENT_ERROR_CODES:
+                # stays outstanding, checked again on the next tick
+                polled = False
+                continue
+
+            self._logger.error(
+                "Could not check the state of query `%s`. Error = %s",
+                unprocessed.get("QueryExecutionId"),
+                unprocessed.get("ErrorMessage"),
+            )
+            self._fail(
+                unprocessed.get("QueryExecutionId", ""),
+                f"Could not check the state of query `{unprocessed.get('QueryExecutionId')}`",
+            )
+
+        return polled
+
+    def _fail(self, query_execution_id: str, message: str, cause: Optional[Exception] = None) -> None:
+        future = self._pop(query_execution_id)
+        if future is None:
+            return
+
+        error = QueryExecutionFailed(message)
+        error.__cause__ = cause
+        try:
+            future.set_exception(error)
+        except InvalidStateError:
+            pass
+
+    def _pop(self, query_execution_id: str) -> "Optional[Future[Dict[str, Any]]]":
+        with self._lock:
+            return self._pending.pop(query_execution_id, None)
+
+
 class AthenaClient:
     def __init__(
         self,
@@ -65,6 +215,7 @@ class AthenaClient:
         self._sdk = sdk
         self._config = config
         self._logger = logger
+        self._poller = QueryStatusPoller(sdk, logger, config.query_waiting_delay)
 
     def execute(self, query: AthenaQuery) -> None:
         self._logger.info(
@@ -101,6 +252,14 @@ class AthenaClient:
                     query.status = AthenaQueryStatus.SUCCEEDED
 
     def _execute(self, sql_statement: str, database_name: str) -> AthenaQueryResult:
+        query_execution_id = self.start_query(sql_statement, database_name)
+        state = self._wait_for_query_results(query_execution_id)
+        return self.fetch_results(query_execution_id, state, is_describe_query="DESCRIBE" in sql_statement)
+
+    def start_query(self, sql_statement: str, database_name: str) -> str:
+        """
+        Starts the query without waiting for it and returns its execution id.
+        """
         response = self._sdk.start_query_execution(
             QueryString=sql_statement,
             QueryExecutionContext={"Database": database_name},
@@ -108,51 +267,42 @@ class AthenaClient:
         )
         query_execution_id = response["QueryExecutionId"]
         self._logger.info("query_execution_id = `%s`", query_execution_id)
-        self._wait_for_query_results(query_execution_id)
-        return self._get_query_results(query_execution_id, is_describe_query="DESCRIBE" in sql_statement)
+        return query_execution_id
 
-    def _wait_for_query_results(self, query_execution_id: str) -> None:
+    def wait_for(self, query_execution_id: str) -> "Future[Dict[str, Any]]":
+        """
+        Returns a future which resolves with the query execution once the query has finished.
+        """
+        return self._poller.submit(query_execution_id)
+
+    def stop_waiting(self, query_execution_id: str) -> None:
+        """
+        Stops polling the query, e.g. after a timeout, and cancels the future returned by `wait_for`.
+        """
+        self._poller.cancel(query_execution_id)
+
+    def _wait_for_query_results(self, query_execution_id: str) -> str:
         self._logger.info("Waiting for query_execution_id = `%s` to finish", query_execution_id)
 
-        start_time = time.time()
-        while True:
-            try:
-                response = self._sdk.get_query_execution(QueryExecutionId=query_execution_id)
-                state = response["QueryExecution"]["Status"]["State"]
-                valid_statuses = [
-                    str(AthenaQueryStatus.SUCCEEDED),
-                    str(AthenaQueryStatus.FAILED),
-                    str(AthenaQueryStatus.CANCELLED),
-                ]
-                if state in valid_statuses:
-                    return
-
-                if time.time() - start_time > self._config.timeout:
-                    self._logger.error(
-                        "Query `%s` execution reached out the maximum timeout value (%s).",
-                        query_execution_id,
-                        f"{self._config.timeout}s",
-                    )
-                    raise QueryExecutionFailed(f"Query `{query_execution_id}` execution timeout has been reached")
+        try:
+            query_execution = self.wait_for(query_execution_id).result(timeout=self._config.timeout)
+        except TimeoutError:
+            self.stop_waiting(query_execution_id)
+            self._logger.error(
+                "Query `%s` execution reached out the maximum timeout value (%s).",
+                query_execution_id,
+                f"{self._config.timeout}s",
+            )
+            raise QueryExecutionFailed(f"Query `{query_execution_id}` execution timeout has been reached")
 
-                self._logger.info(
-                    "Waiting %s before next check on query status.",
-                    f"{self._config.query_waiting_delay}s",
-                )
-                time.sleep(self._config.query_waiting_delay)
-            except ClientError as error:
-                self._logger.error(
-                    "An unexpected error occurred. Error = %s",
-                    str(error),
-                )
-                raise QueryExecutionFailed("An unexpected error occurred during query execution") from error
+        return str(query_execution["Status"]["State"])
 
-    def _get_query_results(self, query_execution_id: str, is_describe_query: bool = False) -> AthenaQueryResult:
+    def fetch_results(self, query_execution_id: str, state: str, is_describe_query: bool = False) -> AthenaQueryResult:
+        """
+        Reads the results of a finished query, `state` is the one it has finished with.
+        """
         try:
             self._logger.info("Getting query results for %s", query_execution_id)
-            response = self._sdk.get_query_execution(QueryExecutionId=query_execution_id)
-            state = response["QueryExecution"]["Status"]["State"]
-
             if state != str(AthenaQueryStatus.SUCCEEDED):
                 self._logger.info(
                     "Query `%s` has finished with a state = %s",
@@ -200,3 +350,102 @@ class AthenaClient:
                 str(error),
             )
             raise QueryExecutionFailed("An unexpected error occurred during query execution") from error
+
+
+class AsyncAthenaClient:
+    """
+    Runs queries from a single event loop. Waiting for a query is a coroutine awaiting the shared
+    `QueryStatusPoller`, so any number of queries is polled without a thread per query. The blocking
+    SDK calls run on a small executor of `maximum_workers_number` threads.
+
+    Usage:
+        async with AsyncAthenaClient(sdk, config, logger) as client:
+            await client.execute_many(query_a, query_b)
+    """
+
+    DEFAULT_MAXIMUM_WORKERS_NUMBER = 4
+
+    def __init__(
+        self,
+        sdk: AthenaSdkClient,
+        config: AthenaClientConfig,
+        logger: Logger,
+    ) -> None:
+        # reuses the blocking calls and the parsing of results
+        self._client = AthenaClient(sdk, config, logger)
+        self._config = config
+        self._logger = logger
+        self._executor = ThreadPoolExecutor(
+            max_workers=config.maximum_workers_number or self.DEFAULT_MAXIMUM_WORKERS_NUMBER,
+            thread_name_prefix="athena",
+        )
+
+    async def __aenter__(self) -> "AsyncAthenaClient":
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_val: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    async def execute(self, query: AthenaQuery) -> None:
+        self._logger.info(
+            "Running query `%s` on `%s`",
+            query.sql_statement,
+            query.database_name,
+        )
+        try:
+            query.result = await self._execute(query.sql_statement, query.database_name)
+            query.status = AthenaQueryStatus.SUCCEEDED
+        except QueryExecutionFailed:
+            query.status = AthenaQueryStatus.FAILED
+
+    async def execute_many(self, *queries: AthenaQuery) -> None:
+        self._logger.info(
+            "Running `%s` queries concurrently",
+            len(queries),
+        )
+
+        results = await asyncio.gather(
+            *(self._execute(query.sql_statement, query.database_name) for query in queries),
+            return_exceptions=True,
+        )
+        for query, result in zip(queries, results):
+            if isinstance(result, BaseException):
+                query.status = AthenaQueryStatus.FAILED
+            else:
+                query.result = result
+                query.status = AthenaQueryStatus.SUCCEEDED
+
+    async def _execute(self, sql_statement: str, database_name: str) -> AthenaQueryResult:
+        query_execution_id = await self._run(self._client.start_query, sql_statement, database_name)
+        state = await self._wait_for_query_results(query_execution_id)
+        return await self._run(self._client.fetch_results, query_execution_id, state, "DESCRIBE" in sql_statement)
+
+    async def _wait_for_query_results(self, query_execution_id: str) -> str:
+        self._logger.info("Waiting for query_execution_id = `%s` to finish", query_execution_id)
+
+        try:
+            query_execution = await asyncio.wait_for(
+                asyncio.wrap_future(self._client.wait_for(query_execution_id)),
+                timeout=self._config.timeout,
+            )
+        except asyncio.TimeoutError:
+            self._client.stop_waiting(query_execution_id)
+            self._logger.error(
+                "Query `%s` execution reached out the maximum timeout value (%s).",
+                query_execution_id,
+                f"{self._config.timeout}s",
+            )
+            raise QueryExecutionFailed(f"Query `{query_execution_id}` execution timeout has been reached")
+
+        return str(query_execution["Status"]["State"])
+
+    async def _run(self, function: Callable[..., T], *args: Any) -> T:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(function, *args))
@@ -0,0 +1,93 @@
+import asyncio
+import threading
+from logging import Logger
+from typing import Callable
+
+from mypy_boto3_athena.client import AthenaClient as AthenaSdkClient
+
+from src.athena.athena_client import AsyncAthenaClient, AthenaClientConfig, AthenaQuery
+
+
+def _executor_threads() -> int:
+    return len([thread for thread in threading.enumerate() if thread.name.startswith("athena_")])
+
+
+async def _execute_many(client: AsyncAthenaClient, *queries: AthenaQuery) -> int:
+    async with client:
+        await client.execute_many(*queries)
+        return _executor_threads()
+
+
+def test_can_execute_query(
+    athena_sdk: AthenaSdkClient, test_logger: Logger, add_data_to_athena: Callable[[str], None]
+) -> None:
+    # given
+    add_data_to_athena("example_athena_response.json")
+    client = AsyncAthenaClient(
+        sdk=athena_sdk,
+        config=AthenaClientConfig(
+            s3_output_location="s3://my-bucket/query-results",
+        ),
+        logger=test_logger,
+    )
+    query = AthenaQuery(database_name="dummy_database", sql_statement="select * from my_dummy_table;")
+
+    # when
+    try:
+        asyncio.run(client.execute(query))
+    finally:
+        client.close()
+
+    # then
+    assert query.is_successful
+    assert len(query.result) == 4
+
+
+def test_can_execute_multiple_queries(
+    athena_sdk: AthenaSdkClient, test_logger: Logger, add_data_to_athena: Callable[[str], None]
+) -> None:
+    # given
+    add_data_to_athena("example_athena_response.json")
+    client = AsyncAthenaClient(
+        sdk=athena_sdk,
+        config=AthenaClientConfig(
+            s3_output_location="s3://my-bucket/query-results",
+        ),
+        logger=test_logger,
+    )
+    query_a = AthenaQuery(database_name="dummy_database", sql_statement="select * from my_dummy_table;")
+    query_b = AthenaQuery(database_name="dummy_database", sql_statement="select * from my_dummy_table;")
+
+    # when
+    asyncio.run(_execute_many(client, query_a, query_b))
+
+    # then
+    assert query_a.is_successful
+    assert query_b.is_successful
+
+
+def test_threads_do_not_grow_with_the_number_of_queries(
+    athena_sdk: AthenaSdkClient, test_logger: Logger, add_data_to_athena: Callable[[str], None]
+) -> None:
+    # given
+    add_data_to_athena("example_athena_response.json")
+    config = AthenaClientConfig(s3_output_location="s3://my-bucket/query-results", maximum_workers_number=2)
+    threads_before = _executor_threads()
+
+    # when
+    threads_per_run = {
+        count: asyncio.run(
+            _execute_many(
+                AsyncAthenaClient(sdk=athena_sdk, config=config, logger=test_logger),
+                *(
+                    AthenaQuery(database_name="dummy_database", sql_statement="select * from my_dummy_table;")
+                    for _ in range(count)
+                ),
+            )
+        )
+        for count in (2, 20)
+    }
+
+    # then
+    assert all(threads <= threads_before + 2 for threads in threads_per_run.values())
+    assert _executor_threads() == threads_before
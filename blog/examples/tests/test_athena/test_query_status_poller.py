@@ -0,0 +1,120 @@
+import logging
+import threading
+from typing import Any, Dict, List
+from unittest.mock import Mock
+
+import pytest
+from botocore.exceptions import ClientError
+
+from src.athena.athena_client import QueryExecutionFailed, QueryStatusPoller
+
+
+def _batch_response(query_execution_ids: List[str], state: str) -> Dict[str, Any]:
+    return {
+        "QueryExecutions": [
+            {"QueryExecutionId": query_execution_id, "Status": {"State": state}}
+            for query_execution_id in query_execution_ids
+        ],
+        "UnprocessedQueryExecutionIds": [],
+    }
+
+
+def test_polls_outstanding_queries_in_batches() -> None:
+    # given
+    polling, submitted = threading.Event(), threading.Event()
+
+    def batch_get_query_execution(QueryExecutionIds: List[str]) -> Dict[str, Any]:
+        if not polling.is_set():
+            # holds the first tick until all queries are submitted
+            polling.set()
+            submitted.wait(timeout=5)
+            return _batch_response(QueryExecutionIds, "RUNNING")
+        return _batch_response(QueryExecutionIds, "SUCCEEDED")
+
+    sdk = Mock()
+    sdk.batch_get_query_execution.side_effect = batch_get_query_execution
+    poller = QueryStatusPoller(sdk, logging.getLogger("test_logger"), delay=0.01)
+
+    # when
+    futures = [poller.submit("0")]
+    polling.wait(timeout=5)
+    futures.extend(poller.submit(str(index)) for index in range(1, 60))
+    submitted.set()
+
+    # then
+    assert all(future.result(timeout=5)["Status"]["State"] == "SUCCEEDED" for future in futures)
+    assert [len(call.kwargs["QueryExecutionIds"]) for call in sdk.batch_get_query_execution.call_args_list] == [
+        1,
+        50,
+        10,
+    ]
+    sdk.get_query_execution.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        ConnectionError("Connection reset by peer"),
+        ClientError({"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}}, "BatchGetQueryExecution"),
+    ],
+)
+def test_query_stays_outstanding_after_transient_error(error: Exception) -> None:
+    # given
+    sdk = Mock()
+    sdk.batch_get_query_execution.side_effect = [error, _batch_response(["1"], "SUCCEEDED")]
+    poller = QueryStatusPoller(sdk, logging.getLogger("test_logger"), delay=0.01)
+
+    # when
+    future = poller.submit("1")
+
+    # then
+    assert future.result(timeout=5)["Status"]["State"] == "SUCCEEDED"
+    assert sdk.batch_get_query_execution.call_count == 2
+
+
+def test_polling_goes_on_after_unexpected_response() -> None:
+    # given
+    sdk = Mock()
+    sdk.batch_get_query_execution.side_effect = [{}, _batch_response(["1"], "SUCCEEDED")]
+    poller = QueryStatusPoller(sdk, logging.getLogger("test_logger"), delay=0.01)
+
+    # when
+    future = poller.submit("1")
+
+    # then
+    assert future.result(timeout=5)["Status"]["State"] == "SUCCEEDED"
+
+
+def test_permanent_error_fails_queries() -> None:
+    # given
+    sdk = Mock()
+    sdk.batch_get_query_execution.side_effect = ClientError(
+        {"Error": {"Code": "AccessDeniedException", "Message": "Not authorized"}}, "BatchGetQueryExecution"
+    )
+    poller = QueryStatusPoller(sdk, logging.getLogger("test_logger"), delay=0.01)
+
+    # when
+    future = poller.submit("1")
+
+    # then
+    with pytest.raises(QueryExecutionFailed):
+        future.result(timeout=5)
+
+
+def test_unprocessed_query_fails() -> None:
+    # given
+    sdk = Mock()
+    sdk.batch_get_query_execution.return_value = {
+        "QueryExecutions": [],
+        "UnprocessedQueryExecutionIds": [
+            {"QueryExecutionId": "1", "ErrorCode": "InvalidRequestException", "ErrorMessage": "Unknown id"}
+        ],
+    }
+    poller = QueryStatusPoller(sdk, logging.getLogger("test_logger"), delay=0.01)
+
+    # when
+    future = poller.submit("1")
+
+    # then
+    with pytest.raises(QueryExecutionFailed):
+        future.result(timeout=5)
@@ -0,0 +1,184 @@
+import json
+import logging
+import platform
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import paramiko
+import typer
+from paramiko import AutoAddPolicy, SSHClient
+
+from benchmarks.sftp_server import PASSWORD, USERNAME, LocalSFTPServer
+from benchmarks.synthetic_sites import SITES
+from szymonmiks_deployment.archive_deployer import ArchiveDeployer
+from szymonmiks_deployment.config import FTPConfig, TransferConfig
+from szymonmiks_deployment.deployment_manager import DeploymentManager, DeploymentStrategy
+from szymonmiks_deployment.file_collector import BlogFileCollector
+from szymonmiks_deployment.ftp_client import ParamikoFTPClient
+
+REGRESSION_THRESHOLD = 0.1
+
+
+@dataclass(frozen=True)
+class BenchmarkResult:
+    site: str
+    strategy: str
+    files: int
+    bytes: int
+    seconds: float
+    files_per_second: float
+    mb_per_second: float
+
+
+def _deploy(
+    site_dir: Path,
+    remote_dir: Path,
+    port: int,
+    workers: int,
+    incremental: bool = False,
+    strategy: DeploymentStrategy = DeploymentStrategy.PER_FILE,
+    high_throughput: bool = False,
+) -> None:
+    ssh_client = SSHClient()
+    ssh_client.set_missing_host_key_policy(AutoAddPolicy())
+    config = FTPConfig(
+        host="127.0.0.1",
+        username=USERNAME,
+        password=PASSWORD,
+        path=str(remote_dir),
+        port=port,
+        transfer=TransferConfig(high_throughput=high_throughput),
+    )
+
+    ftp_client = ParamikoFTPClient(ssh_client, config, channels=workers)
+    archive_deployer = ArchiveDeployer(ftp_client, config.path)
+    manager = DeploymentManager(
+        ftp_client, BlogFileCollector(site_dir), workers=workers, archive_deployer=archive_deployer
+    )
+    manager.deploy(incremental=incremental, strategy=strategy)
+    ssh_client.close()
+
+
+def _per_file(site_dir: Path, remote_dir: Path, port: int) -> None:
+    _deploy(site_dir, remote_dir, port, workers=1)
+
+
+def _parallel(site_dir: Path, remote_dir: Path, port: int) -> None:
+    _deploy(site_dir, remote_dir, port, workers=4)
+
+
+def _pipelined(site_dir: Path, remote_dir: Path, port: int) -> None:
+    _deploy(site_dir, remote_dir, port, workers=1, high_throughput=True)
+
+
+def _archive(site_dir: Path, remote_dir: Path, port: int) -> None:
+    _deploy(site_dir, remote_dir, port, workers=1, strategy=DeploymentStrategy.ARCHIVE)
+
+
+def _incremental_without_changes(site_dir: Path, remote_dir: Path, port: int) -> None:
+    _deploy(site_dir, remote_dir, port, workers=4, incremental=True)
+
+
+# every strategy is measured against an empty remote, except the ones listed in WARM_STRATEGIES
+STRATEGIES: Dict[str, Callable[[Path, Path, int], None]] = {
+    "per-file": _per_file,
+    "parallel-4": _parallel,
+    "pipelined": _pipelined,
+    "archive": _archive,
+    "incremental-no-changes": _incremental_without_changes,
+}
+WARM_STRATEGIES = {"incremental-no-changes"}
+
+
+def _measure(site: str, strategy: str, work_dir: Path, server: LocalSFTPServer) -> BenchmarkResult:
+    site_dir = work_dir / site / "public"
+    if not site_dir.exists():
+        SITES[site](site_dir)
+
+    remote_dir = work_dir / "remote" / f"{site}-{strategy}"
+    remote_dir.mkdir(parents=True)
+
+    if strategy in WARM_STRATEGIES:
+        _incremental_without_changes(site_dir, remote_dir, server.port)
+
+    files = [path for path in site_dir.rglob("*") if path.is_file()]
+    total_bytes = sum(path.stat().st_size for path in files)
+
+    start = time.perf_counter()
+    STRATEGIES[strategy](site_dir, remote_dir, server.port)
+    seconds = time.perf_counter() - start
+
+    return BenchmarkResult(
+        site=site,
+        strategy=strategy,
+        files=len(files),
+        bytes=total_bytes,
+        seconds=round(seconds, 3),
+        files_per_second=round(len(files) / seconds, 1),
+        mb_per_second=round(total_bytes / seconds / 1024 / 1024, 2),
+    )
+
+
+def _compare(results: List[BenchmarkResult], baseline_path: Path) -> bool:
+    baseline = {(r["site"], r["strategy"]): r for r in json.loads(baseline_path.read_text())["results"]}
+    regressed = False
+
+    for result in results:
+        previous = baseline.get((result.site, result.strategy))
+        if not previous:
+            continue
+
+        change = result.seconds / previous["seconds"] - 1
+        marker = ""
+        if change > REGRESSION_THRESHOLD:
+            marker = "  <-- REGRESSION"
+            regressed = True
+        typer.echo(f"{result.site:<18} {result.strategy:<24} {previous['seconds']:>8}s -> {result.seconds:>8}s{marker}")
+
+    return regressed
+
+
+def main(
+    output: Path = typer.Option(Path("benchmark-results.json"), help="Where to write the JSON results"),
+    baseline: Optional[Path] = typer.Option(None, help="Results of a previous run to compare against"),
+    site: List[str] = typer.Option(list(SITES), help="Synthetic sites to deploy"),
+    strategy: List[str] = typer.Option(list(STRATEGIES), help="Deploy strategies to measure"),
+    latency_ms: float = typer.Option(0.0, help="Simulated server latency added to every SFTP request"),
+) -> None:
+    logging.disable(logging.INFO)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir, LocalSFTPServer(latency=latency_ms / 1000) as server:
+        for site_name in site:
+            for strategy_name in strategy:
+                result = _measure(site_name, strategy_name, Path(tmp_dir), server)
+                typer.echo(
+                    f"{result.site:<18} {result.strategy:<24} {result.seconds:>8}s "
+                    f"{result.files_per_second:>9} files/s {result.mb_per_second:>8} MB/s"
+                )
+                results.append(result)
+
+    output.write_text(
+        json.dumps(
+            {
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "paramiko": paramiko.__version__,
+                "latency_ms": latency_ms,
+                "results": [asdict(result) for result in results],
+            },
+            indent=2,
+        )
+    )
+    typer.echo(f"Results written to {output}")
+
+    if baseline and _compare(results, baseline):
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,221 @@
+import os
+import socket
+import subprocess
+import threading
+import time
+from types import TracebackType
+from typing import Any, List, Optional, Type, Union
+
+from paramiko import (
+    AUTH_FAILED,
+    AUTH_SUCCESSFUL,
+    OPEN_SUCCEEDED,
+    RSAKey,
+    ServerInterface,
+    SFTPAttributes,
+    SFTPHandle,
+    SFTPServer,
+    SFTPServerInterface,
+    Transport,
+)
+from paramiko.sftp import SFTP_OK
+
+USERNAME = "benchmark"
+PASSWORD = "benchmark"
+
+
+def _to_sftp_error(error: OSError) -> int:
+    return SFTPServer.convert_errno(error.errno)
+
+
+class _LocalSFTPHandle(SFTPHandle):
+    def __init__(self, file: Any, flags: int = 0) -> None:
+        super().__init__(flags)
+        self.readfile = file
+        self.writefile = file
+
+    def stat(self) -> Union[SFTPAttributes, int]:
+        try:
+            return SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+        except OSError as error:
+            return _to_sftp_error(error)
+
+    def chattr(self, attr: SFTPAttributes) -> int:
+        return SFTP_OK
+
+
+class _LocalSFTPInterface(SFTPServerInterface):
+    """
+    Serves the local file system as it is, remote paths are local paths. `latency` (in seconds) is
+    added to every metadata request and file open, to imitate a host that is not on localhost.
+    """
+
+    def __init__(self, server: ServerInterface, latency: float = 0.0) -> None:
+        super().__init__(server)
+        self._latency = latency
+
+    def list_folder(self, path: str) -> Union[List[SFTPAttributes], int]:
+        self._wait()
+        try:
+            result = []
+            for name in os.listdir(path):
+                attributes = SFTPAttributes.from_stat(os.lstat(os.path.join(path, name)))
+                attributes.filename = name
+                result.append(attributes)
+            return result
+        except OSError as error:
+            return _to_sftp_error(error)
+
+    def stat(self, path: str) -> Union[SFTPAttributes, int]:
+        self._wait()
+        try:
+            return SFTPAttributes.from_stat(os.stat(path))
+        except OSError as error:
+            return _to_sftp_error(error)
+
+    def lstat(self, path: str) -> Union[SFTPAttributes, int]:
+        self._wait()
+        try:
+            return SFTPAttributes.from_stat(os.lstat(path))
+        except OSError as error:
+            return _to_sftp_error(error)
+
+    def open(self, path: str, flags: int, attr: SFTPAttributes) -> Union[SFTPHandle, int]:
+        self._wait()
+        try:
+            fd = os.open(path, flags, 0o644)
+        except OSError as error:
+            return _to_sftp_error(error)
+
+        if flags & os.O_WRONLY:
+            mode = "ab" if flags & os.O_APPEND else "wb"
+        elif flags & os.O_RDWR:
+            mode = "a+b" if flags & os.O_APPEND else "r+b"
+        else:
+            mode = "rb"
+
+        return _LocalSFTPHandle(os.fdopen(fd, mode), flags)
+
+    def remove(self, path: str) -> int:
+        return self._call(os.remove, path)
+
+    def rename(self, oldpath: str, newpath: str) -> int:
+        return self._call(os.rename, oldpath, newpath)
+
+    def posix_rename(self, oldpath: str, newpath: str) -> int:
+        return self._call(os.replace, oldpath, newpath)
+
+    def mkdir(self, path: str, attr: SFTPAttributes) -> int:
+        return self._call(os.mkdir, path)
+
+    def rmdir(self, path: str) -> int:
+        return self._call(os.rmdir, path)
+
+    def chattr(self, path: str, attr: SFTPAttributes) -> int:
+        if attr.st_size is not None:
+            result = self._call(os.truncate, path, attr.st_size)
+            if result != SFTP_OK:
+                return result
+        if attr.st_mtime is not None:
+            return self._call(os.utime, path, (attr.st_atime or attr.st_mtime, attr.st_mtime))
+        return SFTP_OK
+
+    def canonicalize(self, path: str) -> str:
+        return os.path.normpath(os.path.join(os.getcwd(), path))
+
+    def _wait(self) -> None:
+        if self._latency:
+            time.sleep(self._latency)
+
+    def _call(self, function: Any, *args: Any) -> int:
+        self._wait()
+        try:
+            function(*args)
+        except OSError as error:
+            return _to_sftp_error(error)
+        return SFTP_OK
+
+
+class _Server(ServerInterface):
+    def __init__(self, shell_access: bool) -> None:
+        self._shell_access = shell_access
+
+    def check_auth_password(self, username: str, password: str) -> int:
+        return AUTH_SUCCESSFUL if (username, password) == (USERNAME, PASSWORD) else AUTH_FAILED
+
+    def get_allowed_auths(self, username: str) -> str:
+        return "password"
+
+    def check_channel_request(self, kind: str, chanid: int) -> int:
+        return OPEN_SUCCEEDED
+
+    def check_channel_exec_request(self, channel: Any, command: bytes) -> bool:
+        if not self._shell_access:
+            return False
+
+        threading.Thread(target=self._execute, args=(channel, command.decode()), daemon=True).start()
+        return True
+
+    @staticmethod
+    def _execute(channel: Any, command: str) -> None:
+        result = subprocess.run(command, shell=True, capture_output=True)
+        channel.sendall(result.stdout)
+        channel.sendall_stderr(result.stderr)
+        channel.send_exit_status(result.returncode)
+        channel.close()
+
+
+class LocalSFTPServer:
+    """
+    An in-process SFTP server on localhost, good enough to measure the deployment tool without a
+    real host. With `shell_access` it also runs `exec_command` requests through the local shell.
+    """
+
+    def __init__(self, shell_access: bool = True, latency: float = 0.0) -> None:
+        self._shell_access = shell_access
+        self._latency = latency
+        self._host_key = RSAKey.generate(2048)
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._transports: List[Transport] = []
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    @property
+    def port(self) -> int:
+        return self._socket.getsockname()[1]
+
+    def __enter__(self) -> "LocalSFTPServer":
+        self._socket.bind(("127.0.0.1", 0))
+        self._socket.listen(16)
+        self._socket.settimeout(0.2)
+        self._running = True
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_val: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> None:
+        self._running = False
+        if self._thread:
+            self._thread.join()
+        for transport in self._transports:
+            transport.close()
+        self._socket.close()
+
+    def _serve(self) -> None:
+        while self._running:
+            try:
+                connection, _ = self._socket.accept()
+            except socket.timeout:
+                continue
+
+            transport = Transport(connection)
+            transport.add_server_key(self._host_key)
+            transport.set_subsystem_handler("sftp", SFTPServer, _LocalSFTPInterface, self._latency)
+            transport.start_server(server=_Server(self._shell_access))
+            self._transports.append(transport)
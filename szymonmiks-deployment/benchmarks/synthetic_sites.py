@@ -0,0 +1,39 @@
+import os
+from pathlib import Path
+from typing import Callable, Dict
+
+
+def _write(path: Path, size: int) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # random content, so compression in the transport layer does not flatter the numbers
+    path.write_bytes(os.urandom(size))
+
+
+def many_tiny_files(base_dir: Path) -> None:
+    for post in range(100):
+        for page in range(20):
+            _write(base_dir / "p" / f"post-{post}" / f"page-{page}.html", 1024)
+
+
+def few_large_files(base_dir: Path) -> None:
+    for index in range(4):
+        _write(base_dir / "img" / f"photo-{index}.jpg", 8 * 1024 * 1024)
+
+
+def deep_tree(base_dir: Path, depth: int = 8) -> None:
+    def build(directory: Path, level: int) -> None:
+        for index in range(4):
+            _write(directory / f"file-{index}.html", 4 * 1024)
+
+        if level < depth:
+            for branch in range(2):
+                build(directory / f"level-{level}-{branch}", level + 1)
+
+    build(base_dir, 1)
+
+
+SITES: Dict[str, Callable[[Path], None]] = {
+    "many-tiny-files": many_tiny_files,
+    "few-large-files": few_large_files,
+    "deep-tree": deep_tree,
+}
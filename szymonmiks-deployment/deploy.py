@@ -1,27 +1,146 @@
+from pathlib import Path
+from typing import Dict, List, Optional
+
 import typer
 from dotenv import load_dotenv
 
+from szymonmiks_deployment.config import DeploymentOptions
+from szymonmiks_deployment.deployment_manager import DeploymentManager, DeploymentStrategy
 from szymonmiks_deployment.factory import DeploymentManagerFactory
+from szymonmiks_deployment.fan_out import FanOutError
 
+app = typer.Typer()
 
-def main(deployment_type: str) -> None:
-    """
-    deployment_type - two possible values: blog or website
-    """
+
+def _create_deployment_manager(deployment_type: str, options: DeploymentOptions) -> DeploymentManager:
     load_dotenv()
 
     if deployment_type == "blog":
-        deployment_manager = DeploymentManagerFactory.for_blog()
-        deployment_manager.deploy()
-        return
+        return DeploymentManagerFactory.for_blog(options)
 
     if deployment_type == "website":
-        deployment_manager = DeploymentManagerFactory.for_website()
-        deployment_manager.deploy()
-        return
+        return DeploymentManagerFactory.for_website(options)
 
     raise ValueError(f"Unknown deployment_type: {deployment_type}")
 
 
+@app.command()
+def deploy(
+    deployment_types: List[str] = typer.Argument(..., help="blog and/or website"),
+    incremental: bool = typer.Option(False, help="Upload only files that differ from the remote manifest"),
+    resume: bool = typer.Option(False, help="Skip files already uploaded by an interrupted deployment"),
+    mirror: bool = typer.Option(False, help="Remove remote files that are not deployed anymore"),
+    workers: int = typer.Option(4, min=1, help="Number of parallel SFTP channels used for uploads"),
+    max_failures: int = typer.Option(0, min=0, help="Number of files allowed to fail before the deployment aborts"),
+    strategy: DeploymentStrategy = typer.Option(
+        DeploymentStrategy.PER_FILE.value, help="Upload files one by one or as a single archive"
+    ),
+    precompress: bool = typer.Option(False, help="Upload gzip/brotli variants of text assets next to the originals"),
+    optimize_images: bool = typer.Option(False, help="Recompress images and add responsive/WebP variants"),
+    minify: bool = typer.Option(False, help="Minify HTML, CSS and JS files before upload"),
+    fingerprint: bool = typer.Option(False, help="Publish CSS/JS under content-hashed names for long-lived caching"),
+    report: Optional[Path] = typer.Option(None, help="Write a deploy report, as JSON or Prometheus textfile (*.prom)"),
+) -> None:
+    """
+    Deploys one or more targets, each to its main host and all mirrors listed in FTP_MIRROR_HOSTS.
+    """
+    options = DeploymentOptions(
+        workers=workers,
+        max_failures=max_failures,
+        precompress=precompress,
+        optimize_images=optimize_images,
+        minify=minify,
+        fingerprint=fingerprint,
+    )
+
+    load_dotenv()
+    fan_out_deployer = DeploymentManagerFactory.for_targets(deployment_types, options)
+    errors: Dict[str, BaseException] = {}
+    try:
+        deployment_reports = fan_out_deployer.deploy(
+            incremental=incremental, strategy=strategy, resume=resume, mirror=mirror
+        )
+    except FanOutError as fan_out_error:
+        # reports of the destinations that succeeded are still written
+        deployment_reports, errors = fan_out_error.reports, fan_out_error.errors
+
+    if report:
+        for destination in fan_out_deployer.destinations:
+            if destination.name not in deployment_reports:
+                continue
+
+            path = report
+            if len(fan_out_deployer.destinations) > 1:
+                path = report.with_name(f"{report.stem}-{destination.target}-{destination.host}{report.suffix}")
+            deployment_reports[destination.name].write(
+                path, labels={"target": destination.target, "host": destination.host}
+            )
+
+    for name, error in errors.items():
+        typer.echo(f"Deployment to {name} has failed: {error!r}")
+
+    failed = {name: result.failures for name, result in deployment_reports.items() if result.failures}
+    for name, failures in failed.items():
+        typer.echo(f"{len(failures)} file(s) failed to upload to {name}, run again with --resume to send them")
+
+    if errors or failed:
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def watch(
+    deployment_type: str,
+    workers: int = typer.Option(4, min=1, help="Number of parallel SFTP channels used for uploads"),
+    precompress: bool = typer.Option(False, help="Upload gzip/brotli variants of text assets next to the originals"),
+    optimize_images: bool = typer.Option(False, help="Recompress images and add responsive/WebP variants"),
+    minify: bool = typer.Option(False, help="Minify HTML, CSS and JS files before upload"),
+    fingerprint: bool = typer.Option(False, help="Publish CSS/JS under content-hashed names for long-lived caching"),
+) -> None:
+    """
+    Keeps one SFTP session open and pushes files as soon as they change, e.g. while `hugo` rebuilds the blog.
+    Pass the same processing options as used for the deployment.
+    deployment_type - two possible values: blog or website
+    """
+    options = DeploymentOptions(
+        workers=workers,
+        precompress=precompress,
+        optimize_images=optimize_images,
+        minify=minify,
+        fingerprint=fingerprint,
+    )
+    deployment_manager = _create_deployment_manager(deployment_type, options)
+    try:
+        deployment_manager.watch()
+    except KeyboardInterrupt:
+        typer.echo("Stopped watching")
+
+
+@app.command()
+def verify(
+    deployment_type: str,
+    precompress: bool = typer.Option(False, help="The deployment included gzip/brotli variants of text assets"),
+    optimize_images: bool = typer.Option(False, help="The deployment included optimized images"),
+    minify: bool = typer.Option(False, help="The deployment included minified HTML, CSS and JS files"),
+    fingerprint: bool = typer.Option(False, help="The deployment included fingerprinted CSS/JS"),
+) -> None:
+    """
+    Checksums remote files on the server and compares them with the local files.
+    Pass the same processing options as used for the deployment.
+    deployment_type - two possible values: blog or website
+    """
+    options = DeploymentOptions(
+        precompress=precompress, optimize_images=optimize_images, minify=minify, fingerprint=fingerprint
+    )
+    result = _create_deployment_manager(deployment_type, options).verify()
+
+    for title, paths in (("Missing", result.missing), ("Different", result.different), ("Extra", result.extra)):
+        for path in paths:
+            typer.echo(f"{title}: {path}")
+
+    if not result.ok:
+        raise typer.Exit(code=1)
+    typer.echo("Remote matches the local files")
+
+
 if __name__ == "__main__":
-    typer.run(main)
+    app()
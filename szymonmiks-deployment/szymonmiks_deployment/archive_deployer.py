@@ -0,0 +1,65 @@
+import shlex
+import tarfile
+import tempfile
+from pathlib import Path
+from typing import Iterable
+
+from szymonmiks_deployment.ftp_client import IFTPClient
+from szymonmiks_deployment.logger import LoggerFactory
+from szymonmiks_deployment.pipeline import DeploymentFile
+
+
+class ArchiveDeployer:
+    """
+    Uploads the whole site as a single compressed tar stream and unpacks it on the remote into a
+    staging directory next to the deployment root. Every unpacked file is then renamed over its
+    remote counterpart, so no file is ever visible half written. Only the archived paths are
+    replaced, anything else on the remote (server-only files, a nested site) is left untouched.
+    """
+
+    ARCHIVE_NAME = ".deploy-archive.tar.gz"
+
+    def __init__(self, client: IFTPClient, remote_dir: str) -> None:
+        self._client = client
+        self._remote_dir = remote_dir.rstrip("/")
+        self._logger = LoggerFactory.create(__name__)
+
+    def is_supported(self) -> bool:
+        return self._client.has_shell_access()
+
+    def deploy(self, files: Iterable[DeploymentFile]) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            archive_path = Path(tmp_dir) / self.ARCHIVE_NAME
+
+            with archive_path.open("wb") as archive_file:
+                with tarfile.open(fileobj=archive_file, mode="w|gz") as tar:
+                    for file in files:
+                        tar.add(str(file.local_path), arcname=file.remote_path.as_posix(), recursive=False)
+
+            self._logger.info(f"Uploading archive of {archive_path.stat().st_size} bytes")
+            self._client.put(archive_path, Path(self.ARCHIVE_NAME))
+
+        self._client.exec_command(self._swap_command())
+
+    def _swap_command(self) -> str:
+        remote_dir = shlex.quote(self._remote_dir)
+        archive = shlex.quote(f"{self._remote_dir}/{self.ARCHIVE_NAME}")
+        staging = shlex.quote(f"{self._remote_dir}.staging")
+
+        # `$0` is the absolute deployment root, as the paths are moved from inside the staging directory
+        make_directories = 'for path; do mkdir -p -- "$0/$path"; done'
+        move_files = 'for path; do mv -f -- "$path" "$0/$path"; done'
+
+        return " && ".join(
+            [
+                f"rm -rf {staging}",
+                f"mkdir -p {staging}",
+                f"tar -xzf {archive} -C {staging}",
+                f"rm -f {archive}",
+                f"target=$(cd {remote_dir} && pwd)",
+                f"(cd {staging} && "
+                f'find . -mindepth 1 -type d -exec sh -c {shlex.quote(make_directories)} "$target" {{}} + && '
+                f'find . ! -type d -exec sh -c {shlex.quote(move_files)} "$target" {{}} +)',
+                f"rm -rf {staging}",
+            ]
+        )
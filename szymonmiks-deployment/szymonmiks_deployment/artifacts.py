@@ -0,0 +1,20 @@
+from szymonmiks_deployment.dedup import Deduplicator
+from szymonmiks_deployment.delta import DeltaTransfer
+from szymonmiks_deployment.ftp_client import ParamikoFTPClient
+from szymonmiks_deployment.manifest import RemoteManifestStore
+
+# files the deployment itself keeps on the remote, next to the deployed site
+ARTIFACT_FILES = (RemoteManifestStore.FILE_NAME,)
+ARTIFACT_DIRECTORIES = (DeltaTransfer.SIGNATURES_DIR,)
+ARTIFACT_SUFFIXES = (ParamikoFTPClient.TEMP_SUFFIX, Deduplicator.TEMP_SUFFIX, DeltaTransfer.PATCH_SUFFIX)
+
+
+def is_artifact(remote_path: str) -> bool:
+    """
+    `remote_path` is relative to the deployment root, with `/` as the separator.
+    """
+    return (
+        remote_path in ARTIFACT_FILES
+        or remote_path.split("/", 1)[0] in ARTIFACT_DIRECTORIES
+        or remote_path.endswith(ARTIFACT_SUFFIXES)
+    )
@@ -1,11 +1,53 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
 from os import environ
+from typing import List
 
 
 class FTPConfigError(Exception):
     pass
 
 
+@dataclass(frozen=True)
+class TransferConfig:
+    """
+    SFTP transfer tuning. The defaults are paramiko's own, `high_throughput` switches to pipelined
+    writes with a large SSH window, which keeps more data in flight on high-latency links.
+    """
+
+    high_throughput: bool = False
+    window_size: int = 64 * 1024 * 1024
+    max_packet_size: int = 256 * 1024
+    buffer_size: int = 1024 * 1024
+    # files at least this large are sent as a delta against the remote copy, 0 turns it off
+    delta_threshold: int = 4 * 1024 * 1024
+    delta_block_size: int = 64 * 1024
+
+    def __post_init__(self) -> None:
+        sizes = [
+            self.window_size,
+            self.max_packet_size,
+            self.buffer_size,
+            self.delta_block_size,
+        ]
+        if any(elem <= 0 for elem in sizes) or self.delta_threshold < 0:
+            raise FTPConfigError("Transfer sizes must be positive numbers!")
+
+    @classmethod
+    def from_env(cls) -> "TransferConfig":
+        defaults = cls()
+        try:
+            return cls(
+                high_throughput=environ.get("SFTP_HIGH_THROUGHPUT", "").lower() in ("1", "true", "yes"),
+                window_size=int(environ.get("SFTP_WINDOW_SIZE", defaults.window_size)),
+                max_packet_size=int(environ.get("SFTP_MAX_PACKET_SIZE", defaults.max_packet_size)),
+                buffer_size=int(environ.get("SFTP_BUFFER_SIZE", defaults.buffer_size)),
+                delta_threshold=int(environ.get("SFTP_DELTA_THRESHOLD", defaults.delta_threshold)),
+                delta_block_size=int(environ.get("SFTP_DELTA_BLOCK_SIZE", defaults.delta_block_size)),
+            )
+        except ValueError as error:
+            raise FTPConfigError("Can not build TransferConfig from env vars!") from error
+
+
 @dataclass(frozen=True)
 class FTPConfig:
     host: str
@@ -13,11 +55,32 @@ class FTPConfig:
     password: str
     path: str
     port: int = 22
+    transfer: TransferConfig = field(default_factory=TransferConfig)
+    # public URL of the deployed site, e.g. `https://blog.szymonmiks.pl`, optional
+    site_url: str = ""
 
     def __post_init__(self) -> None:
         if any(elem == "" for elem in [self.host, self.username, self.path, self.password]):
             raise FTPConfigError("None of the properties can be empty!")
 
+    def with_mirrors_from_env(self) -> List["FTPConfig"]:
+        """
+        Returns this config followed by one for every host in `FTP_MIRROR_HOSTS` (comma separated,
+        `host` or `host:port`). Mirrors share credentials and the remote path with the main host.
+        """
+        configs = [self]
+        for mirror in environ.get("FTP_MIRROR_HOSTS", "").split(","):
+            if not mirror.strip():
+                continue
+
+            host, _, port = mirror.strip().partition(":")
+            try:
+                configs.append(replace(self, host=host, port=int(port) if port else self.port))
+            except ValueError as error:
+                raise FTPConfigError(f"Invalid mirror host: {mirror}") from error
+
+        return configs
+
     @classmethod
     def from_env_for_website(cls) -> "FTPConfig":
         try:
@@ -25,8 +88,16 @@ class FTPConfig:
             username = environ["FTP_USERNAME"]
             password = environ["FTP_PASSWORD"]
             path = environ["FTP_PATH"]
+            site_url = environ.get("SITE_URL", "")
 
-            return cls(host=host, username=username, password=password, path=path)
+            return cls(
+                host=host,
+                username=username,
+                password=password,
+                path=path,
+                transfer=TransferConfig.from_env(),
+                site_url=site_url,
+            )
         except Exception as error:
             raise FTPConfigError("Can not build FTPConfig fron env vars!") from error
 
@@ -37,7 +108,26 @@ class FTPConfig:
             username = environ["FTP_USERNAME"]
             password = environ["FTP_PASSWORD"]
             path = environ["BLOG_FTP_PATH"]
+            site_url = environ.get("BLOG_SITE_URL", "")
 
-            return cls(host=host, username=username, password=password, path=path)
+            return cls(
+                host=host,
+                username=username,
+                password=password,
+                path=path,
+                transfer=TransferConfig.from_env(),
+                site_url=site_url,
+            )
         except Exception as error:
             raise FTPConfigError("Can not build FTPConfig fron env vars!") from error
+
+
+@dataclass(frozen=True)
+class DeploymentOptions:
+    workers: int = 1
+    precompress: bool = False
+    optimize_images: bool = False
+    minify: bool = False
+    fingerprint: bool = False
+    # files allowed to fail after all retries before the deployment is aborted
+    max_failures: int = 0
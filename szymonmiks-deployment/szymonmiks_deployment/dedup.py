@@ -0,0 +1,97 @@
+import shlex
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AbstractSet, Dict, List, Optional, Tuple
+
+from szymonmiks_deployment.ftp_client import IFTPClient, RemoteCommandError
+from szymonmiks_deployment.hashing import FileHasher
+from szymonmiks_deployment.logger import LoggerFactory
+
+
+@dataclass(frozen=True)
+class Duplicate:
+    local_path: Path
+    remote_path: Path
+    original: Path
+
+
+class Deduplicator:
+    """
+    Uploads every unique content once. Other files with the same content are hard linked (or
+    copied, where the file system can not link) on the server from the uploaded copy, in batched
+    shell commands. Without shell access every file is uploaded as usual.
+    """
+
+    BATCH_SIZE = 200
+    TEMP_SUFFIX = ".deploy-link"
+
+    def __init__(self, client: IFTPClient, remote_dir: str, hasher: FileHasher) -> None:
+        self._client = client
+        self._remote_dir = remote_dir
+        self._hasher = hasher
+        self._enabled: Optional[bool] = None
+        self._originals: Dict[str, Path] = {}
+        self._duplicates: List[Duplicate] = []
+        self._logger = LoggerFactory.create(__name__)
+
+    def reset(self) -> None:
+        """
+        Forgets uploaded originals, they may have changed on the server since.
+        """
+        self._originals = {}
+        self._duplicates = []
+
+    def is_duplicate(self, local_path: Path, remote_path: Path) -> bool:
+        """
+        Remembers the first file with a given content. Later ones are duplicates and should not be uploaded.
+        """
+        if self._enabled is None:
+            self._enabled = self._client.has_shell_access()
+        if not self._enabled:
+            return False
+
+        original = self._originals.setdefault(self._hasher.hash(local_path), remote_path)
+        if original == remote_path:
+            return False
+
+        self._duplicates.append(Duplicate(local_path, remote_path, original))
+        return True
+
+    def link(self, failed_originals: AbstractSet[Path] = frozenset()) -> Tuple[List[Duplicate], List[Duplicate]]:
+        """
+        Creates pending duplicates from their originals, which must be uploaded by now. Duplicates of
+        `failed_originals` are not linked, the server still has the previous version of those. Returns
+        created duplicates and those that could not be created remotely and need a regular upload.
+        """
+        pending, self._duplicates = self._duplicates, []
+        duplicates = [elem for elem in pending if elem.original not in failed_originals]
+        linked: List[Duplicate] = []
+        failed = [elem for elem in pending if elem.original in failed_originals]
+        if failed:
+            self._logger.warning(f"Uploading {len(failed)} duplicate(s) of files that failed to upload")
+
+        for start in range(0, len(duplicates), self.BATCH_SIZE):
+            batch = duplicates[start : start + self.BATCH_SIZE]
+            try:
+                self._client.exec_command(
+                    f"cd {shlex.quote(self._remote_dir)} && " + " && ".join(self._link_command(elem) for elem in batch)
+                )
+                linked.extend(batch)
+            except RemoteCommandError as error:
+                self._logger.warning(f"Could not link {len(batch)} duplicate(s), uploading them instead: {error}")
+                failed.extend(batch)
+
+        if linked:
+            self._logger.info(f"Created {len(linked)} duplicate file(s) on the server")
+        return linked, failed
+
+    def _link_command(self, duplicate: Duplicate) -> str:
+        original = shlex.quote(duplicate.original.as_posix())
+        target = shlex.quote(duplicate.remote_path.as_posix())
+        # linked next to the target and renamed over it, so the old file is replaced atomically
+        temp = shlex.quote(
+            duplicate.remote_path.with_name(f".{duplicate.remote_path.name}{self.TEMP_SUFFIX}").as_posix()
+        )
+        return (
+            f"{{ ln -f -- {original} {temp} 2>/dev/null || cp -f -- {original} {temp}; }} && mv -f -- {temp} {target}"
+        )
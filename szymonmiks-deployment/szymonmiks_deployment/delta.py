@@ -0,0 +1,329 @@
+import hashlib
+import json
+import shlex
+import struct
+import tempfile
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List, Optional, Tuple, Union
+
+from szymonmiks_deployment.ftp_client import IFTPClient, RemoteCommandError
+from szymonmiks_deployment.logger import LoggerFactory
+
+ADLER_MODULO = 65521
+
+# executed on the remote with `python3 -c`, must stay in sync with `Signature.of`
+SIGNATURE_SCRIPT = """
+import hashlib, json, os, sys, zlib
+path, block_size = sys.argv[1], int(sys.argv[2])
+blocks = []
+with open(path, "rb") as file:
+    for block in iter(lambda: file.read(block_size), b""):
+        blocks.append([zlib.adler32(block), hashlib.md5(block).hexdigest()])
+print(json.dumps({"block_size": block_size, "size": os.path.getsize(path), "blocks": blocks}))
+"""
+
+# executed on the remote with `python3 -c`, must stay in sync with `Delta.to_patch`
+APPLY_SCRIPT = """
+import os, shutil, struct, sys
+target, patch = sys.argv[1], sys.argv[2]
+rebuilt = target + ".deploy-tmp"
+with open(target, "rb") as old, open(patch, "rb") as ops, open(rebuilt, "wb") as new:
+    while True:
+        kind = ops.read(1)
+        if not kind:
+            break
+        if kind == b"C":
+            offset, length = struct.unpack(">QQ", ops.read(16))
+            old.seek(offset)
+            new.write(old.read(length))
+        else:
+            (length,) = struct.unpack(">Q", ops.read(8))
+            new.write(ops.read(length))
+shutil.copymode(target, rebuilt)
+os.replace(rebuilt, target)
+os.remove(patch)
+"""
+
+
+def _strong(block: bytes) -> str:
+    return hashlib.md5(block).hexdigest()
+
+
+@dataclass(frozen=True)
+class Signature:
+    block_size: int
+    size: int
+    blocks: List[Tuple[int, str]]
+
+    @classmethod
+    def of(cls, data: bytes, block_size: int) -> "Signature":
+        blocks = [
+            (zlib.adler32(data[offset : offset + block_size]), _strong(data[offset : offset + block_size]))
+            for offset in range(0, len(data), block_size)
+        ]
+        return cls(block_size, len(data), blocks)
+
+    @classmethod
+    def from_json(cls, raw: str) -> "Signature":
+        parsed = json.loads(raw)
+        return cls(parsed["block_size"], parsed["size"], [(weak, strong) for weak, strong in parsed["blocks"]])
+
+    def to_json(self) -> str:
+        return json.dumps({"block_size": self.block_size, "size": self.size, "blocks": self.blocks})
+
+    def length_of(self, index: int) -> int:
+        return min(self.block_size, self.size - index * self.block_size)
+
+
+@dataclass(frozen=True)
+class Copy:
+    offset: int
+    length: int
+
+
+class Delta:
+    """
+    Instructions rebuilding a new file from blocks of the old one and literal data.
+    """
+
+    def __init__(self) -> None:
+        self.ops: List[Union[Copy, bytes]] = []
+
+    @classmethod
+    def compute(cls, data: bytes, signature: Signature, max_literal_bytes: Optional[int] = None) -> Optional["Delta"]:
+        """
+        Returns None as soon as more than `max_literal_bytes` would have to be sent.
+        """
+        block_size = signature.block_size
+        by_weak: Dict[int, List[int]] = {}
+        for index, (block_weak, _) in enumerate(signature.blocks):
+            if signature.length_of(index) == block_size:
+                by_weak.setdefault(block_weak, []).append(index)
+
+        delta = cls()
+        budget = len(data) if max_literal_bytes is None else max_literal_bytes
+        literal_start = 0
+        position = 0
+        rolling = False
+        a = b = 0
+
+        # the hot loop, the rolling checksum is inlined on purpose
+        while position + block_size <= len(data):
+            if not rolling:
+                weak = zlib.adler32(data[position : position + block_size])
+                a, b = weak & 0xFFFF, weak >> 16
+                rolling = True
+
+            candidates = by_weak.get((b << 16) | a)
+            if candidates:
+                match = delta._match(data[position : position + block_size], candidates, signature)
+                if match is not None:
+                    budget -= position - literal_start
+                    delta._literal(data[literal_start:position])
+                    delta._copy(match * block_size, block_size)
+                    position += block_size
+                    literal_start = position
+                    rolling = False
+                    continue
+
+            if position - literal_start > budget:
+                return None
+            if position + block_size == len(data):
+                break
+
+            removed = data[position]
+            a = (a - removed + data[position + block_size]) % ADLER_MODULO
+            b = (b - block_size * removed + a - 1) % ADLER_MODULO
+            position += 1
+
+        # the last block of the old file is usually shorter and can only match the end of the new one
+        last = len(signature.blocks) - 1
+        tail_length = signature.length_of(last) if signature.blocks else 0
+        tail_start = len(data) - tail_length
+        if 0 < tail_length < block_size and tail_start >= literal_start:
+            if delta._match(data[tail_start:], [last], signature) is not None:
+                budget -= tail_start - literal_start
+                delta._literal(data[literal_start:tail_start])
+                delta._copy(last * block_size, tail_length)
+                literal_start = len(data)
+
+        if len(data) - literal_start > budget:
+            return None
+
+        delta._literal(data[literal_start:])
+        return delta
+
+    @property
+    def literal_bytes(self) -> int:
+        return sum(len(op) for op in self.ops if isinstance(op, bytes))
+
+    def to_patch(self) -> bytes:
+        parts = []
+        for op in self.ops:
+            if isinstance(op, Copy):
+                parts.append(b"C" + struct.pack(">QQ", op.offset, op.length))
+            else:
+                parts.append(b"L" + struct.pack(">Q", len(op)) + op)
+        return b"".join(parts)
+
+    def writes(self, data: bytes) -> List[Tuple[int, bytes]]:
+        """
+        Turns the delta into writes at offsets of the old file, for servers that can not run commands.
+        Blocks that moved can not be copied remotely, so they are sent again.
+        """
+        result: List[Tuple[int, bytes]] = []
+        target = 0
+        for op in self.ops:
+            length = op.length if isinstance(op, Copy) else len(op)
+            if not isinstance(op, Copy) or op.offset != target:
+                if result and result[-1][0] + len(result[-1][1]) == target:
+                    result[-1] = (result[-1][0], result[-1][1] + data[target : target + length])
+                else:
+                    result.append((target, data[target : target + length]))
+            target += length
+        return result
+
+    @staticmethod
+    def _match(window: bytes, candidates: List[int], signature: Signature) -> Optional[int]:
+        if not candidates:
+            return None
+
+        strong = _strong(window)
+        for index in candidates:
+            if signature.blocks[index][1] == strong and signature.length_of(index) == len(window):
+                return index
+        return None
+
+    def _literal(self, data: bytes) -> None:
+        if data:
+            self.ops.append(data)
+
+    def _copy(self, offset: int, length: int) -> None:
+        previous = self.ops[-1] if self.ops else None
+        if isinstance(previous, Copy) and previous.offset + previous.length == offset:
+            self.ops[-1] = Copy(previous.offset, previous.length + length)
+        else:
+            self.ops.append(Copy(offset, length))
+
+
+class DeltaTransfer:
+    """
+    Sends only the changed blocks of large files that already exist on the remote, rsync style.
+    With shell access the remote signature is computed and the file rebuilt by `python3` on the
+    server. Without it, signatures of previous uploads are kept in `SIGNATURES_DIR` and the changed
+    blocks are written into a copy of the remote file made by the server, which then replaces it.
+    Servers which can not copy files get the whole file instead.
+    """
+
+    SIGNATURES_DIR = ".deploy-signatures"
+    PATCH_SUFFIX = ".deploy-patch"
+    # sending more than this share of the file is not worth the extra round-trips, bailing out
+    # early also bounds the time spent rolling checksums over a file that was rewritten completely
+    MAX_LITERAL_RATIO = 0.25
+
+    def __init__(self, client: IFTPClient, remote_dir: str, threshold: int, block_size: int) -> None:
+        self._client = client
+        self._remote_dir = remote_dir
+        self._threshold = threshold
+        self._block_size = block_size
+        self._signatures_dir_created = False
+        self._lock = Lock()
+        self._logger = LoggerFactory.create(__name__)
+
+    def applies_to(self, local_path: Path) -> bool:
+        return local_path.stat().st_size >= self._threshold
+
+    def upload(self, local_path: Path, remote_path: Path) -> Optional[int]:
+        """
+        Returns the number of sent bytes, or None if the file has to be uploaded in full.
+        """
+        if not self.applies_to(local_path):
+            return None
+
+        signature = self._remote_signature(remote_path)
+        if signature is None:
+            return None
+
+        data = local_path.read_bytes()
+        delta = Delta.compute(data, signature, int(len(data) * self.MAX_LITERAL_RATIO))
+        if delta is None:
+            return None
+
+        if self._client.has_shell_access():
+            patch = delta.to_patch()
+            try:
+                self._apply_remotely(patch, remote_path)
+            except RemoteCommandError as error:
+                self._logger.warning(f"Could not apply delta of {remote_path}, uploading it in full: {error}")
+                return None
+            sent = len(patch)
+        else:
+            writes = delta.writes(data)
+            try:
+                self._client.patch(remote_path, writes, len(data))
+            except IOError as error:
+                self._logger.warning(f"Could not patch {remote_path}, uploading it in full: {error}")
+                return None
+            self._store_signature(Signature.of(data, self._block_size), remote_path)
+            sent = sum(len(block) for _, block in writes)
+
+        self._logger.info(f"Delta upload of {remote_path}: sent {sent} of {len(data)} bytes")
+        return sent
+
+    def remember(self, local_path: Path, remote_path: Path) -> None:
+        """
+        Keeps the signature of a fully uploaded file, so the next upload can be a delta one.
+        """
+        if self.applies_to(local_path) and not self._client.has_shell_access():
+            self._store_signature(Signature.of(local_path.read_bytes(), self._block_size), remote_path)
+
+    def _remote_signature(self, remote_path: Path) -> Optional[Signature]:
+        try:
+            if self._client.has_shell_access():
+                output = self._client.exec_command(
+                    f"cd {shlex.quote(self._remote_dir)} && python3 -c {shlex.quote(SIGNATURE_SCRIPT)} "
+                    f"{shlex.quote(remote_path.as_posix())} {self._block_size}"
+                )
+                signature = Signature.from_json(output)
+            else:
+                with tempfile.TemporaryDirectory() as tmp_dir:
+                    local_copy = Path(tmp_dir) / "signature.json"
+                    self._client.get(self._signature_path(remote_path), local_copy)
+                    signature = Signature.from_json(local_copy.read_text())
+        except (IOError, RemoteCommandError, ValueError, KeyError):
+            self._logger.info(f"No signature of {remote_path} on the remote, it will be uploaded in full")
+            return None
+
+        if signature.block_size != self._block_size:
+            return None
+        return signature
+
+    def _apply_remotely(self, patch: bytes, remote_path: Path) -> None:
+        patch_path = remote_path.with_name(remote_path.name + self.PATCH_SUFFIX)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            local_patch = Path(tmp_dir) / patch_path.name
+            local_patch.write_bytes(patch)
+            self._client.put(local_patch, patch_path)
+
+        self._client.exec_command(
+            f"cd {shlex.quote(self._remote_dir)} && python3 -c {shlex.quote(APPLY_SCRIPT)} "
+            f"{shlex.quote(remote_path.as_posix())} {shlex.quote(patch_path.as_posix())}"
+        )
+
+    def _store_signature(self, signature: Signature, remote_path: Path) -> None:
+        with self._lock:
+            if not self._signatures_dir_created:
+                self._client.make_directories([Path(self.SIGNATURES_DIR)])
+                self._signatures_dir_created = True
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            local_signature = Path(tmp_dir) / "signature.json"
+            local_signature.write_text(signature.to_json())
+            self._client.put(local_signature, self._signature_path(remote_path))
+
+    def _signature_path(self, remote_path: Path) -> Path:
+        key = hashlib.sha256(remote_path.as_posix().encode()).hexdigest()
+        return Path(self.SIGNATURES_DIR) / f"{key}.json"
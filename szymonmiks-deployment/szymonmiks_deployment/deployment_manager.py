@@ -1,21 +1,391 @@
+from enum import Enum, unique
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from szymonmiks_deployment.archive_deployer import ArchiveDeployer
+from szymonmiks_deployment.dedup import Deduplicator
+from szymonmiks_deployment.delta import DeltaTransfer
+from szymonmiks_deployment.deployment_report import DeploymentReport
 from szymonmiks_deployment.file_collector import IFileCollector
 from szymonmiks_deployment.ftp_client import IFTPClient
+from szymonmiks_deployment.hashing import FileHasher
+from szymonmiks_deployment.journal import DeploymentJournal
 from szymonmiks_deployment.logger import LoggerFactory
+from szymonmiks_deployment.manifest import Manifest, ManifestEntry, RemoteManifestStore
+from szymonmiks_deployment.mirror import RemoteInventory, RemotePruner
+from szymonmiks_deployment.parallel_uploader import ParallelUploader
+from szymonmiks_deployment.pipeline import DeploymentFile, IDeploymentStage
+from szymonmiks_deployment.remote_tree import RemoteTree
+from szymonmiks_deployment.retry import RetryPolicy
+from szymonmiks_deployment.scheduler import UploadScheduler
+from szymonmiks_deployment.verification import RemoteVerifier, VerificationError, VerificationResult
+from szymonmiks_deployment.watcher import FileWatcher
+
+
+@unique
+class DeploymentStrategy(Enum):
+    PER_FILE = "per-file"
+    ARCHIVE = "archive"
 
 
 class DeploymentManager:
-    def __init__(self, client: IFTPClient, file_collector: IFileCollector) -> None:
+    def __init__(
+        self,
+        client: IFTPClient,
+        file_collector: IFileCollector,
+        hasher: Optional[FileHasher] = None,
+        workers: int = 1,
+        archive_deployer: Optional[ArchiveDeployer] = None,
+        stages: Optional[List[IDeploymentStage]] = None,
+        delta_transfer: Optional[DeltaTransfer] = None,
+        journal: Optional[DeploymentJournal] = None,
+        deduplicator: Optional[Deduplicator] = None,
+        scheduler: Optional[UploadScheduler] = None,
+        verifier: Optional[RemoteVerifier] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        failure_budget: int = 0,
+    ) -> None:
         self._client = client
         self._file_collector = file_collector
+        self._hasher = hasher or FileHasher()
+        self._workers = workers
+        self._archive_deployer = archive_deployer
+        self._stages = stages or []
+        self._delta_transfer = delta_transfer
+        self._journal = journal
+        self._deduplicator = deduplicator
+        self._scheduler = scheduler or UploadScheduler()
+        self._verifier = verifier
+        self._retry_policy = retry_policy or RetryPolicy()
+        self._failure_budget = failure_budget
+        self._completed: Dict[str, str] = {}
+        self._manifest_store = RemoteManifestStore(client)
+        self._report = DeploymentReport()
         self._logger = LoggerFactory.create(__name__)
 
-    def deploy(self) -> None:
+    def deploy(
+        self,
+        incremental: bool = False,
+        strategy: DeploymentStrategy = DeploymentStrategy.PER_FILE,
+        resume: bool = False,
+        files: Optional[List[DeploymentFile]] = None,
+        mirror: bool = False,
+    ) -> DeploymentReport:
+        """
+        `files` are the result of `prepare`, when the same site is deployed to several destinations.
+        Otherwise files are collected here.
+
+        With `mirror`, remote files that are not deployed anymore are removed, and incremental
+        deploys skip files whose remote size and modification time match, even without a manifest.
+        """
         self._logger.info("Start deployment!")
+        self._report = DeploymentReport()
+        self._completed = self._start_journal(resume)
 
-        files_to_upload = self._file_collector.collect()
+        files_to_upload = files if files is not None else self._files_to_upload()
 
-        for file in files_to_upload:
-            remote_path = file.relative_to(self._file_collector.base_dir)
-            self._client.put(file, remote_path)
+        archive_deployer = self._archive_deployer_for(strategy)
 
+        try:
+            if archive_deployer:
+                self._deploy_archive(archive_deployer, files_to_upload, mirror)
+            elif incremental:
+                self._deploy_incremental(files_to_upload, mirror)
+            else:
+                self._deploy_all(files_to_upload, mirror)
+        except BaseException:
+            if self._journal:
+                self._journal.close()
+            raise
+
+        if self._journal and self._report.failures:
+            # keeps the uploaded files recorded, so only the failed ones are sent again with `resume`
+            self._journal.close()
+        elif self._journal:
+            self._journal.finish()
+
+        self._report.finish()
+        self._report.log_summary(self._logger)
         self._logger.info("Deployment has finished!")
+
+        return self._report
+
+    def prepare(self) -> List[DeploymentFile]:
+        """
+        Collects the files and runs them through the stages, without touching the remote.
+        """
+        return list(self._files_to_upload())
+
+    def verify(self) -> VerificationResult:
+        """
+        Checks that the remote holds exactly the files a deployment would upload now.
+        """
+        if not self._verifier:
+            raise VerificationError("No remote verifier configured")
+
+        expected = {
+            file.remote_path.as_posix(): self._hasher.hash(file.local_path)
+            for file in self._files_to_upload()
+            if not file.is_dir
+        }
+        self._hasher.save()
+
+        return self._verifier.verify(expected, self._file_collector)
+
+    def watch(self, changes: Optional[Iterable[List[Path]]] = None) -> None:
+        """
+        Pushes changed files over the already open session until interrupted. By default the
+        collected directory is polled with `FileWatcher`. Changes go through the stages like in a
+        deployment, and files whose content matches the remote manifest are not sent again.
+        """
+        manifest = self._manifest_store.load()
+        with self._report.phase("list"):
+            tree = RemoteTree.from_listing(self._client)
+
+        for changed in changes if changes is not None else FileWatcher(self._file_collector).changes():
+            self._report = DeploymentReport()
+            pending = self._changed_files(changed, manifest)
+            with self._uploader(tree) as uploader:
+                for file in self._scheduler.order(pending):
+                    uploader.upload(file.local_path, file.remote_path)
+                uploader.wait()
+
+            for remote_path in uploader.failed:
+                manifest.remove(remote_path)
+
+            # keeps the next incremental deploy from sending these files again
+            self._hasher.save()
+            self._manifest_store.save(manifest)
+            self._report.finish()
+            uploaded = len([file for file in pending if not file.is_dir]) - len(uploader.failed)
+            self._logger.info(
+                f"Pushed {uploaded} file(s) for {len(changed)} changed path(s) in "
+                f"{self._report.summary()['wall_seconds']}s"
+            )
+
+    def _changed_files(self, changed: List[Path], manifest: Manifest) -> List[DeploymentFile]:
+        """
+        Returns files to push for the changed paths and records them in `manifest`.
+        """
+        if self._stages:
+            # a change can affect other files, e.g. fingerprinting rewrites references in every page
+            files = list(self._files_to_upload())
+        else:
+            base_dir = self._file_collector.base_dir
+            files = [DeploymentFile(path, path.relative_to(base_dir)) for path in changed]
+
+        pending: List[DeploymentFile] = []
+        for file in files:
+            if file.is_dir:
+                pending.append(file)
+                continue
+
+            entry = self._manifest_entry(file.local_path)
+            if manifest.has_changed(file.remote_path, entry):
+                manifest.add(file.remote_path, entry)
+                pending.append(file)
+
+        return pending
+
+    def _start_journal(self, resume: bool) -> Dict[str, str]:
+        if self._journal:
+            return self._journal.start(resume)
+
+        if resume:
+            self._logger.warning("Resuming is not possible without a journal, starting from scratch")
+        return {}
+
+    def _is_completed(self, file: DeploymentFile) -> bool:
+        if not self._journal or not self._completed:
+            return False
+        return self._journal.is_completed(self._completed, file.local_path, file.remote_path)
+
+    def _files_to_upload(self) -> Iterable[DeploymentFile]:
+        base_dir = self._file_collector.base_dir
+        files: Iterator[DeploymentFile] = (
+            DeploymentFile(path, path.relative_to(base_dir))
+            for path in self._report.timed("collect", self._file_collector.iter_files())
+        )
+
+        if not self._stages:
+            return files
+
+        # stages need to see the whole site, e.g. to rewrite references between files
+        processed = list(files)
+        for stage in self._stages:
+            with self._report.phase(type(stage).__name__):
+                processed = stage.process(processed)
+
+        return processed
+
+    def _archive_deployer_for(self, strategy: DeploymentStrategy) -> Optional[ArchiveDeployer]:
+        if strategy != DeploymentStrategy.ARCHIVE:
+            return None
+
+        if self._archive_deployer and self._archive_deployer.is_supported():
+            return self._archive_deployer
+
+        self._logger.warning("Archive deployment is not possible without shell access, falling back to per-file mode")
+        return None
+
+    def _deploy_archive(self, archive_deployer: ArchiveDeployer, files: Iterable[DeploymentFile], mirror: bool) -> None:
+        inventory = None
+        if mirror:
+            with self._report.phase("list"):
+                inventory = RemoteInventory.from_listing(self._client)
+
+        files = list(files)
+        with self._report.phase("archive"):
+            archive_deployer.deploy(files)
+
+        if inventory:
+            # unpacked files keep their modification times, only stale files are left to handle
+            self._prune(inventory, files)
+
+        # the manifest describes the archived site only, written so the next incremental deploy can use it
+        manifest = Manifest.empty()
+        for file in files:
+            if not file.is_dir:
+                manifest.add(file.remote_path, self._manifest_entry(file.local_path))
+
+        self._hasher.save()
+        self._manifest_store.save(manifest)
+
+    def _deploy_all(self, files: Iterable[DeploymentFile], mirror: bool) -> None:
+        inventory = None
+        with self._report.phase("list"):
+            if mirror:
+                inventory = RemoteInventory.from_listing(self._client)
+                tree = RemoteTree(self._client, inventory.directories())
+            else:
+                tree = RemoteTree.from_listing(self._client)
+
+        # filled while files stream into the uploader, mirroring needs them all at the end
+        collected: List[DeploymentFile] = []
+        pending: List[DeploymentFile] = []
+
+        def files_to_send() -> Iterator[DeploymentFile]:
+            for file in files:
+                collected.append(file)
+                if file.is_dir or not self._is_completed(file):
+                    pending.append(file)
+                    yield file
+
+        with self._uploader(tree) as uploader:
+            for file in self._scheduler.order(files_to_send()):
+                uploader.upload(file.local_path, file.remote_path)
+            uploader.wait()
+
+        skipped = len(collected) - len(pending)
+        if inventory:
+            self._mirror(inventory, collected, self._uploaded(pending, uploader.failed))
+
+        # replaces the manifest of an earlier deploy, so the next incremental deploy compares with this one
+        manifest = Manifest.empty()
+        failed = set(uploader.failed)
+        for file in collected:
+            if not file.is_dir and file.remote_path not in failed:
+                manifest.add(file.remote_path, self._manifest_entry(file.local_path))
+
+        self._hasher.save()
+        self._manifest_store.save(manifest)
+        if skipped:
+            self._logger.info(f"Skipped {skipped} file(s) uploaded by the interrupted deployment")
+
+    def _deploy_incremental(self, files: Iterable[DeploymentFile], mirror: bool) -> None:
+        remote_manifest = self._manifest_store.load()
+        inventory = None
+        if mirror:
+            with self._report.phase("list"):
+                inventory = RemoteInventory.from_listing(self._client)
+            tree = RemoteTree(self._client, inventory.directories())
+        else:
+            # directories of files from the previous deploy are known to exist, no need to list them
+            tree = RemoteTree(self._client, remote_manifest.directories())
+        local_manifest = Manifest.empty()
+        # filled while files stream into the uploader, mirroring needs them all at the end
+        collected: List[DeploymentFile] = []
+        pending: List[DeploymentFile] = []
+
+        def files_to_send() -> Iterator[DeploymentFile]:
+            for file in files:
+                collected.append(file)
+                if file.is_dir:
+                    pending.append(file)
+                    yield file
+                    continue
+
+                entry = self._manifest_entry(file.local_path)
+                local_manifest.add(file.remote_path, entry)
+
+                if self._has_changed(file, entry, remote_manifest, inventory) and not self._is_completed(file):
+                    pending.append(file)
+                    yield file
+
+        with self._uploader(tree) as uploader:
+            for file in self._scheduler.order(files_to_send()):
+                uploader.upload(file.local_path, file.remote_path)
+            uploader.wait()
+
+        for remote_path in uploader.failed:
+            # the next incremental deploy sends the file again
+            local_manifest.remove(remote_path)
+
+        uploaded = len([file for file in pending if not file.is_dir]) - len(uploader.failed)
+        if inventory:
+            self._mirror(inventory, collected, self._uploaded(pending, uploader.failed))
+        self._hasher.save()
+        self._manifest_store.save(local_manifest)
+        self._logger.info(f"Uploaded {uploaded} changed file(s), {len(local_manifest) - uploaded} unchanged")
+
+    @staticmethod
+    def _has_changed(
+        file: DeploymentFile, entry: ManifestEntry, remote_manifest: Manifest, inventory: Optional[RemoteInventory]
+    ) -> bool:
+        if inventory is None:
+            return remote_manifest.has_changed(file.remote_path, entry)
+
+        if inventory.get(file.remote_path) is None:
+            return True
+        if inventory.is_up_to_date(file):
+            return False
+        # e.g. uploaded before modification times were kept, the manifest may still know the content
+        return remote_manifest.has_changed(file.remote_path, entry)
+
+    @staticmethod
+    def _uploaded(pending: List[DeploymentFile], failed: List[Path]) -> List[DeploymentFile]:
+        failed_paths = set(failed)
+        return [file for file in pending if file.remote_path not in failed_paths]
+
+    def _mirror(self, inventory: RemoteInventory, files: List[DeploymentFile], uploaded: List[DeploymentFile]) -> None:
+        with self._report.phase("mtime"):
+            # lets the next mirrored deploy recognise these files by size and modification time
+            self._client.set_mtimes(
+                {file.remote_path: file.local_path.stat().st_mtime for file in uploaded if not file.is_dir}
+            )
+
+        self._prune(inventory, files)
+
+    def _prune(self, inventory: RemoteInventory, files: List[DeploymentFile]) -> None:
+        stale_files, stale_directories = inventory.stale(files, self._file_collector)
+        with self._report.phase("prune"):
+            RemotePruner(self._client, self._workers).prune(stale_files, stale_directories)
+
+    def _uploader(self, tree: RemoteTree) -> ParallelUploader:
+        return ParallelUploader(
+            self._client,
+            self._workers,
+            self._report,
+            tree,
+            self._delta_transfer,
+            self._journal,
+            self._deduplicator,
+            self._retry_policy,
+            self._failure_budget,
+        )
+
+    def _manifest_entry(self, file: Path) -> ManifestEntry:
+        stat = file.stat()
+        with self._report.phase("hash"):
+            sha256 = self._hasher.hash(file)
+        return ManifestEntry(size=stat.st_size, mtime=stat.st_mtime, sha256=sha256)
@@ -0,0 +1,199 @@
+import json
+import math
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from logging import Logger
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+SLOWEST_FILES_LIMIT = 20
+
+
+@dataclass(frozen=True)
+class FileTransfer:
+    remote_path: str
+    bytes: int
+    seconds: float
+    retries: int = 0
+
+
+def _percentile(sorted_values: List[float], percentile: float) -> float:
+    if not sorted_values:
+        return 0.0
+
+    rank = math.ceil(percentile / 100 * len(sorted_values))
+    return sorted_values[max(rank, 1) - 1]
+
+
+class DeploymentReport:
+    """
+    Collects timings of a single deployment. Phase times are summed across all worker threads, so
+    with parallel uploads `put` may be longer than the whole deployment.
+    """
+
+    def __init__(self) -> None:
+        self._started_at = time.perf_counter()
+        self._finished_at: Optional[float] = None
+        self._phases: Dict[str, float] = defaultdict(float)
+        self._transfers: List[FileTransfer] = []
+        self._deduplicated_files = 0
+        self._deduplicated_bytes = 0
+        self._failures: Dict[str, str] = {}
+        self._lock = Lock()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase_time(name, time.perf_counter() - start)
+
+    def add_phase_time(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self._phases[name] += seconds
+
+    def timed(self, name: str, iterable: Iterable[T]) -> Iterator[T]:
+        """
+        Wraps a lazy iterable, so time spent producing its items is counted as the `name` phase.
+        """
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add_phase_time(name, time.perf_counter() - start)
+                return
+            self.add_phase_time(name, time.perf_counter() - start)
+            yield item
+
+    def record_transfer(self, remote_path: Path, size: int, seconds: float, retries: int = 0) -> None:
+        with self._lock:
+            self._transfers.append(FileTransfer(remote_path.as_posix(), size, seconds, retries))
+
+    def record_deduplicated(self, size: int) -> None:
+        with self._lock:
+            self._deduplicated_files += 1
+            self._deduplicated_bytes += size
+
+    def record_failure(self, remote_path: Path, error: BaseException) -> None:
+        with self._lock:
+            self._failures[remote_path.as_posix()] = repr(error)
+
+    def finish(self) -> None:
+        self._finished_at = time.perf_counter()
+
+    @property
+    def transfers(self) -> List[FileTransfer]:
+        return list(self._transfers)
+
+    @property
+    def failures(self) -> Dict[str, str]:
+        return dict(self._failures)
+
+    def summary(self) -> Dict[str, Any]:
+        wall_seconds = (self._finished_at or time.perf_counter()) - self._started_at
+        latencies = sorted(transfer.seconds for transfer in self._transfers)
+        total_bytes = sum(transfer.bytes for transfer in self._transfers)
+        slowest = sorted(self._transfers, key=lambda transfer: transfer.seconds, reverse=True)
+
+        return {
+            "wall_seconds": round(wall_seconds, 3),
+            "files": len(self._transfers),
+            "bytes": total_bytes,
+            "retries": sum(transfer.retries for transfer in self._transfers),
+            "deduplicated_files": self._deduplicated_files,
+            "deduplicated_bytes": self._deduplicated_bytes,
+            "failed_files": len(self._failures),
+            "files_per_second": round(len(self._transfers) / wall_seconds, 2) if wall_seconds else 0.0,
+            "bytes_per_second": round(total_bytes / wall_seconds, 2) if wall_seconds else 0.0,
+            "latency_p50_seconds": round(_percentile(latencies, 50), 4),
+            "latency_p95_seconds": round(_percentile(latencies, 95), 4),
+            "phases_seconds": {name: round(seconds, 3) for name, seconds in sorted(self._phases.items())},
+            "slowest_files": [asdict(transfer) for transfer in slowest[:SLOWEST_FILES_LIMIT]],
+            "failures": dict(sorted(self._failures.items())),
+        }
+
+    def log_summary(self, logger: Logger) -> None:
+        summary = self.summary()
+        logger.info(
+            f"Uploaded {summary['files']} file(s), {summary['bytes']} bytes in {summary['wall_seconds']}s "
+            f"({summary['files_per_second']} files/s, {summary['bytes_per_second'] / 1024 / 1024:.2f} MB/s)"
+        )
+        logger.info(
+            f"Per-file latency p50={summary['latency_p50_seconds']}s p95={summary['latency_p95_seconds']}s, "
+            f"retries={summary['retries']}"
+        )
+        if summary["deduplicated_files"]:
+            logger.info(
+                f"Created {summary['deduplicated_files']} duplicate file(s) on the server, "
+                f"saving {summary['deduplicated_bytes']} bytes of upload"
+            )
+        logger.info(f"Time per phase: {summary['phases_seconds']}")
+        for remote_path, error in summary["failures"].items():
+            logger.error(f"Failed file: {remote_path} {error}")
+        for transfer in summary["slowest_files"]:
+            logger.info(f"Slow file: {transfer['remote_path']} ({transfer['bytes']} bytes) {transfer['seconds']:.3f}s")
+
+    def write(self, path: Path, labels: Optional[Dict[str, str]] = None) -> None:
+        """
+        Writes the report as JSON, or as a Prometheus textfile when the file name ends with `.prom`.
+        """
+        if path.suffix == ".prom":
+            path.write_text(self._to_prometheus(labels or {}))
+        else:
+            path.write_text(json.dumps({"labels": labels or {}, **self.summary()}, indent=2))
+
+    def _to_prometheus(self, labels: Dict[str, str]) -> str:
+        summary = self.summary()
+
+        def metric(name: str, value: float, help_text: str, extra_labels: Optional[Dict[str, str]] = None) -> str:
+            all_labels = {**labels, **(extra_labels or {})}
+            rendered = ",".join(f'{key}="{value}"' for key, value in sorted(all_labels.items()))
+            return f"# HELP {name} {help_text}\n# TYPE {name} gauge\n{name}{{{rendered}}} {value}\n"
+
+        lines = [
+            metric("deploy_duration_seconds", summary["wall_seconds"], "Wall time of the deployment."),
+            metric("deploy_files", summary["files"], "Number of uploaded files."),
+            metric("deploy_bytes", summary["bytes"], "Number of uploaded bytes."),
+            metric("deploy_retries", summary["retries"], "Number of retried uploads."),
+            metric("deploy_failed_files", summary["failed_files"], "Number of files that could not be uploaded."),
+            metric(
+                "deploy_deduplicated_bytes",
+                summary["deduplicated_bytes"],
+                "Bytes not uploaded, because identical content was copied on the server.",
+            ),
+            metric(
+                "deploy_file_latency_seconds",
+                summary["latency_p50_seconds"],
+                "Per-file upload latency.",
+                {"quantile": "0.5"},
+            ),
+            metric(
+                "deploy_file_latency_seconds",
+                summary["latency_p95_seconds"],
+                "Per-file upload latency.",
+                {"quantile": "0.95"},
+            ),
+        ]
+        for phase, seconds in summary["phases_seconds"].items():
+            lines.append(metric("deploy_phase_seconds", seconds, "Time spent in a deployment phase.", {"phase": phase}))
+
+        # HELP/TYPE may appear only once per metric name
+        seen = set()
+        result = []
+        for block in lines:
+            for line in block.splitlines():
+                if line.startswith("#"):
+                    if line in seen:
+                        continue
+                    seen.add(line)
+                result.append(line)
+
+        return "\n".join(result) + "\n"
@@ -1,32 +1,121 @@
 from pathlib import Path
+from typing import List
 
 from paramiko import AutoAddPolicy, SSHClient
 
-from szymonmiks_deployment.config import FTPConfig
+from szymonmiks_deployment.archive_deployer import ArchiveDeployer
+from szymonmiks_deployment.config import DeploymentOptions, FTPConfig
+from szymonmiks_deployment.dedup import Deduplicator
+from szymonmiks_deployment.delta import DeltaTransfer
 from szymonmiks_deployment.deployment_manager import DeploymentManager
-from szymonmiks_deployment.file_collector import BlogFileCollector, WebsiteFileCollector
+from szymonmiks_deployment.fan_out import Destination, FanOutDeployer
+from szymonmiks_deployment.file_collector import BlogFileCollector, IFileCollector, WebsiteFileCollector
+from szymonmiks_deployment.fingerprinting import FingerprintingStage
 from szymonmiks_deployment.ftp_client import ParamikoFTPClient
+from szymonmiks_deployment.hashing import FileHasher, HashCache
+from szymonmiks_deployment.image_optimization import ImageOptimizationStage
+from szymonmiks_deployment.journal import DeploymentJournal
+from szymonmiks_deployment.minification import MinificationStage
+from szymonmiks_deployment.pipeline import IDeploymentStage
+from szymonmiks_deployment.precompression import PrecompressionStage
+from szymonmiks_deployment.retry import RetryPolicy
+from szymonmiks_deployment.scheduler import UploadScheduler
+from szymonmiks_deployment.verification import RemoteVerifier
+
+CACHE_DIR = Path(__file__).parent.parent / ".deploy_cache"
 
 
 class DeploymentManagerFactory:
+    TARGETS = ("blog", "website")
+
     @staticmethod
-    def for_website() -> DeploymentManager:
-        ssh_client = SSHClient()
-        ssh_client.set_missing_host_key_policy(AutoAddPolicy())
-        ftp_config = FTPConfig.from_env_for_website()
+    def for_website(options: DeploymentOptions = DeploymentOptions()) -> DeploymentManager:
+        return DeploymentManagerFactory._destinations("website", options, mirrors=False)[0].manager
+
+    @staticmethod
+    def for_blog(options: DeploymentOptions = DeploymentOptions()) -> DeploymentManager:
+        return DeploymentManagerFactory._destinations("blog", options, mirrors=False)[0].manager
+
+    @staticmethod
+    def for_targets(targets: List[str], options: DeploymentOptions = DeploymentOptions()) -> FanOutDeployer:
+        """
+        Deploys every target to its main host and to all mirrors from `FTP_MIRROR_HOSTS`.
+        """
+        destinations: List[Destination] = []
+        for target in dict.fromkeys(targets):
+            destinations.extend(DeploymentManagerFactory._destinations(target, options, mirrors=True))
+
+        return FanOutDeployer(destinations)
+
+    @staticmethod
+    def _destinations(target: str, options: DeploymentOptions, mirrors: bool) -> List[Destination]:
+        root_dir = Path(__file__).parent.parent.parent
+        file_collector: IFileCollector
+        if target == "blog":
+            ftp_config = FTPConfig.from_env_for_blog()
+            file_collector = BlogFileCollector(root_dir / "blog" / "public")
+        elif target == "website":
+            ftp_config = FTPConfig.from_env_for_website()
+            file_collector = WebsiteFileCollector(root_dir)
+        else:
+            raise ValueError(f"Unknown deployment_type: {target}")
 
-        ftp_client = ParamikoFTPClient(ssh_client, ftp_config)
-        base_dir = Path(__file__).parent.parent.parent
+        # the hasher and the stages are shared, so mirrors of a target reuse the same cached results
+        hasher = FileHasher(HashCache(CACHE_DIR / f"{target}-hashes.json"))
+        stages: List[IDeploymentStage] = []
+        if options.optimize_images:
+            stages.append(ImageOptimizationStage(CACHE_DIR / "images", hasher))
+        if options.minify:
+            stages.append(MinificationStage(CACHE_DIR / "minified", hasher))
+        if options.fingerprint:
+            stages.append(FingerprintingStage(CACHE_DIR / "fingerprinted", hasher, ftp_config.site_url))
+        if options.precompress:
+            stages.append(PrecompressionStage(CACHE_DIR / "compressed", hasher))
 
-        return DeploymentManager(ftp_client, WebsiteFileCollector(base_dir))
+        ftp_configs = ftp_config.with_mirrors_from_env() if mirrors else [ftp_config]
+        return [
+            Destination(
+                target,
+                config.host,
+                DeploymentManagerFactory._create(target, config, file_collector, hasher, stages, options),
+            )
+            for config in ftp_configs
+        ]
 
     @staticmethod
-    def for_blog() -> DeploymentManager:
+    def _create(
+        target: str,
+        ftp_config: FTPConfig,
+        file_collector: IFileCollector,
+        hasher: FileHasher,
+        stages: List[IDeploymentStage],
+        options: DeploymentOptions,
+    ) -> DeploymentManager:
         ssh_client = SSHClient()
         ssh_client.set_missing_host_key_policy(AutoAddPolicy())
-        ftp_config = FTPConfig.from_env_for_blog()
 
-        ftp_client = ParamikoFTPClient(ssh_client, ftp_config)
-        base_dir = Path(__file__).parent.parent.parent / "blog" / "public"
+        ftp_client = ParamikoFTPClient(ssh_client, ftp_config, channels=options.workers)
+        journal = DeploymentJournal(CACHE_DIR / f"{target}-{ftp_config.host}-journal.jsonl", hasher)
+        archive_deployer = ArchiveDeployer(ftp_client, ftp_config.path)
+        deduplicator = Deduplicator(ftp_client, ftp_config.path, hasher)
+        delta_transfer = None
+        if ftp_config.transfer.delta_threshold:
+            delta_transfer = DeltaTransfer(
+                ftp_client, ftp_config.path, ftp_config.transfer.delta_threshold, ftp_config.transfer.delta_block_size
+            )
 
-        return DeploymentManager(ftp_client, BlogFileCollector(base_dir))
+        return DeploymentManager(
+            ftp_client,
+            file_collector,
+            hasher,
+            options.workers,
+            archive_deployer,
+            stages,
+            delta_transfer,
+            journal,
+            deduplicator,
+            UploadScheduler(),
+            RemoteVerifier(ftp_client, ftp_config.path),
+            RetryPolicy(),
+            options.max_failures,
+        )
@@ -0,0 +1,109 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List
+
+from szymonmiks_deployment.deployment_manager import DeploymentManager, DeploymentStrategy
+from szymonmiks_deployment.deployment_report import DeploymentReport
+from szymonmiks_deployment.logger import LoggerFactory
+from szymonmiks_deployment.pipeline import DeploymentFile
+
+
+class FanOutError(Exception):
+    """
+    Raised once all destinations are done, when some of them have failed. `reports` holds the
+    reports of the destinations that succeeded.
+    """
+
+    def __init__(self, errors: Dict[str, BaseException], reports: Dict[str, DeploymentReport]) -> None:
+        super().__init__(f"Deployment to {', '.join(errors)} has failed")
+        self.errors = errors
+        self.reports = reports
+
+
+@dataclass(frozen=True)
+class Destination:
+    target: str
+    host: str
+    manager: DeploymentManager
+
+    @property
+    def name(self) -> str:
+        return f"{self.target}@{self.host}"
+
+
+class FanOutDeployer:
+    """
+    Deploys several targets, each to one or more mirror hosts, at the same time. Every target is
+    collected and run through its stages once, by the manager of its first destination, and the
+    result is uploaded to all of its destinations concurrently, each with its own worker pool.
+    """
+
+    def __init__(self, destinations: List[Destination]) -> None:
+        if not destinations:
+            raise ValueError("At least one destination is required!")
+
+        self._destinations = destinations
+        self._logger = LoggerFactory.create(__name__)
+
+    @property
+    def destinations(self) -> List[Destination]:
+        return list(self._destinations)
+
+    def deploy(
+        self,
+        incremental: bool = False,
+        strategy: DeploymentStrategy = DeploymentStrategy.PER_FILE,
+        resume: bool = False,
+        mirror: bool = False,
+    ) -> Dict[str, DeploymentReport]:
+        if len(self._destinations) == 1:
+            # nothing to share, the manager collects and uploads the files itself
+            destination = self._destinations[0]
+            try:
+                return {destination.name: destination.manager.deploy(incremental, strategy, resume, mirror=mirror)}
+            except Exception as failure:
+                self._logger.error(f"Deployment to {destination.name} has failed: {failure!r}")
+                raise FanOutError({destination.name: failure}, {}) from failure
+
+        plans: Dict[str, Future] = {}
+        deployments: Dict[str, Future] = {}
+        # every preparation and every deployment gets its own thread, so waiting for a plan never blocks
+        targets = {destination.target for destination in self._destinations}
+        with ThreadPoolExecutor(
+            max_workers=len(targets) + len(self._destinations), thread_name_prefix="fan-out"
+        ) as pool:
+            for destination in self._destinations:
+                if destination.target not in plans:
+                    plans[destination.target] = pool.submit(destination.manager.prepare)
+
+                deployments[destination.name] = pool.submit(
+                    self._deploy_to, destination, plans[destination.target], incremental, strategy, resume, mirror
+                )
+
+        reports: Dict[str, DeploymentReport] = {}
+        failures: Dict[str, BaseException] = {}
+        for name, deployment in deployments.items():
+            error = deployment.exception()
+            if error is not None:
+                self._logger.error(f"Deployment to {name} has failed: {error!r}")
+                failures[name] = error
+            else:
+                reports[name] = deployment.result()
+
+        if failures:
+            raise FanOutError(failures, reports) from next(iter(failures.values()))
+
+        return reports
+
+    def _deploy_to(
+        self,
+        destination: Destination,
+        plan: "Future[List[DeploymentFile]]",
+        incremental: bool,
+        strategy: DeploymentStrategy,
+        resume: bool,
+        mirror: bool,
+    ) -> DeploymentReport:
+        files = plan.result()
+        self._logger.info(f"Deploying {len(files)} path(s) to {destination.name}")
+        return destination.manager.deploy(incremental, strategy, resume, files, mirror)
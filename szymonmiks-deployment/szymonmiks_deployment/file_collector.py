@@ -1,6 +1,9 @@
+import os
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import List
+from typing import Callable, Iterator, List, Optional
+
+from szymonmiks_deployment.ignore_rules import IgnoreRules
 
 
 class IFileCollector(ABC):
@@ -10,48 +13,85 @@ class IFileCollector(ABC):
         pass
 
     @abstractmethod
-    def collect(self) -> List[Path]:
+    def iter_files(self) -> Iterator[Path]:
+        """
+        Yields files and directories lazily, every directory before its content.
+        """
         pass
 
+    def collect(self) -> List[Path]:
+        return list(self.iter_files())
+
+    def is_ignored(self, relative_path: str, is_dir: bool) -> bool:
+        """
+        Tells whether a path relative to `base_dir` is deliberately left out of the deployment.
+        """
+        return False
+
+
+def walk(directory: Path, should_skip: Callable[[os.DirEntry], bool]) -> Iterator[Path]:
+    """
+    Walks the tree top-down with `os.scandir`. Skipped directories are not descended into.
+    """
+    try:
+        with os.scandir(directory) as it:
+            entries = sorted(it, key=lambda e: e.name)
+    except FileNotFoundError:
+        return
+
+    for entry in entries:
+        if should_skip(entry):
+            continue
+
+        path = Path(entry.path)
+        yield path
+
+        if entry.is_dir(follow_symlinks=False):
+            yield from walk(path, should_skip)
+
+
+def ignored_by(rules: IgnoreRules, base_dir: Path) -> Callable[[os.DirEntry], bool]:
+    prefix_length = len(os.path.join(base_dir, ""))
+
+    def should_skip(entry: os.DirEntry) -> bool:
+        relative_path = entry.path[prefix_length:]
+        if os.sep != "/":
+            relative_path = relative_path.replace(os.sep, "/")
+        return rules.is_ignored(relative_path, entry.is_dir(follow_symlinks=False))
+
+    return should_skip
+
 
 class WebsiteFileCollector(IFileCollector):
-    EXCLUDED = ["szymonmiks-deployment", ".git", ".idea", ".gitignore", "README.md", "blog", ".mypy_cache"]
+    # used when the website has no `.deployignore`
+    DEFAULT_RULES = ["szymonmiks-deployment", "blog", "README.md", ".*"]
 
-    def __init__(self, base_dir: Path) -> None:
+    def __init__(self, base_dir: Path, rules: Optional[IgnoreRules] = None) -> None:
         self._base_dir = base_dir
+        self._rules = rules or IgnoreRules.load(base_dir, self.DEFAULT_RULES)
 
     @property
     def base_dir(self) -> Path:
         return self._base_dir
 
-    def collect(self) -> List[Path]:
-        file_list = []
-
-        for p in self._base_dir.rglob("*"):
-            if any(excluded in p.parts for excluded in self.EXCLUDED):
-                continue
-
-            if p.name.startswith("."):
-                continue
-
-            file_list.append(p)
+    def iter_files(self) -> Iterator[Path]:
+        yield from walk(self._base_dir, ignored_by(self._rules, self._base_dir))
 
-        return file_list
+    def is_ignored(self, relative_path: str, is_dir: bool) -> bool:
+        return self._rules.is_ignored(relative_path, is_dir)
 
 
 class BlogFileCollector(IFileCollector):
-    def __init__(self, base_dir: Path) -> None:
+    def __init__(self, base_dir: Path, rules: Optional[IgnoreRules] = None) -> None:
         self._base_dir = base_dir
+        self._rules = rules or IgnoreRules.load(base_dir)
 
     @property
     def base_dir(self) -> Path:
         return self._base_dir
 
-    def collect(self) -> List[Path]:
-        file_list = []
-
-        for p in self._base_dir.rglob("*"):
-            if "public" in p.parts:
-                file_list.append(p)
+    def iter_files(self) -> Iterator[Path]:
+        yield from walk(self._base_dir, ignored_by(self._rules, self._base_dir))
 
-        return file_list
+    def is_ignored(self, relative_path: str, is_dir: bool) -> bool:
+        return self._rules.is_ignored(relative_path, is_dir)
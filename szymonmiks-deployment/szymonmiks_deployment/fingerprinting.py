@@ -0,0 +1,186 @@
+import hashlib
+import json
+import posixpath
+import re
+from pathlib import Path
+from typing import Dict, Iterator, List, TextIO
+from urllib.parse import urlsplit
+
+from szymonmiks_deployment.hashing import FileHasher
+from szymonmiks_deployment.logger import LoggerFactory
+from szymonmiks_deployment.pipeline import DeploymentFile, IDeploymentStage
+
+REFERENCE_PATTERN = re.compile(r"""(?P<attr>\b(?:href|src)\s*=\s*)(?P<quote>["'])(?P<url>[^"'<>]*?)(?P=quote)""")
+READ_SIZE = 64 * 1024
+MAX_CARRY_SIZE = 1024 * 1024
+
+CACHE_RULES = """
+# BEGIN fingerprinted assets
+<IfModule mod_headers.c>
+  <FilesMatch "\\.[0-9a-f]{%(hash_length)d}\\.(css|js)(\\.gz|\\.br)?$">
+    Header set Cache-Control "public, max-age=31536000, immutable"
+  </FilesMatch>
+  <FilesMatch "\\.html(\\.gz|\\.br)?$">
+    Header set Cache-Control "no-cache"
+  </FilesMatch>
+</IfModule>
+# END fingerprinted assets
+"""
+
+
+def _chunks_at_tag_boundaries(src: TextIO) -> Iterator[str]:
+    """
+    Yields the document in pieces that end right after a `>`, so a tag (and the attribute inside it)
+    is never split between two pieces while memory use stays bounded.
+    """
+    carry = ""
+    for block in iter(lambda: src.read(READ_SIZE), ""):
+        carry += block
+        boundary = carry.rfind(">")
+
+        if boundary == -1 and len(carry) < MAX_CARRY_SIZE:
+            continue
+
+        split_at = boundary + 1 if boundary != -1 else len(carry)
+        yield carry[:split_at]
+        carry = carry[split_at:]
+
+    if carry:
+        yield carry
+
+
+class FingerprintingStage(IDeploymentStage):
+    """
+    Publishes CSS/JS files under content-hashed names (`css/style.css` -> `css/style.3f9a1c0b2e.css`)
+    and rewrites references in HTML files, so the fingerprinted files can be cached forever. Absolute
+    URLs are rewritten when they point at `site_url`. Original names are uploaded too, for references
+    that can not be rewritten (other hosts, assets loaded from scripts).
+
+    Cache rules are added to the site's own `.htaccess`. The file is only deployed when the site
+    has one, a generated file would replace the one on the server.
+    """
+
+    ASSET_SUFFIXES = {".css", ".js"}
+    HTML_SUFFIXES = {".html", ".htm"}
+    HASH_LENGTH = 10
+    CACHE_RULES_FILE = ".htaccess"
+
+    def __init__(self, cache_dir: Path, hasher: FileHasher, site_url: str = "") -> None:
+        self._cache_dir = cache_dir
+        self._hasher = hasher
+        site = urlsplit(site_url)
+        self._site_host = site.netloc.lower()
+        # URL path of the deployment root, e.g. `/blog/` when the site is served from a subdirectory
+        self._site_path = site.path.rstrip("/") + "/"
+        self._logger = LoggerFactory.create(__name__)
+
+    def process(self, files: List[DeploymentFile]) -> List[DeploymentFile]:
+        self._cache_dir.mkdir(parents=True, exist_ok=True)
+
+        fingerprinted: Dict[str, DeploymentFile] = {}
+        for file in files:
+            if file.is_dir or file.remote_path.suffix.lower() not in self.ASSET_SUFFIXES:
+                continue
+
+            digest = self._hasher.hash(file.local_path)[: self.HASH_LENGTH]
+            remote_path = file.remote_path.with_name(f"{file.remote_path.stem}.{digest}{file.remote_path.suffix}")
+            fingerprinted[file.remote_path.as_posix()] = DeploymentFile(file.local_path, remote_path)
+
+        if not fingerprinted:
+            return files
+
+        renames = {old: new.remote_path.name for old, new in fingerprinted.items()}
+        # rewritten HTML depends on the site URL too, it is part of the cache key
+        renames_digest = hashlib.sha256(
+            json.dumps([self._site_host, self._site_path, sorted(renames.items())]).encode()
+        ).hexdigest()[:16]
+
+        result = []
+        existing_cache_rules = None
+        for file in files:
+            if file.remote_path == Path(self.CACHE_RULES_FILE):
+                existing_cache_rules = file
+                continue
+
+            if not file.is_dir and file.remote_path.suffix.lower() in self.HTML_SUFFIXES:
+                result.append(self._rewrite_html(file, renames, renames_digest))
+            else:
+                result.append(file)
+
+        result.extend(fingerprinted.values())
+        if existing_cache_rules:
+            result.append(self._cache_rules(existing_cache_rules))
+        else:
+            self._logger.warning(
+                f"The site has no {self.CACHE_RULES_FILE}, fingerprinted assets are deployed without cache rules. "
+                f"Add one to the site (un-ignored in .deployignore) to have them appended."
+            )
+
+        self._logger.info(f"Fingerprinted {len(fingerprinted)} asset(s)")
+        return result
+
+    def _rewrite_html(self, file: DeploymentFile, renames: Dict[str, str], renames_digest: str) -> DeploymentFile:
+        target = self._cache_dir / f"{self._hasher.hash(file.local_path)}-{renames_digest}.html"
+        if target.is_file():
+            return DeploymentFile(target, file.remote_path)
+
+        html_dir = file.remote_path.parent.as_posix()
+        changed = False
+
+        def replace(match: re.Match) -> str:
+            nonlocal changed
+            url = match.group("url")
+            new_url = self._rewrite_url(url, html_dir, renames)
+            if new_url == url:
+                return match.group(0)
+
+            changed = True
+            return f"{match.group('attr')}{match.group('quote')}{new_url}{match.group('quote')}"
+
+        tmp_target = target.with_suffix(".tmp")
+        with file.local_path.open(encoding="utf-8", errors="surrogateescape", newline="") as src:
+            with tmp_target.open("w", encoding="utf-8", errors="surrogateescape", newline="") as dst:
+                for chunk in _chunks_at_tag_boundaries(src):
+                    dst.write(REFERENCE_PATTERN.sub(replace, chunk))
+
+        if not changed:
+            tmp_target.unlink()
+            return file
+
+        tmp_target.replace(target)
+        return DeploymentFile(target, file.remote_path)
+
+    def _rewrite_url(self, url: str, html_dir: str, renames: Dict[str, str]) -> str:
+        parts = urlsplit(url)
+        if not parts.path:
+            return url
+        if (parts.scheme or parts.netloc) and not self._is_site_url(parts.scheme, parts.netloc):
+            return url
+
+        if parts.netloc or parts.path.startswith("/"):
+            if not parts.path.startswith(self._site_path):
+                return url
+            resolved = posixpath.normpath(parts.path[len(self._site_path) :])
+        else:
+            resolved = posixpath.normpath(posixpath.join(html_dir, parts.path))
+
+        new_name = renames.get(resolved)
+        if not new_name:
+            return url
+
+        directory, _, _ = parts.path.rpartition("/")
+        new_path = f"{directory}/{new_name}" if directory or parts.path.startswith("/") else new_name
+        return url.replace(parts.path, new_path, 1)
+
+    def _is_site_url(self, scheme: str, netloc: str) -> bool:
+        # `//host/path` has no scheme
+        return bool(self._site_host) and scheme in ("", "http", "https") and netloc.lower() == self._site_host
+
+    def _cache_rules(self, existing: DeploymentFile) -> DeploymentFile:
+        rules = existing.local_path.read_text() + CACHE_RULES % {"hash_length": self.HASH_LENGTH}
+
+        target = self._cache_dir / f"{hashlib.sha256(rules.encode()).hexdigest()}.htaccess"
+        if not target.is_file():
+            target.write_text(rules)
+
+        return DeploymentFile(target, Path(self.CACHE_RULES_FILE))
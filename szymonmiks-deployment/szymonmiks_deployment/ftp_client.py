@@ -1,12 +1,39 @@
+import shlex
+import stat
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
+from queue import Queue
+from threading import Lock, Thread
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 
-from paramiko import SSHClient
+from paramiko import SFTPClient, SSHClient, SSHException
+from paramiko.channel import ChannelFile
+from paramiko.sftp import CMD_EXTENDED
+from paramiko.sftp_file import SFTPFile
+
+try:
+    from paramiko.sftp import int64
+except ImportError:  # paramiko < 3
+    from paramiko.py3compat import long as int64  # type: ignore
 
 from szymonmiks_deployment.config import FTPConfig
 from szymonmiks_deployment.logger import LoggerFactory
 
 
+class RemoteCommandError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class RemoteEntry:
+    path: Path
+    is_dir: bool
+    size: int
+    mtime: int
+
+
 class IFTPClient(ABC):
     @abstractmethod
     def get(self, remote_path: Path, local_path: Path) -> None:
@@ -16,38 +43,370 @@ class IFTPClient(ABC):
     def put(self, local_path: Path, remote_path: Path) -> None:
         pass
 
+    @abstractmethod
+    def patch(self, remote_path: Path, blocks: List[Tuple[int, bytes]], size: int) -> None:
+        """
+        Writes blocks at the given offsets of a copy of an existing remote file, truncated to `size`,
+        and moves the copy over the file once complete. Raises IOError when the server can not copy.
+        """
+        pass
+
+    @abstractmethod
+    def list_directories(self) -> List[Path]:
+        """
+        Lists all directories under the deployment root, relative to it.
+        """
+        pass
+
+    @abstractmethod
+    def make_directories(self, directories: List[Path]) -> None:
+        """
+        Creates the given directories. Parents must be listed before their children.
+        """
+        pass
+
+    @abstractmethod
+    def list_tree(self) -> List[RemoteEntry]:
+        """
+        Lists all files and directories under the deployment root, relative to it.
+        """
+        pass
+
+    @abstractmethod
+    def remove_files(self, remote_paths: List[Path]) -> None:
+        pass
+
+    @abstractmethod
+    def remove_directories(self, directories: List[Path]) -> None:
+        """
+        Removes the given empty directories. Children must be listed before their parents.
+        """
+        pass
+
+    @abstractmethod
+    def set_mtimes(self, mtimes: Dict[Path, float]) -> None:
+        """
+        Sets modification times of uploaded files, so they can be compared with local files later.
+        """
+        pass
+
+    @abstractmethod
+    def exec_command(self, command: str) -> str:
+        pass
+
+    @abstractmethod
+    def stream_command(self, command: str) -> Iterator[str]:
+        """
+        Yields lines of the command output as they arrive, for output too large to buffer.
+        """
+        pass
+
+    @abstractmethod
+    def has_shell_access(self) -> bool:
+        pass
+
 
 class ParamikoFTPClient(IFTPClient):
-    def __init__(self, client: SSHClient, config: FTPConfig) -> None:
+    # paths per batched shell command (`mkdir -p`, `rm -f`, `touch`), keeps it well below the usual ARG_MAX
+    COMMAND_BATCH_SIZE = 500
+    TEMP_SUFFIX = ".deploy-tmp"
+
+    def __init__(self, client: SSHClient, config: FTPConfig, channels: int = 1) -> None:
+        if channels < 1:
+            raise ValueError("`channels` must be a positive number!")
+
         self._client = client
         self._config = config
         self._logger = LoggerFactory.create(__name__)
+        self._shell_access: Optional[bool] = None
+        self._connection_lock = Lock()
 
-        self._client.connect(
-            hostname=self._config.host,
-            username=self._config.username,
-            password=self._config.password,
-            port=self._config.port,
-        )
-        self._sftp = self._client.open_sftp()
-        self._sftp.chdir(self._config.path)
+        self._connect()
+        # every SFTP channel is multiplexed over the same SSH transport, so parallel workers
+        # do not pay for additional handshakes
+        self._channels: "Queue[SFTPClient]" = Queue()
+        for _ in range(channels):
+            self._channels.put(self._open_sftp())
 
     def get(self, remote_path: Path, local_path: Path) -> None:
         self._logger.info(f"Downloading {remote_path} to {local_path}")
-        self._sftp.get(str(remote_path), str(local_path))
+        with self._sftp() as sftp:
+            # paramiko prefetches reads by default, the high throughput settings only shape the channel
+            sftp.get(str(remote_path), str(local_path))
 
     def put(self, local_path: Path, remote_path: Path) -> None:
         self._logger.info(f"Uploading {local_path} to {self._config.path}/{remote_path}")
 
         if local_path.is_dir():
             self._logger.info("Is dir!")
+            with self._sftp() as sftp:
+                try:
+                    sftp.mkdir(str(remote_path))
+                except IOError:
+                    self._logger.info(f"Directory {remote_path} already exists!")
+            return
+
+        # partial files must never become visible, the upload is renamed into place once complete
+        temp_path = self._temp_path(remote_path)
+        with self._sftp() as sftp:
+            if self._config.transfer.high_throughput:
+                self._put_pipelined(sftp, local_path, temp_path)
+            else:
+                sftp.put(str(local_path), str(temp_path))
+            self._rename(sftp, temp_path, remote_path)
+
+    def _temp_path(self, remote_path: Path) -> Path:
+        return remote_path.with_name(f".{remote_path.name}{self.TEMP_SUFFIX}")
+
+    def _rename(self, sftp: SFTPClient, source: Path, target: Path) -> None:
+        try:
+            sftp.posix_rename(str(source), str(target))
+        except IOError:
+            # servers without the posix-rename extension refuse to rename over an existing file
+            try:
+                sftp.remove(str(target))
+            except IOError:
+                pass
+            sftp.rename(str(source), str(target))
+
+    def _put_pipelined(self, sftp: SFTPClient, local_path: Path, remote_path: Path) -> None:
+        # paramiko's put reads the local file in 32KB chunks and waits for a stat afterwards,
+        # here writes are not acknowledged one by one and errors surface when the file is closed
+        buffer_size = self._config.transfer.buffer_size
+        with open(local_path, "rb") as local_file:
+            with sftp.open(str(remote_path), "wb", bufsize=buffer_size) as remote_file:
+                remote_file.set_pipelined(True)
+                while chunk := local_file.read(buffer_size):
+                    remote_file.write(chunk)
+
+    def patch(self, remote_path: Path, blocks: List[Tuple[int, bytes]], size: int) -> None:
+        self._logger.info(f"Patching {len(blocks)} block(s) of {self._config.path}/{remote_path}")
+
+        temp_path = self._temp_path(remote_path)
+        with self._sftp() as sftp:
             try:
-                self._sftp.mkdir(str(remote_path))
+                with sftp.open(str(remote_path), "r") as source, sftp.open(str(temp_path), "w") as target:
+                    self._copy_on_server(sftp, source, target)
+                    target.set_pipelined(True)
+                    for offset, block in blocks:
+                        target.seek(offset)
+                        target.write(block)
+                sftp.truncate(str(temp_path), size)
             except IOError:
-                self._logger.info(f"Directory {remote_path} already exists!")
+                try:
+                    sftp.remove(str(temp_path))
+                except IOError:
+                    pass
+                raise
+
+            self._rename(sftp, temp_path, remote_path)
+
+    @staticmethod
+    def _copy_on_server(sftp: SFTPClient, source: SFTPFile, target: SFTPFile) -> None:
+        # the `copy-data` extension of OpenSSH 9.0+, a length of 0 copies up to the end of the source,
+        # servers without it answer with an error status which is raised as IOError
+        sftp._request(CMD_EXTENDED, "copy-data", source.handle, int64(0), int64(0), target.handle, int64(0))
+
+    def list_directories(self) -> List[Path]:
+        if self.has_shell_access():
+            output = self.exec_command(f"cd {shlex.quote(self._config.path)} && find . -mindepth 1 -type d")
+            return [Path(line) for line in output.splitlines() if line]
+
+        result: List[Path] = []
+        pending = [Path(".")]
+        with self._sftp() as sftp:
+            while pending:
+                directory = pending.pop()
+                for attributes in sftp.listdir_attr(str(directory)):
+                    if attributes.st_mode is not None and stat.S_ISDIR(attributes.st_mode):
+                        child = directory / attributes.filename
+                        result.append(child)
+                        pending.append(child)
+
+        return result
+
+    def list_tree(self) -> List[RemoteEntry]:
+        result: List[RemoteEntry] = []
+        pending = [Path(".")]
+        with self._sftp() as sftp:
+            while pending:
+                directory = pending.pop()
+                for attributes in sftp.listdir_attr(str(directory)):
+                    child = directory / attributes.filename
+                    is_dir = attributes.st_mode is not None and stat.S_ISDIR(attributes.st_mode)
+                    result.append(RemoteEntry(child, is_dir, attributes.st_size or 0, attributes.st_mtime or 0))
+                    if is_dir:
+                        pending.append(child)
+
+        return result
+
+    def remove_files(self, remote_paths: List[Path]) -> None:
+        if self.has_shell_access():
+            for start in range(0, len(remote_paths), self.COMMAND_BATCH_SIZE):
+                batch = " ".join(
+                    shlex.quote(str(path)) for path in remote_paths[start : start + self.COMMAND_BATCH_SIZE]
+                )
+                self.exec_command(f"cd {shlex.quote(self._config.path)} && rm -f -- {batch}")
             return
 
-        self._sftp.put(str(local_path), str(remote_path))
+        with self._sftp() as sftp:
+            for remote_path in remote_paths:
+                try:
+                    sftp.remove(str(remote_path))
+                except FileNotFoundError:
+                    self._logger.info(f"File {remote_path} is already removed!")
+
+    def remove_directories(self, directories: List[Path]) -> None:
+        with self._sftp() as sftp:
+            for directory in directories:
+                try:
+                    sftp.rmdir(str(directory))
+                except IOError as error:
+                    self._logger.warning(f"Could not remove directory {directory}: {error}")
+
+    def set_mtimes(self, mtimes: Dict[Path, float]) -> None:
+        items = list(mtimes.items())
+        if self.has_shell_access():
+            try:
+                for start in range(0, len(items), self.COMMAND_BATCH_SIZE):
+                    batch = " && ".join(
+                        f"touch -c -m -d @{int(mtime)} -- {shlex.quote(str(path))}"
+                        for path, mtime in items[start : start + self.COMMAND_BATCH_SIZE]
+                    )
+                    self.exec_command(f"cd {shlex.quote(self._config.path)} && {batch}")
+                return
+            except RemoteCommandError as error:
+                # e.g. BSD touch does not understand `@<seconds>`
+                self._logger.warning(f"Could not set modification times in bulk, setting them one by one: {error}")
+
+        with self._sftp() as sftp:
+            for path, mtime in items:
+                sftp.utime(str(path), (int(mtime), int(mtime)))
+
+    def make_directories(self, directories: List[Path]) -> None:
+        if self.has_shell_access():
+            for start in range(0, len(directories), self.COMMAND_BATCH_SIZE):
+                batch = " ".join(
+                    shlex.quote(str(path)) for path in directories[start : start + self.COMMAND_BATCH_SIZE]
+                )
+                self.exec_command(f"cd {shlex.quote(self._config.path)} && mkdir -p -- {batch}")
+            return
+
+        with self._sftp() as sftp:
+            for directory in directories:
+                try:
+                    sftp.mkdir(str(directory))
+                except IOError:
+                    self._logger.info(f"Directory {directory} already exists!")
+
+    def exec_command(self, command: str) -> str:
+        self._logger.info(f"Executing `{command}`")
+        self._ensure_connected()
+        _, stdout, stderr = self._client.exec_command(command)
+        errors = self._read_in_background(stderr)
+        output = stdout.read().decode()
+
+        exit_status = stdout.channel.recv_exit_status()
+        if exit_status != 0:
+            raise RemoteCommandError(f"Command `{command}` failed with exit status {exit_status}: {errors().strip()}")
+
+        return output
+
+    def stream_command(self, command: str) -> Iterator[str]:
+        self._logger.info(f"Executing `{command}`")
+        self._ensure_connected()
+        _, stdout, stderr = self._client.exec_command(command)
+        errors = self._read_in_background(stderr)
+        for line in stdout:
+            yield line.rstrip("\n")
+
+        exit_status = stdout.channel.recv_exit_status()
+        if exit_status != 0:
+            raise RemoteCommandError(f"Command `{command}` failed with exit status {exit_status}: {errors().strip()}")
+
+    @staticmethod
+    def _read_in_background(stream: ChannelFile) -> Callable[[], str]:
+        """
+        Reads `stream` in a thread and returns a function which waits for its content. Both outputs
+        of a command share the channel window, so one left unread blocks the command once it is full.
+        """
+        chunks: List[bytes] = []
+        reader = Thread(target=lambda: chunks.append(stream.read()), name="command-output", daemon=True)
+        reader.start()
+
+        def content() -> str:
+            reader.join()
+            return b"".join(chunks).decode(errors="replace")
+
+        return content
+
+    def has_shell_access(self) -> bool:
+        if self._shell_access is None:
+            try:
+                self._shell_access = self.exec_command("echo ok").strip() == "ok"
+            except (SSHException, RemoteCommandError):
+                self._shell_access = False
+
+            self._logger.info(f"Shell access available: {self._shell_access}")
+
+        return self._shell_access
+
+    def _connect(self) -> None:
+        self._client.connect(
+            hostname=self._config.host,
+            username=self._config.username,
+            password=self._config.password,
+            port=self._config.port,
+        )
+
+    def _ensure_connected(self) -> None:
+        with self._connection_lock:
+            transport = self._client.get_transport()
+            if transport is None or not transport.is_active():
+                self._logger.warning(f"SSH session to {self._config.host} is lost, reconnecting")
+                self._connect()
+
+    def _open_sftp(self) -> SFTPClient:
+        transfer = self._config.transfer
+        if transfer.high_throughput:
+            transport = self._client.get_transport()
+            if transport is None:
+                raise SSHException("SSH session is not active")
+            sftp = SFTPClient.from_transport(
+                transport, window_size=transfer.window_size, max_packet_size=transfer.max_packet_size
+            )
+        else:
+            sftp = self._client.open_sftp()
+        sftp.chdir(self._config.path)
+        return sftp
+
+    @contextmanager
+    def _sftp(self) -> Iterator[SFTPClient]:
+        sftp = self._channels.get()
+        try:
+            yield sftp
+        except BaseException:
+            sftp = self._replace_if_broken(sftp)
+            raise
+        finally:
+            self._channels.put(sftp)
+
+    def _replace_if_broken(self, sftp: SFTPClient) -> SFTPClient:
+        """
+        Swaps a channel that went down with the failed operation for a new one, reconnecting the
+        SSH session if that went down too, so a retried operation gets a working channel.
+        """
+        channel = sftp.get_channel()
+        if channel is not None and not channel.closed and channel.get_transport().is_active():
+            return sftp
+
+        try:
+            self._ensure_connected()
+            return self._open_sftp()
+        except (SSHException, OSError, EOFError) as error:
+            # the broken channel stays in the pool, the next operation on it tries again
+            self._logger.warning(f"Could not reopen an SFTP channel: {error!r}")
+            return sftp
 
     def __del__(self) -> None:
         if self._client:
@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Optional
+
+from szymonmiks_deployment.logger import LoggerFactory
+
+CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class FileFingerprint:
+    inode: int
+    mtime_ns: int
+    size: int
+
+    @classmethod
+    def from_stat(cls, stat: os.stat_result) -> "FileFingerprint":
+        return cls(inode=stat.st_ino, mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+
+
+class HashCache:
+    """
+    Remembers content hashes of local files, keyed by inode/mtime/size, so unchanged files
+    are not read again on the next deploy. When `path` is None the cache lives only in memory.
+    """
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self._path = path
+        self._entries: Dict[str, Dict] = {}
+        # shared by upload workers and by deployments of the same site to several mirrors
+        self._lock = Lock()
+        self._logger = LoggerFactory.create(__name__)
+
+        if self._path and self._path.is_file():
+            try:
+                self._entries = json.loads(self._path.read_text())
+            except ValueError:
+                self._logger.warning(f"Hash cache {self._path} is corrupted, starting with an empty one")
+
+    def get(self, file: Path, fingerprint: FileFingerprint) -> Optional[str]:
+        entry = self._entries.get(str(file))
+        if not entry:
+            return None
+
+        if FileFingerprint(entry["inode"], entry["mtime_ns"], entry["size"]) != fingerprint:
+            return None
+
+        return entry["sha256"]
+
+    def set(self, file: Path, fingerprint: FileFingerprint, sha256: str) -> None:
+        with self._lock:
+            self._entries[str(file)] = {
+                "inode": fingerprint.inode,
+                "mtime_ns": fingerprint.mtime_ns,
+                "size": fingerprint.size,
+                "sha256": sha256,
+            }
+
+    def save(self) -> None:
+        if not self._path:
+            return
+
+        with self._lock:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self._path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(self._entries))
+            tmp_path.replace(self._path)
+
+
+class FileHasher:
+    def __init__(self, cache: Optional[HashCache] = None) -> None:
+        self._cache = cache or HashCache()
+
+    def hash(self, file: Path) -> str:
+        fingerprint = FileFingerprint.from_stat(file.stat())
+
+        cached = self._cache.get(file, fingerprint)
+        if cached:
+            return cached
+
+        sha256 = hash_file(file)
+        self._cache.set(file, fingerprint, sha256)
+        return sha256
+
+    def save(self) -> None:
+        self._cache.save()
+
+
+def hash_file(file: Path) -> str:
+    digest = hashlib.sha256()
+
+    with file.open("rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
@@ -0,0 +1,115 @@
+import re
+from pathlib import Path
+from typing import Iterable, List, Optional, Pattern, Sequence, Tuple
+
+
+def _translate(pattern: str) -> str:
+    """
+    Translates a gitignore glob into a regular expression matching paths relative to the base directory.
+    """
+    # a slash at the beginning or in the middle anchors the pattern to the base directory
+    anchored = "/" in pattern
+    pattern = pattern[1:] if pattern.startswith("/") else pattern
+
+    parts: List[str] = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i) and (i == 0 or pattern[i - 1] == "/"):
+            parts.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            parts.append("/.*")
+            i += 3
+        elif pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            parts.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            parts.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 2 :]:
+            end = pattern.index("]", i + 2)
+            characters = pattern[i + 1 : end].replace("\\", "\\\\")
+            if characters.startswith("!"):
+                characters = "^" + characters[1:]
+            parts.append(f"[{characters}]")
+            i = end + 1
+        elif pattern[i] == "\\" and i + 1 < len(pattern):
+            parts.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+
+    return ("" if anchored else "(?:.*/)?") + "".join(parts) + "$"
+
+
+class IgnoreRules:
+    """
+    Gitignore-style rules, usually read from a `.deployignore` file in the deployed directory:
+    `#` comments, `*`, `?`, `[...]` and `**` globs, anchored patterns (with a `/` at the start or in
+    the middle), directory-only patterns (with a trailing `/`) and `!` negation. The last
+    matching rule wins.
+
+    Rules are compiled once: every run of rules with the same negation becomes one regular
+    expression for directories and one for files. Collectors do not descend into ignored
+    directories, so paths below them never have to be matched.
+    """
+
+    FILE_NAME = ".deployignore"
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        # (negated, expression for directories, expression for files), in order of the rules
+        self._groups: List[Tuple[bool, Optional[Pattern[str]], Optional[Pattern[str]]]] = []
+
+        runs: List[Tuple[bool, List[str], List[str]]] = []
+        for line in patterns:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+
+            negated = line.startswith("!")
+            line = line[1:] if negated else line
+            directory_only = line.endswith("/")
+            expression = _translate(line.rstrip("/"))
+
+            if not runs or runs[-1][0] != negated:
+                runs.append((negated, [], []))
+            runs[-1][1].append(expression)
+            if not directory_only:
+                runs[-1][2].append(expression)
+
+        for negated, for_directories, for_files in runs:
+            self._groups.append((negated, self._compile(for_directories), self._compile(for_files)))
+
+    @classmethod
+    def load(cls, base_dir: Path, default: Sequence[str] = ()) -> "IgnoreRules":
+        """
+        Reads `.deployignore` from `base_dir`, or uses `default` rules when there is none. The
+        rules file itself is never deployed.
+        """
+        try:
+            patterns = (base_dir / cls.FILE_NAME).read_text().splitlines()
+        except FileNotFoundError:
+            patterns = list(default)
+
+        return cls([f"/{cls.FILE_NAME}"] + patterns)
+
+    def is_ignored(self, relative_path: str, is_dir: bool) -> bool:
+        """
+        `relative_path` is relative to the base directory, with `/` as the separator.
+        """
+        for negated, for_directories, for_files in reversed(self._groups):
+            expression = for_directories if is_dir else for_files
+            if expression is not None and expression.match(relative_path):
+                return not negated
+
+        return False
+
+    @staticmethod
+    def _compile(expressions: List[str]) -> Optional[Pattern[str]]:
+        if not expressions:
+            return None
+        return re.compile("|".join(f"(?:{expression})" for expression in expressions))
@@ -0,0 +1,197 @@
+import json
+import os
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from szymonmiks_deployment.hashing import FileHasher
+from szymonmiks_deployment.logger import LoggerFactory
+from szymonmiks_deployment.pipeline import DeploymentFile, IDeploymentStage
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # pragma: no cover
+    Image = None  # type: ignore
+
+ImageJob = Tuple[str, str, Tuple[int, ...]]
+
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+
+
+def _save(image: "Image.Image", target: Path, image_format: str) -> None:
+    tmp_target = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+
+    if image_format == "JPEG":
+        image.convert("RGB").save(tmp_target, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    elif image_format == "WEBP":
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA")
+        image.save(tmp_target, "WEBP", quality=WEBP_QUALITY, method=6)
+    else:
+        image.save(tmp_target, "PNG", optimize=True)
+
+    os.replace(tmp_target, target)
+
+
+def _optimize(job: ImageJob) -> bool:
+    """
+    Returns False, without writing the index, for a file Pillow can not read.
+    """
+    source, cache_prefix, widths = job
+    prefix = Path(cache_prefix)
+    suffix = Path(source).suffix.lower()
+    image_format = "PNG" if suffix == ".png" else "JPEG"
+    webp = features.check("webp")
+    produced = {}
+
+    try:
+        with Image.open(source) as original:
+            # metadata is dropped by re-encoding, but the orientation it carried has to be applied first
+            image = ImageOps.exif_transpose(original)
+            image.info.pop("exif", None)
+
+            _save(image, prefix.with_name(f"{prefix.name}{suffix}"), image_format)
+            produced["original"] = f"{prefix.name}{suffix}"
+            if webp:
+                _save(image, prefix.with_name(f"{prefix.name}.webp"), "WEBP")
+                produced["original.webp"] = f"{prefix.name}.webp"
+
+            for width in widths:
+                if width >= image.width:
+                    continue
+
+                height = round(image.height * width / image.width)
+                resized = image.resize((width, height), Image.Resampling.LANCZOS)
+                _save(resized, prefix.with_name(f"{prefix.name}-{width}w{suffix}"), image_format)
+                produced[f"{width}w"] = f"{prefix.name}-{width}w{suffix}"
+                if webp:
+                    _save(resized, prefix.with_name(f"{prefix.name}-{width}w.webp"), "WEBP")
+                    produced[f"{width}w.webp"] = f"{prefix.name}-{width}w.webp"
+    except (OSError, Image.DecompressionBombError):
+        # e.g. a truncated file, variants written so far are never used without the index
+        return False
+
+    # the index is written last, its presence means every variant is complete
+    prefix.with_name(f"{prefix.name}.json").write_text(json.dumps(produced))
+    return True
+
+
+class ImageOptimizationStage(IDeploymentStage):
+    """
+    Recompresses JPEG/PNG images without metadata and adds width-limited variants (and WebP versions
+    when Pillow supports it), e.g. `img/cover.jpg` -> `img/cover-640w.jpg`, `img/cover-640w.webp`.
+    Results are cached in `cache_dir` under the source content hash, so only new images are processed.
+    Files Pillow can not read are deployed unchanged.
+    """
+
+    IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png"}
+    RESPONSIVE_WIDTHS = (640, 1280)
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        hasher: FileHasher,
+        widths: Sequence[int] = RESPONSIVE_WIDTHS,
+        workers: Optional[int] = None,
+    ) -> None:
+        self._cache_dir = cache_dir
+        self._hasher = hasher
+        self._widths = tuple(sorted(widths))
+        self._workers = workers
+        self._logger = LoggerFactory.create(__name__)
+
+    def process(self, files: List[DeploymentFile]) -> List[DeploymentFile]:
+        if Image is None:
+            self._logger.warning("Pillow is not installed, images are deployed as they are")
+            return files
+
+        self._cache_dir.mkdir(parents=True, exist_ok=True)
+
+        images: Dict[DeploymentFile, Path] = {}
+        jobs: Dict[Path, ImageJob] = {}
+        for file in files:
+            if file.is_dir or file.local_path.suffix.lower() not in self.IMAGE_SUFFIXES:
+                continue
+
+            sha256 = self._hasher.hash(file.local_path)
+            prefix = self._cache_dir / f"{sha256}-{'-'.join(map(str, self._widths))}"
+            images[file] = prefix
+            if not prefix.with_name(f"{prefix.name}.json").is_file():
+                jobs[prefix] = (str(file.local_path), str(prefix), self._widths)
+
+        if jobs:
+            self._logger.info(f"Optimizing {len(jobs)} image(s), {len(images) - len(jobs)} taken from cache")
+            with ProcessPoolExecutor(max_workers=self._workers) as executor:
+                succeeded = dict(zip(jobs, executor.map(_optimize, jobs.values())))
+
+            for file, prefix in list(images.items()):
+                if not succeeded.get(prefix, True):
+                    self._logger.warning(f"{file.local_path} could not be read as an image, deploying it unchanged")
+                    del images[file]
+
+        # e.g. `cover.jpg` and `cover.png` next to each other would both get `cover.webp`
+        stems = Counter((file.remote_path.parent, file.remote_path.stem) for file in images)
+
+        result = []
+        saved_per_post: Dict[str, int] = defaultdict(int)
+        for file in files:
+            cache_prefix = images.get(file)
+            if cache_prefix is None:
+                result.append(file)
+                continue
+
+            optimized, variants = self._outputs(
+                file, cache_prefix, stems[(file.remote_path.parent, file.remote_path.stem)] > 1
+            )
+            result.append(optimized)
+            result.extend(variants)
+            saved_per_post[self._post_of(file.remote_path)] += (
+                file.local_path.stat().st_size - optimized.local_path.stat().st_size
+            )
+
+        for post, saved in sorted(saved_per_post.items()):
+            self._logger.info(f"Images of {post} are {saved} bytes smaller")
+        self._logger.info(f"Image optimization saved {sum(saved_per_post.values())} bytes in total")
+
+        return result
+
+    def _outputs(
+        self, file: DeploymentFile, prefix: Path, shared_stem: bool
+    ) -> Tuple[DeploymentFile, List[DeploymentFile]]:
+        """
+        With `shared_stem`, another image differs only in its suffix, so WebP names keep the source suffix,
+        e.g. `cover.jpg.webp`.
+        """
+        produced: Dict[str, str] = json.loads(prefix.with_name(f"{prefix.name}.json").read_text())
+        stem = file.remote_path.stem
+        suffix = file.remote_path.suffix
+        webp_suffix = f"{suffix}.webp" if shared_stem else ".webp"
+
+        optimized_path = self._cache_dir / produced.pop("original")
+        # recompression does not always win, e.g. for already optimized PNGs
+        if optimized_path.stat().st_size < file.local_path.stat().st_size:
+            optimized = DeploymentFile(optimized_path, file.remote_path)
+        else:
+            optimized = file
+
+        variants = []
+        for variant, cache_name in produced.items():
+            if variant == "original.webp":
+                name = f"{stem}{webp_suffix}"
+            elif variant.endswith(".webp"):
+                name = f"{stem}-{variant[: -len('.webp')]}{webp_suffix}"
+            else:
+                name = f"{stem}-{variant}{suffix}"
+            variants.append(DeploymentFile(self._cache_dir / cache_name, file.remote_path.with_name(name)))
+
+        return optimized, variants
+
+    @staticmethod
+    def _post_of(remote_path: Path) -> str:
+        # page bundles keep their images in `<post>/img/`
+        parent = remote_path.parent
+        if parent.name == "img":
+            parent = parent.parent
+        return parent.as_posix()
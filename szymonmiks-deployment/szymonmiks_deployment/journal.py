@@ -0,0 +1,78 @@
+import json
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Optional, TextIO
+
+from szymonmiks_deployment.hashing import FileHasher
+from szymonmiks_deployment.logger import LoggerFactory
+
+
+class DeploymentJournal:
+    """
+    Append-only record of files confirmed on the remote during the current deployment, one JSON
+    line per upload. It survives a dropped connection, so the next run can resume where this one
+    stopped, and is removed once the deployment finishes.
+    """
+
+    def __init__(self, path: Path, hasher: FileHasher) -> None:
+        self._path = path
+        self._hasher = hasher
+        self._file: Optional[TextIO] = None
+        self._lock = Lock()
+        self._logger = LoggerFactory.create(__name__)
+
+    def start(self, resume: bool = False) -> Dict[str, str]:
+        """
+        Opens the journal and returns uploads confirmed by the previous, unfinished run when resuming.
+        """
+        completed = self._load() if resume else {}
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self._path, "a" if resume else "w")
+
+        if resume:
+            self._logger.info(f"Resuming deployment, {len(completed)} file(s) already uploaded")
+        return completed
+
+    def is_completed(self, completed: Dict[str, str], local_path: Path, remote_path: Path) -> bool:
+        sha256 = completed.get(remote_path.as_posix())
+        return sha256 is not None and sha256 == self._hasher.hash(local_path)
+
+    def record(self, local_path: Path, remote_path: Path) -> None:
+        line = json.dumps({"path": remote_path.as_posix(), "sha256": self._hasher.hash(local_path)})
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def finish(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        self._path.unlink(missing_ok=True)
+
+    def close(self) -> None:
+        """
+        Closes the journal but keeps it, so a failed deployment can be resumed.
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _load(self) -> Dict[str, str]:
+        completed: Dict[str, str] = {}
+        try:
+            with open(self._path) as journal:
+                for line in journal:
+                    try:
+                        entry = json.loads(line)
+                        completed[entry["path"]] = entry["sha256"]
+                    except (ValueError, KeyError):
+                        # the last line may be cut short if the process was killed while writing it
+                        continue
+        except FileNotFoundError:
+            self._logger.info("No journal of a previous deployment, starting from scratch")
+
+        return completed
@@ -1,18 +1,153 @@
+import atexit
+import json
 import logging
+import os
+import queue
 import sys
-from logging import Logger
+import time
+from logging import Logger, LogRecord
+from logging.handlers import QueueHandler, QueueListener
+from threading import Lock, RLock
+from typing import Dict, Optional, Set, Tuple
+
+ROOT_LOGGER_NAME = "szymonmiks_deployment"
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One compact JSON object per line, easy to ship to a log collector.
+    """
+
+    def format(self, record: LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+
+        return json.dumps(entry, separators=(",", ":"))
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets through at most `limit` records per `interval` seconds from every logging call site,
+    e.g. the line logged for each uploaded file. The first record after a window with dropped
+    records tells how many were suppressed. Warnings and errors are never dropped.
+    """
+
+    def __init__(self, limit: int = 20, interval: float = 1.0) -> None:
+        super().__init__()
+        self._limit = limit
+        self._interval = interval
+        # call site -> (start of the current window, records let through in it, records suppressed)
+        self._windows: Dict[Tuple[str, int], Tuple[float, int, int]] = {}
+        self._lock = Lock()
+
+    def filter(self, record: LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+
+        now = time.monotonic()
+        key = (record.pathname, record.lineno)
+        with self._lock:
+            start, passed, suppressed = self._windows.get(key, (now, 0, 0))
+            if now - start >= self._interval:
+                start, passed = now, 0
+
+            if passed >= self._limit:
+                self._windows[key] = (start, passed, suppressed + 1)
+                return False
+
+            self._windows[key] = (start, passed + 1, 0)
+
+        if suppressed:
+            record.msg = f"{record.getMessage()} ({suppressed} similar message(s) suppressed)"
+            record.args = None
+        return True
 
 
 class LoggerFactory:
+    """
+    Handlers are configured once, on the package logger and on loggers created for names outside
+    of the package. Records are put on a queue by the logging thread and written to stdout by a
+    background listener, so a worker uploading files never waits for the terminal.
+    """
+
+    _listener: Optional[QueueListener] = None
+    _handler: Optional[QueueHandler] = None
+    _logger_names: Set[str] = {ROOT_LOGGER_NAME}
+    _lock = RLock()
+
     @staticmethod
     def create(logger_name: str, logging_level: int = logging.INFO) -> Logger:
-        handler = logging.StreamHandler(sys.stdout)
-        formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+        with LoggerFactory._lock:
+            if LoggerFactory._listener is None:
+                LoggerFactory.configure()
 
-        logger = logging.getLogger(logger_name)
+            if not LoggerFactory._is_handled(logger_name):
+                LoggerFactory._logger_names.add(logger_name)
+                LoggerFactory._attach(logging.getLogger(logger_name))
 
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
+        logger = logging.getLogger(logger_name)
         logger.setLevel(logging_level)
 
         return logger
+
+    @staticmethod
+    def configure(json_format: Optional[bool] = None, rate_limit: int = 20) -> None:
+        """
+        (Re)configures logging of the whole package. By default the format is taken from the
+        LOG_FORMAT environment variable, `text` or `json`.
+        """
+        if json_format is None:
+            json_format = os.getenv("LOG_FORMAT", "text").lower() == "json"
+
+        handler = logging.StreamHandler(sys.stdout)
+        if json_format:
+            handler.setFormatter(JsonFormatter())
+        else:
+            handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+
+        records: "queue.SimpleQueue[LogRecord]" = queue.SimpleQueue()
+        queue_handler = QueueHandler(records)
+        queue_handler.addFilter(RateLimitFilter(rate_limit))
+
+        with LoggerFactory._lock:
+            if LoggerFactory._listener is not None:
+                LoggerFactory._listener.stop()
+
+            old_handler, LoggerFactory._handler = LoggerFactory._handler, queue_handler
+            for logger_name in LoggerFactory._logger_names:
+                logger = logging.getLogger(logger_name)
+                if old_handler is not None:
+                    logger.removeHandler(old_handler)
+                LoggerFactory._attach(logger)
+
+            LoggerFactory._listener = QueueListener(records, handler)
+            LoggerFactory._listener.start()
+
+    @staticmethod
+    def shutdown() -> None:
+        with LoggerFactory._lock:
+            if LoggerFactory._listener is not None:
+                LoggerFactory._listener.stop()
+                LoggerFactory._listener = None
+
+    @staticmethod
+    def _is_handled(logger_name: str) -> bool:
+        return any(logger_name == name or logger_name.startswith(f"{name}.") for name in LoggerFactory._logger_names)
+
+    @staticmethod
+    def _attach(logger: Logger) -> None:
+        if LoggerFactory._handler is not None:
+            logger.addHandler(LoggerFactory._handler)
+        # records are written by the handler above, not again by handlers of the root logger
+        logger.propagate = False
+
+
+# writes out records still in the queue when the program exits
+atexit.register(LoggerFactory.shutdown)
@@ -0,0 +1,88 @@
+import json
+import tempfile
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterator, Set
+
+from szymonmiks_deployment.ftp_client import IFTPClient
+from szymonmiks_deployment.logger import LoggerFactory
+
+
+@dataclass(frozen=True)
+class ManifestEntry:
+    size: int
+    mtime: float
+    sha256: str
+
+
+class Manifest:
+    def __init__(self, entries: Dict[str, ManifestEntry]) -> None:
+        self._entries = entries
+
+    @classmethod
+    def empty(cls) -> "Manifest":
+        return cls({})
+
+    @classmethod
+    def from_json(cls, raw: str) -> "Manifest":
+        data = json.loads(raw)
+        return cls({path: ManifestEntry(**entry) for path, entry in data["files"].items()})
+
+    def to_json(self) -> str:
+        return json.dumps({"files": {path: asdict(entry) for path, entry in sorted(self._entries.items())}})
+
+    def add(self, remote_path: Path, entry: ManifestEntry) -> None:
+        self._entries[remote_path.as_posix()] = entry
+
+    def remove(self, remote_path: Path) -> None:
+        self._entries.pop(remote_path.as_posix(), None)
+
+    def get(self, remote_path: Path) -> ManifestEntry:
+        return self._entries[remote_path.as_posix()]
+
+    def has_changed(self, remote_path: Path, entry: ManifestEntry) -> bool:
+        current = self._entries.get(remote_path.as_posix())
+        if not current:
+            return True
+
+        return current.size != entry.size or current.sha256 != entry.sha256
+
+    def directories(self) -> Set[str]:
+        result = set()
+        for path in self._entries:
+            parent = Path(path).parent
+            while parent != Path("."):
+                result.add(parent.as_posix())
+                parent = parent.parent
+
+        return result
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RemoteManifestStore:
+    FILE_NAME = ".deploy-manifest.json"
+
+    def __init__(self, client: IFTPClient) -> None:
+        self._client = client
+        self._logger = LoggerFactory.create(__name__)
+
+    def load(self) -> Manifest:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            local_path = Path(tmp_dir) / self.FILE_NAME
+            try:
+                self._client.get(Path(self.FILE_NAME), local_path)
+                return Manifest.from_json(local_path.read_text())
+            except (IOError, ValueError, KeyError):
+                self._logger.info("Remote manifest not found or unreadable, every file will be uploaded")
+                return Manifest.empty()
+
+    def save(self, manifest: Manifest) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            local_path = Path(tmp_dir) / self.FILE_NAME
+            local_path.write_text(manifest.to_json())
+            self._client.put(local_path, Path(self.FILE_NAME))
@@ -0,0 +1,140 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from szymonmiks_deployment.hashing import FileHasher
+from szymonmiks_deployment.logger import LoggerFactory
+from szymonmiks_deployment.pipeline import DeploymentFile, IDeploymentStage
+
+try:
+    import minify_html
+except ImportError:  # pragma: no cover
+    minify_html = None  # type: ignore
+
+try:
+    import rcssmin
+except ImportError:  # pragma: no cover
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:  # pragma: no cover
+    rjsmin = None
+
+MinificationJob = Tuple[str, str]
+
+
+def _minify_html(code: str) -> str:
+    return minify_html.minify(
+        code,
+        minify_css=True,
+        minify_js=True,
+        keep_closing_tags=True,
+        keep_html_and_head_opening_tags=True,
+    )
+
+
+MINIFIERS: Dict[str, Callable[[str], str]] = {}
+if minify_html:
+    MINIFIERS[".html"] = _minify_html
+if rcssmin:
+    MINIFIERS[".css"] = rcssmin.cssmin
+if rjsmin:
+    MINIFIERS[".js"] = rjsmin.jsmin
+
+
+def _minify(job: MinificationJob) -> bool:
+    """
+    Returns False, without writing the target, for a file which is not valid UTF-8.
+    """
+    source, target = job
+    tmp_target = f"{target}.{os.getpid()}.tmp"
+    minifier = MINIFIERS[Path(source).suffix.lower()]
+
+    try:
+        with open(source, encoding="utf-8") as src:
+            code = src.read()
+    except UnicodeDecodeError:
+        return False
+
+    minified = minifier(code)
+
+    with open(tmp_target, "w", encoding="utf-8") as dst:
+        dst.write(minified)
+
+    os.replace(tmp_target, target)
+    return True
+
+
+class MinificationStage(IDeploymentStage):
+    """
+    Minifies HTML (with inline CSS/JS), CSS and JS files. Every file type needs its optional minifier:
+    `minify-html`, `rcssmin` and `rjsmin`, types without one are deployed as they are. Results are
+    cached in `cache_dir` under the source content hash.
+    """
+
+    def __init__(self, cache_dir: Path, hasher: FileHasher, workers: Optional[int] = None) -> None:
+        self._cache_dir = cache_dir
+        self._hasher = hasher
+        self._workers = workers
+        self._logger = LoggerFactory.create(__name__)
+
+    def process(self, files: List[DeploymentFile]) -> List[DeploymentFile]:
+        if not MINIFIERS:
+            self._logger.warning("No minifier is installed, files are deployed as they are")
+            return files
+
+        self._cache_dir.mkdir(parents=True, exist_ok=True)
+
+        targets: Dict[DeploymentFile, Path] = {}
+        jobs: Dict[Path, MinificationJob] = {}
+        for file in files:
+            if file.is_dir or not self._should_minify(file.local_path):
+                continue
+
+            target = self._cache_dir / f"{self._hasher.hash(file.local_path)}{file.local_path.suffix.lower()}"
+            targets[file] = target
+            if not target.is_file():
+                jobs[target] = (str(file.local_path), str(target))
+
+        if jobs:
+            self._logger.info(f"Minifying {len(jobs)} file(s), {len(targets) - len(jobs)} taken from cache")
+            with ProcessPoolExecutor(max_workers=self._workers) as executor:
+                succeeded = dict(zip(jobs, executor.map(_minify, jobs.values(), chunksize=16)))
+
+            for file, target in list(targets.items()):
+                if not succeeded.get(target, True):
+                    self._logger.warning(f"{file.local_path} is not valid UTF-8, deploying it unminified")
+                    del targets[file]
+
+        result = []
+        bytes_before = 0
+        bytes_after = 0
+        for file in files:
+            minified = targets.get(file)
+            if minified is None:
+                result.append(file)
+                continue
+
+            size = file.local_path.stat().st_size
+            minified_size = minified.stat().st_size
+            bytes_before += size
+
+            if minified_size < size:
+                result.append(DeploymentFile(minified, file.remote_path))
+                bytes_after += minified_size
+            else:
+                result.append(file)
+                bytes_after += size
+
+        self._logger.info(f"Minification: {bytes_before} bytes before, {bytes_after} bytes after")
+        return result
+
+    @staticmethod
+    def _should_minify(path: Path) -> bool:
+        name = path.name.lower()
+        if name.endswith(".min.css") or name.endswith(".min.js"):
+            return False
+
+        return path.suffix.lower() in MINIFIERS
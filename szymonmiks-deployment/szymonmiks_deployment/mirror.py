@@ -0,0 +1,85 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from szymonmiks_deployment.artifacts import is_artifact
+from szymonmiks_deployment.file_collector import IFileCollector
+from szymonmiks_deployment.ftp_client import IFTPClient, RemoteEntry
+from szymonmiks_deployment.logger import LoggerFactory
+from szymonmiks_deployment.pipeline import DeploymentFile
+
+
+class RemoteInventory:
+    """
+    Files and directories on the remote, taken from a single recursive listing. Tells which
+    remote files are already up to date, by size and modification time, and which are stale.
+    """
+
+    def __init__(self, entries: Iterable[RemoteEntry]) -> None:
+        self._entries: Dict[str, RemoteEntry] = {entry.path.as_posix(): entry for entry in entries}
+
+    @classmethod
+    def from_listing(cls, client: IFTPClient) -> "RemoteInventory":
+        return cls(client.list_tree())
+
+    def directories(self) -> List[str]:
+        return [path for path, entry in self._entries.items() if entry.is_dir]
+
+    def get(self, remote_path: Path) -> Optional[RemoteEntry]:
+        return self._entries.get(remote_path.as_posix())
+
+    def is_up_to_date(self, file: DeploymentFile) -> bool:
+        entry = self.get(file.remote_path)
+        if entry is None or entry.is_dir:
+            return False
+
+        stat = file.local_path.stat()
+        # SFTP keeps whole seconds only
+        return entry.size == stat.st_size and entry.mtime == int(stat.st_mtime)
+
+    def stale(self, files: Iterable[DeploymentFile], file_collector: IFileCollector) -> Tuple[List[Path], List[Path]]:
+        """
+        Returns remote files and directories that are not deployed anymore, directories deepest
+        first. Files the deployment keeps for itself and paths ignored by the collector (with
+        everything below them) are never stale.
+        """
+        deployed = {file.remote_path.as_posix() for file in files}
+        kept: Set[str] = set()
+        stale_files: List[Path] = []
+        stale_directories: List[Path] = []
+
+        for path, entry in sorted(self._entries.items(), key=lambda item: (item[0].count("/"), item[0])):
+            parent = path.rpartition("/")[0]
+            if parent in kept or is_artifact(path) or file_collector.is_ignored(path, entry.is_dir):
+                if entry.is_dir:
+                    kept.add(path)
+                continue
+
+            if path not in deployed:
+                (stale_directories if entry.is_dir else stale_files).append(entry.path)
+
+        return stale_files, stale_directories[::-1]
+
+
+class RemotePruner:
+    """
+    Deletes stale remote files in batches spread over parallel workers, then the emptied directories.
+    """
+
+    BATCH_SIZE = 200
+
+    def __init__(self, client: IFTPClient, workers: int = 1) -> None:
+        self._client = client
+        self._workers = workers
+        self._logger = LoggerFactory.create(__name__)
+
+    def prune(self, files: List[Path], directories: List[Path]) -> None:
+        batches = [files[start : start + self.BATCH_SIZE] for start in range(0, len(files), self.BATCH_SIZE)]
+        with ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="prune") as pool:
+            # consuming the results re-raises the first failure
+            list(pool.map(self._client.remove_files, batches))
+
+        if directories:
+            self._client.remove_directories(directories)
+
+        self._logger.info(f"Removed {len(files)} stale file(s) and {len(directories)} directories from the remote")
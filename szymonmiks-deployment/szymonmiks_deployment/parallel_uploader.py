@@ -0,0 +1,221 @@
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from threading import BoundedSemaphore, Lock
+from types import TracebackType
+from typing import List, Optional, Tuple, Type
+
+from szymonmiks_deployment.dedup import Deduplicator
+from szymonmiks_deployment.delta import DeltaTransfer
+from szymonmiks_deployment.deployment_report import DeploymentReport
+from szymonmiks_deployment.ftp_client import IFTPClient
+from szymonmiks_deployment.journal import DeploymentJournal
+from szymonmiks_deployment.logger import LoggerFactory
+from szymonmiks_deployment.remote_tree import RemoteTree
+from szymonmiks_deployment.retry import FailureBudgetExceededError, RetryPolicy
+
+
+class ParallelUploader:
+    """
+    Spreads file uploads across a bounded pool of worker threads. Directories are created
+    synchronously, so as long as they are passed before their children, a child upload is never
+    started before its parent directory exists.
+
+    With a `RemoteTree`, directories that already exist are skipped and missing ones are collected
+    and created in batches, flushed by the first file that needs one of them. Files waiting for a
+    directory that was not passed before them are held back until the next flush.
+
+    With a `Deduplicator`, files with already seen content are created on the server from the
+    uploaded copy once all uploads have finished. Copies of a file that failed to upload are
+    uploaded on their own instead.
+
+    Every file is retried on its own according to the `RetryPolicy`. A file that still fails is
+    recorded and skipped, other transfers go on. Once more than `failure_budget` files have
+    failed, `FailureBudgetExceededError` is raised and no further uploads are started.
+    """
+
+    DIRECTORY_BATCH_SIZE = 100
+    HELD_BACK_FILES_LIMIT = 1000
+
+    def __init__(
+        self,
+        client: IFTPClient,
+        workers: int = 1,
+        report: Optional[DeploymentReport] = None,
+        tree: Optional[RemoteTree] = None,
+        delta: Optional[DeltaTransfer] = None,
+        journal: Optional[DeploymentJournal] = None,
+        dedup: Optional[Deduplicator] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        failure_budget: int = 0,
+    ) -> None:
+        if workers < 1:
+            raise ValueError("`workers` must be a positive number!")
+
+        self._client = client
+        self._workers = workers
+        self._report = report or DeploymentReport()
+        self._tree = tree
+        self._delta = delta
+        self._journal = journal
+        self._dedup = dedup
+        self._retry_policy = retry_policy or RetryPolicy(attempts=1)
+        self._failure_budget = failure_budget
+        self._failed: List[Path] = []
+        self._budget_exceeded: Optional[FailureBudgetExceededError] = None
+        self._failures_lock = Lock()
+        self._pending_directories: List[Path] = []
+        self._pending_files: List[Tuple[Path, Path]] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots = BoundedSemaphore(workers * 4)
+        self._futures: List[Future] = []
+        self._logger = LoggerFactory.create(__name__)
+
+    def __enter__(self) -> "ParallelUploader":
+        if self._dedup:
+            self._dedup.reset()
+        if self._workers > 1:
+            self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="upload")
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_val: Optional[BaseException],
+        exc_tb: Optional[TracebackType],
+    ) -> None:
+        if self._executor:
+            self._executor.shutdown(wait=True, cancel_futures=exc_type is not None)
+            self._executor = None
+
+    def upload(self, local_path: Path, remote_path: Path) -> None:
+        if local_path.is_dir():
+            if self._tree is None:
+                with self._report.phase("mkdir"):
+                    self._client.put(local_path, remote_path)
+            elif remote_path not in self._tree:
+                self._pending_directories.append(remote_path)
+                if len(self._pending_directories) >= self.DIRECTORY_BATCH_SIZE:
+                    self._flush_directories()
+            return
+
+        if self._tree is not None and remote_path.parent not in self._tree:
+            if self._pending_directories:
+                # directories come in ahead of files, so the whole batch is known by now
+                self._flush_directories()
+
+            if remote_path.parent not in self._tree:
+                self._pending_files.append((local_path, remote_path))
+                if len(self._pending_files) >= self.HELD_BACK_FILES_LIMIT:
+                    self._flush_directories()
+                return
+
+        self._submit(local_path, remote_path)
+
+    def _flush_directories(self) -> None:
+        if self._tree is None:
+            return
+
+        directories, self._pending_directories = self._pending_directories, []
+        files, self._pending_files = self._pending_files, []
+
+        with self._report.phase("mkdir"):
+            self._tree.ensure(directories + [remote_path.parent for _, remote_path in files])
+
+        for local_path, remote_path in files:
+            self._submit(local_path, remote_path)
+
+    def _submit(self, local_path: Path, remote_path: Path) -> None:
+        if self._dedup and self._dedup.is_duplicate(local_path, remote_path):
+            return
+
+        self._schedule(local_path, remote_path)
+
+    @property
+    def failed(self) -> List[Path]:
+        """
+        Remote paths of files that could not be uploaded, within the failure budget.
+        """
+        return list(self._failed)
+
+    def _schedule(self, local_path: Path, remote_path: Path) -> None:
+        if self._budget_exceeded is not None:
+            raise self._budget_exceeded
+
+        if self._executor is None:
+            self._put(local_path, remote_path)
+            return
+
+        self._slots.acquire()
+        future = self._executor.submit(self._put, local_path, remote_path)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(future)
+
+    def _put(self, local_path: Path, remote_path: Path) -> None:
+        start = time.perf_counter()
+        try:
+            sent, retries = self._retry_policy.call(
+                lambda: self._send(local_path, remote_path), f"Upload of {remote_path}"
+            )
+        except Exception as error:
+            self._report.add_phase_time("put", time.perf_counter() - start)
+            self._fail(remote_path, error)
+            return
+        seconds = time.perf_counter() - start
+
+        if self._journal:
+            self._journal.record(local_path, remote_path)
+
+        self._report.add_phase_time("put", seconds)
+        self._report.record_transfer(remote_path, sent, seconds, retries)
+
+    def _send(self, local_path: Path, remote_path: Path) -> int:
+        sent = self._delta.upload(local_path, remote_path) if self._delta else None
+        if sent is None:
+            self._client.put(local_path, remote_path)
+            sent = local_path.stat().st_size
+            if self._delta:
+                self._delta.remember(local_path, remote_path)
+
+        return sent
+
+    def _fail(self, remote_path: Path, error: Exception) -> None:
+        self._report.record_failure(remote_path, error)
+        with self._failures_lock:
+            self._failed.append(remote_path)
+            if len(self._failed) <= self._failure_budget:
+                self._logger.error(f"Upload of {remote_path} has failed, skipping it: {error!r}")
+                return
+
+            if self._budget_exceeded is None:
+                self._budget_exceeded = FailureBudgetExceededError(
+                    f"{len(self._failed)} file(s) failed to upload, more than the budget of {self._failure_budget}"
+                )
+            budget_exceeded = self._budget_exceeded
+
+        raise budget_exceeded from error
+
+    def wait(self) -> None:
+        self._flush_directories()
+        self._wait_for_uploads()
+
+        if self._dedup:
+            self._link_duplicates(self._dedup)
+            self._wait_for_uploads()
+
+    def _wait_for_uploads(self) -> None:
+        futures, self._futures = self._futures, []
+        for future in futures:
+            future.result()
+
+    def _link_duplicates(self, dedup: Deduplicator) -> None:
+        with self._report.phase("link"):
+            linked, failed = dedup.link(set(self.failed))
+
+        for duplicate in failed:
+            self._schedule(duplicate.local_path, duplicate.remote_path)
+
+        for duplicate in linked:
+            if self._journal:
+                self._journal.record(duplicate.local_path, duplicate.remote_path)
+            self._report.record_deduplicated(duplicate.local_path.stat().st_size)
@@ -0,0 +1,25 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List
+
+
+@dataclass(frozen=True)
+class DeploymentFile:
+    local_path: Path
+    remote_path: Path
+
+    @property
+    def is_dir(self) -> bool:
+        return self.local_path.is_dir()
+
+
+class IDeploymentStage(ABC):
+    """
+    A step between the file collector and the upload. A stage may replace, add or drop files,
+    generated files are written outside of the collected tree and only their remote path is shared.
+    """
+
+    @abstractmethod
+    def process(self, files: List[DeploymentFile]) -> List[DeploymentFile]:
+        pass
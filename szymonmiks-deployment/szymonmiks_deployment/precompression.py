@@ -0,0 +1,90 @@
+import gzip
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from szymonmiks_deployment.hashing import FileHasher
+from szymonmiks_deployment.logger import LoggerFactory
+from szymonmiks_deployment.pipeline import DeploymentFile, IDeploymentStage
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    try:
+        import brotlicffi as brotli  # type: ignore
+    except ImportError:
+        brotli = None
+
+CompressionJob = Tuple[str, str, str]
+
+
+def _compress(job: CompressionJob) -> None:
+    source, target, encoding = job
+    tmp_target = f"{target}.{os.getpid()}.tmp"
+
+    if encoding == "gz":
+        with open(source, "rb") as src, open(tmp_target, "wb") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=9, mtime=0) as dst:
+                shutil.copyfileobj(src, dst)
+    else:
+        with open(source, "rb") as src, open(tmp_target, "wb") as dst:
+            dst.write(brotli.compress(src.read(), quality=11))
+
+    os.replace(tmp_target, target)
+
+
+class PrecompressionStage(IDeploymentStage):
+    """
+    Adds `.gz` (and `.br` when brotli is installed) siblings for text assets, so the web server can
+    serve them without compressing on every request. Compressed files are kept in `cache_dir` under
+    the source content hash, so unchanged files are never compressed twice.
+    """
+
+    COMPRESSIBLE_SUFFIXES = {".html", ".css", ".js", ".json", ".svg"}
+
+    def __init__(self, cache_dir: Path, hasher: FileHasher, workers: Optional[int] = None) -> None:
+        self._cache_dir = cache_dir
+        self._hasher = hasher
+        self._workers = workers
+        self._encodings = ["gz", "br"] if brotli else ["gz"]
+        self._logger = LoggerFactory.create(__name__)
+
+    def process(self, files: List[DeploymentFile]) -> List[DeploymentFile]:
+        self._cache_dir.mkdir(parents=True, exist_ok=True)
+
+        variants = []
+        jobs: Dict[Path, CompressionJob] = {}
+        for file in files:
+            if file.is_dir or file.local_path.suffix.lower() not in self.COMPRESSIBLE_SUFFIXES:
+                continue
+
+            sha256 = self._hasher.hash(file.local_path)
+            for encoding in self._encodings:
+                target = self._cache_dir / f"{sha256}.{encoding}"
+                if not target.is_file():
+                    jobs[target] = (str(file.local_path), str(target), encoding)
+
+                remote_path = file.remote_path.with_name(f"{file.remote_path.name}.{encoding}")
+                variants.append((file, DeploymentFile(target, remote_path)))
+
+        if jobs:
+            self._logger.info(f"Compressing {len(jobs)} file(s), {len(variants) - len(jobs)} taken from cache")
+            with ProcessPoolExecutor(max_workers=self._workers) as executor:
+                list(executor.map(_compress, jobs.values(), chunksize=16))
+
+        result = list(files)
+        saved = {encoding: 0 for encoding in self._encodings}
+        for source, variant in variants:
+            source_size = source.local_path.stat().st_size
+            variant_size = variant.local_path.stat().st_size
+
+            # a compressed variant bigger than the original is never worth serving
+            if variant_size < source_size:
+                result.append(variant)
+                saved[variant.local_path.suffix[1:]] += source_size - variant_size
+
+        for encoding, saved_bytes in saved.items():
+            self._logger.info(f"`.{encoding}` variants save {saved_bytes} bytes on the wire")
+        return result
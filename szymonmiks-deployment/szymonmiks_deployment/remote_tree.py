@@ -0,0 +1,55 @@
+from pathlib import Path
+from threading import Lock
+from typing import Iterable, List, Set
+
+from szymonmiks_deployment.ftp_client import IFTPClient
+from szymonmiks_deployment.logger import LoggerFactory
+
+
+class RemoteTree:
+    """
+    Directories known to exist on the remote, relative to the deployment root. Taken from a single
+    listing (or from the deploy manifest), so a directory that is already there costs no round-trip.
+    Safe to share between upload workers.
+    """
+
+    def __init__(self, client: IFTPClient, existing: Iterable[str] = ()) -> None:
+        self._client = client
+        self._existing: Set[str] = {Path(directory).as_posix() for directory in existing}
+        self._lock = Lock()
+        self._logger = LoggerFactory.create(__name__)
+
+    @classmethod
+    def from_listing(cls, client: IFTPClient) -> "RemoteTree":
+        return cls(client, [directory.as_posix() for directory in client.list_directories()])
+
+    def __contains__(self, directory: Path) -> bool:
+        return self._is_known(directory.as_posix())
+
+    def missing(self, directories: Iterable[Path]) -> List[Path]:
+        """
+        Returns directories, including their ancestors, that are not on the remote yet, parents first.
+        """
+        result: Set[str] = set()
+        for directory in directories:
+            while directory != Path(".") and not self._is_known(directory.as_posix()):
+                result.add(directory.as_posix())
+                directory = directory.parent
+
+        return sorted((Path(directory) for directory in result), key=lambda path: (len(path.parts), path))
+
+    def ensure(self, directories: Iterable[Path]) -> None:
+        """
+        Creates all missing directories with a single batched call.
+        """
+        with self._lock:
+            missing = self.missing(directories)
+            if not missing:
+                return
+
+            self._logger.info(f"Creating {len(missing)} missing remote directories")
+            self._client.make_directories(missing)
+            self._existing.update(directory.as_posix() for directory in missing)
+
+    def _is_known(self, directory: str) -> bool:
+        return directory in (".", "") or directory in self._existing
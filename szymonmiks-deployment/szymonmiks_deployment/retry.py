@@ -0,0 +1,61 @@
+import random
+import time
+from typing import Callable, Tuple, Type, TypeVar
+
+from paramiko import SSHException
+
+from szymonmiks_deployment.logger import LoggerFactory
+
+T = TypeVar("T")
+
+
+class FailureBudgetExceededError(Exception):
+    pass
+
+
+class RetryPolicy:
+    """
+    Retries a failed operation with exponential backoff and full jitter, so workers that failed
+    together (e.g. on a dropped connection) do not hammer the server again at the same moment.
+    Errors that another attempt can not fix, like a missing file, are raised right away.
+    """
+
+    RETRYABLE: Tuple[Type[BaseException], ...] = (OSError, EOFError, SSHException)
+    PERMANENT: Tuple[Type[BaseException], ...] = (FileNotFoundError, PermissionError, IsADirectoryError)
+
+    def __init__(
+        self,
+        attempts: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        if attempts < 1:
+            raise ValueError("`attempts` must be a positive number!")
+
+        self._attempts = attempts
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._sleep = sleep
+        self._logger = LoggerFactory.create(__name__)
+
+    def call(self, operation: Callable[[], T], description: str = "operation") -> Tuple[T, int]:
+        """
+        Returns the result of `operation` and the number of retries it took.
+        """
+        for attempt in range(self._attempts):
+            try:
+                return operation(), attempt
+            except self.PERMANENT:
+                raise
+            except self.RETRYABLE as error:
+                if attempt + 1 == self._attempts:
+                    raise
+
+                delay = random.uniform(0, min(self._max_delay, self._base_delay * 2**attempt))
+                self._logger.warning(
+                    f"{description} failed ({error!r}), retry {attempt + 1} of {self._attempts - 1} in {delay:.2f}s"
+                )
+                self._sleep(delay)
+
+        raise AssertionError("unreachable")
@@ -0,0 +1,45 @@
+from typing import Iterable, Iterator, List
+
+from szymonmiks_deployment.pipeline import DeploymentFile
+
+
+class UploadScheduler:
+    """
+    Orders uploads so parallel workers finish at about the same time: directories first, parents
+    before children, then files from the largest to the smallest (longest processing time first).
+    Small files end up at the back, where they fill the gaps left by the big ones.
+
+    Files are ordered within a bounded lookahead window, so uploads start while the rest of the
+    site is still being collected. Collectors yield every directory before its content, so a
+    directory never comes after its files.
+    """
+
+    LOOKAHEAD = 500
+
+    def __init__(self, lookahead: int = LOOKAHEAD) -> None:
+        if lookahead < 1:
+            raise ValueError("`lookahead` must be a positive number!")
+
+        self._lookahead = lookahead
+
+    def order(self, files: Iterable[DeploymentFile]) -> Iterator[DeploymentFile]:
+        window: List[DeploymentFile] = []
+        for file in files:
+            window.append(file)
+            if len(window) >= self._lookahead:
+                yield from self._order_window(window)
+                window = []
+
+        yield from self._order_window(window)
+
+    @staticmethod
+    def _order_window(files: List[DeploymentFile]) -> List[DeploymentFile]:
+        directories = sorted(
+            (file for file in files if file.is_dir), key=lambda file: (len(file.remote_path.parts), file.remote_path)
+        )
+        sizes = {file.remote_path: file.local_path.stat().st_size for file in files if not file.is_dir}
+        regular_files = sorted(
+            (file for file in files if not file.is_dir), key=lambda file: (-sizes[file.remote_path], file.remote_path)
+        )
+
+        return directories + regular_files
@@ -0,0 +1,112 @@
+import re
+import shlex
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+from szymonmiks_deployment.artifacts import ARTIFACT_DIRECTORIES, is_artifact
+from szymonmiks_deployment.file_collector import IFileCollector
+from szymonmiks_deployment.ftp_client import IFTPClient
+from szymonmiks_deployment.logger import LoggerFactory
+
+
+class VerificationError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class VerificationResult:
+    missing: List[str] = field(default_factory=list)
+    extra: List[str] = field(default_factory=list)
+    different: List[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        # extra files are reported, but they do not break the deployed site
+        return not self.missing and not self.different
+
+
+class RemoteVerifier:
+    """
+    Compares the remote tree with the expected sha256 of every file. All remote files are hashed
+    on the server by a single command and only the checksums travel over the connection, so the
+    cost grows with the number of files rather than with their size.
+
+    Paths ignored by the collector, e.g. the blog nested in the website, are not deployed by it and
+    are left out, like by the mirror pruner. Ignored directories are not hashed at all.
+    """
+
+    def __init__(self, client: IFTPClient, remote_dir: str) -> None:
+        self._client = client
+        self._remote_dir = remote_dir
+        self._logger = LoggerFactory.create(__name__)
+
+    def verify(self, expected: Dict[str, str], file_collector: IFileCollector) -> VerificationResult:
+        """
+        `expected` maps paths relative to the deployment root to sha256 of their content.
+        """
+        remote = dict(self._remote_checksums(file_collector))
+
+        result = VerificationResult(
+            missing=sorted(path for path in expected if path not in remote),
+            extra=sorted(path for path in remote if path not in expected),
+            different=sorted(path for path, sha256 in expected.items() if remote.get(path, sha256) != sha256),
+        )
+        self._logger.info(
+            f"Verified {len(remote)} remote file(s): {len(result.missing)} missing, {len(result.extra)} extra, "
+            f"{len(result.different)} different"
+        )
+        return result
+
+    def _remote_checksums(self, file_collector: IFileCollector) -> Iterator[Tuple[str, str]]:
+        if not self._client.has_shell_access():
+            raise VerificationError("Verification needs shell access to checksum files on the server")
+
+        ignored = self._ignored_directories(file_collector)
+        command = (
+            f"cd {shlex.quote(self._remote_dir)} && "
+            "if command -v sha256sum >/dev/null; then SHA256='sha256sum'; else SHA256='shasum -a 256'; fi && "
+            f"find . {self._pruned(list(ARTIFACT_DIRECTORIES) + ignored)} -type f -exec $SHA256 {{}} +"
+        )
+
+        for line in self._client.stream_command(command):
+            sha256, _, path = line.partition("  ")
+            if sha256.startswith("\\"):
+                # names with a backslash or a new line are escaped and flagged by a leading backslash
+                sha256 = sha256[1:]
+                path = re.sub(r"\\(.)", lambda match: "\n" if match.group(1) == "n" else match.group(1), path)
+
+            path = path[2:] if path.startswith("./") else path
+            if not is_artifact(path) and not file_collector.is_ignored(path, False):
+                yield path, sha256
+
+    def _ignored_directories(self, file_collector: IFileCollector) -> List[str]:
+        """
+        Returns the topmost remote directories ignored by the collector, everything below them is ignored too.
+        """
+        output = self._client.exec_command(
+            f"cd {shlex.quote(self._remote_dir)} && "
+            f"find . -mindepth 1 {self._pruned(ARTIFACT_DIRECTORIES)} -type d -print0"
+        )
+        directories = sorted(
+            (path[2:] for path in output.split("\0") if path), key=lambda path: (path.count("/"), path)
+        )
+
+        ignored: List[str] = []
+        below_ignored: Set[str] = set()
+        for path in directories:
+            if path.rpartition("/")[0] in below_ignored:
+                below_ignored.add(path)
+            elif file_collector.is_ignored(path, True):
+                ignored.append(path)
+                below_ignored.add(path)
+
+        return ignored
+
+    @staticmethod
+    def _pruned(directories: Iterable[str]) -> str:
+        # `-path` takes a pattern, so wildcards in directory names are escaped
+        patterns = [re.sub(r"([*?\[\\])", r"\\\1", f"./{directory}") for directory in directories]
+        if not patterns:
+            return ""
+
+        return "\\( " + " -o ".join(f"-path {shlex.quote(pattern)}" for pattern in patterns) + " \\) -prune -o"
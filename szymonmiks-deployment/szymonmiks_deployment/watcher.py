@@ -0,0 +1,70 @@
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from szymonmiks_deployment.file_collector import IFileCollector
+from szymonmiks_deployment.logger import LoggerFactory
+
+Snapshot = Dict[Path, Tuple[bool, int, int]]
+
+
+class FileWatcher:
+    """
+    Polls the collected files for changes. Only stat calls are made, so a poll of a whole Hugo
+    site takes milliseconds. Changes are debounced: a batch is emitted once nothing has changed
+    for `debounce` seconds, so a site that is still being written is not pushed half way.
+    """
+
+    def __init__(self, file_collector: IFileCollector, interval: float = 0.2, debounce: float = 0.3) -> None:
+        self._file_collector = file_collector
+        self._interval = interval
+        self._debounce = debounce
+        self._snapshot: Optional[Snapshot] = None
+        self._logger = LoggerFactory.create(__name__)
+
+    def poll(self) -> List[Path]:
+        """
+        Returns files (and new directories) that appeared or changed since the previous poll.
+        The first poll only takes the snapshot.
+        """
+        snapshot: Snapshot = {}
+        for path in self._file_collector.iter_files():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            snapshot[path] = (path.is_dir(), stat.st_mtime_ns, stat.st_size)
+
+        previous, self._snapshot = self._snapshot, snapshot
+        if previous is None:
+            return []
+
+        return [
+            path
+            for path, state in snapshot.items()
+            if path not in previous or (not state[0] and previous[path] != state)
+        ]
+
+    def changes(self) -> Iterator[List[Path]]:
+        """
+        Yields batches of changed paths, every directory before its content, until interrupted.
+        """
+        self.poll()
+        self._logger.info(f"Watching {self._file_collector.base_dir} for changes")
+
+        pending: Dict[Path, None] = {}
+        last_change = 0.0
+        while True:
+            time.sleep(self._interval)
+
+            changed = self.poll()
+            if changed:
+                pending.update(dict.fromkeys(changed))
+                last_change = time.monotonic()
+                continue
+
+            if pending and time.monotonic() - last_change >= self._debounce:
+                batch = sorted(path for path in pending if path.exists())
+                pending = {}
+                if batch:
+                    yield batch
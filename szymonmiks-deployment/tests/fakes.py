@@ -0,0 +1,84 @@
+import os
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+from szymonmiks_deployment.ftp_client import IFTPClient, RemoteCommandError, RemoteEntry
+
+
+class LocalFTPClient(IFTPClient):
+    def __init__(self, root: Path, shell_access: bool = False) -> None:
+        self.root = root
+        self.shell_access = shell_access
+        self.uploaded: List[Path] = []
+        self.directory_batches: List[List[Path]] = []
+        self.removed: List[Path] = []
+
+    def get(self, remote_path: Path, local_path: Path) -> None:
+        shutil.copyfile(self.root / remote_path, local_path)
+
+    def put(self, local_path: Path, remote_path: Path) -> None:
+        self.uploaded.append(remote_path)
+
+        if local_path.is_dir():
+            (self.root / remote_path).mkdir(parents=True, exist_ok=True)
+            return
+
+        temp_path = self.root / remote_path.with_name(f".{remote_path.name}.deploy-tmp")
+        shutil.copyfile(local_path, temp_path)
+        temp_path.replace(self.root / remote_path)
+
+    def patch(self, remote_path: Path, blocks: List[Tuple[int, bytes]], size: int) -> None:
+        temp_path = self.root / remote_path.with_name(f".{remote_path.name}.deploy-tmp")
+        shutil.copyfile(self.root / remote_path, temp_path)
+        with open(temp_path, "r+b") as remote_file:
+            for offset, block in blocks:
+                remote_file.seek(offset)
+                remote_file.write(block)
+            remote_file.truncate(size)
+        temp_path.replace(self.root / remote_path)
+
+    def list_directories(self) -> List[Path]:
+        return [path.relative_to(self.root) for path in self.root.rglob("*") if path.is_dir()]
+
+    def make_directories(self, directories: List[Path]) -> None:
+        self.directory_batches.append(directories)
+        for directory in directories:
+            (self.root / directory).mkdir(exist_ok=True)
+
+    def list_tree(self) -> List[RemoteEntry]:
+        return [
+            RemoteEntry(path.relative_to(self.root), path.is_dir(), path.stat().st_size, int(path.stat().st_mtime))
+            for path in self.root.rglob("*")
+        ]
+
+    def remove_files(self, remote_paths: List[Path]) -> None:
+        self.removed.extend(remote_paths)
+        for remote_path in remote_paths:
+            (self.root / remote_path).unlink(missing_ok=True)
+
+    def remove_directories(self, directories: List[Path]) -> None:
+        self.removed.extend(directories)
+        for directory in directories:
+            (self.root / directory).rmdir()
+
+    def set_mtimes(self, mtimes: Dict[Path, float]) -> None:
+        for remote_path, mtime in mtimes.items():
+            os.utime(self.root / remote_path, (mtime, mtime))
+
+    def exec_command(self, command: str) -> str:
+        if not self.shell_access:
+            raise RemoteCommandError("This service allows sftp connections only.")
+
+        result = subprocess.run(command, shell=True, cwd=self.root, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RemoteCommandError(result.stderr)
+
+        return result.stdout
+
+    def stream_command(self, command: str) -> Iterator[str]:
+        yield from self.exec_command(command).splitlines()
+
+    def has_shell_access(self) -> bool:
+        return self.shell_access
@@ -48,3 +48,35 @@ def test_can_put_file_to_the_sftp_server(ftp_config: FTPConfig, ssh_client: SSHC
     sftp = ssh_client.open_sftp()
     assert upload_file.name in sftp.listdir(ftp_config.path)
     sftp.close()
+
+
+@pytest.mark.usefixtures("clean_up_sftp")
+def test_can_patch_file_on_the_sftp_server(ftp_config: FTPConfig, ssh_client: SSHClient, tmp_path: Path) -> None:
+    # given
+    local_path = tmp_path / "large.bin"
+    local_path.write_bytes(b"a" * 1000)
+    client = ParamikoFTPClient(ssh_client, ftp_config)
+    client.put(local_path, Path("large.bin"))
+
+    # when
+    client.patch(Path("large.bin"), [(0, b"bb"), (998, b"cccc")], 1002)
+
+    # then
+    sftp = ssh_client.open_sftp()
+    with sftp.open(f"{ftp_config.path}/large.bin") as remote_file:
+        assert remote_file.read() == b"bb" + b"a" * 996 + b"cccc"
+    assert sftp.listdir(ftp_config.path) == ["large.bin"]
+    sftp.close()
+
+
+def test_command_writing_much_to_stderr_does_not_block(ftp_config: FTPConfig, ssh_client: SSHClient) -> None:
+    # given
+    client = ParamikoFTPClient(ssh_client, ftp_config)
+    if not client.has_shell_access():
+        pytest.skip("The SFTP server allows sftp connections only")
+
+    # when
+    output = client.exec_command("head -c 8000000 /dev/zero | tr '\\0' x >&2; echo done")
+
+    # then
+    assert output == "done\n"
@@ -1,7 +1,7 @@
 import pytest
 from _pytest.monkeypatch import MonkeyPatch
 
-from szymonmiks_deployment.config import FTPConfig, FTPConfigError
+from szymonmiks_deployment.config import FTPConfig, FTPConfigError, TransferConfig
 
 
 def test_can_build_ftp_config_from_env(monkeypatch: MonkeyPatch) -> None:
@@ -10,6 +10,7 @@ def test_can_build_ftp_config_from_env(monkeypatch: MonkeyPatch) -> None:
     monkeypatch.setenv("FTP_USERNAME", "test_user")
     monkeypatch.setenv("FTP_PASSWORD", "test_password")
     monkeypatch.setenv("FTP_PATH", "test/path/foo/bar")
+    monkeypatch.setenv("SITE_URL", "https://szymonmiks.pl")
 
     # when
     config = FTPConfig.from_env_for_website()
@@ -20,6 +21,7 @@ def test_can_build_ftp_config_from_env(monkeypatch: MonkeyPatch) -> None:
     assert config.username == "test_user"
     assert config.password == "test_password"
     assert config.path == "test/path/foo/bar"
+    assert config.site_url == "https://szymonmiks.pl"
 
 
 def test_should_raise_an_exception_if_any_of_the_value_is_empty(monkeypatch: MonkeyPatch) -> None:
@@ -43,3 +45,47 @@ def test_should_raise_an_exception_if_missing_env(monkeypatch: MonkeyPatch) -> N
     # then
     with pytest.raises(FTPConfigError):
         FTPConfig.from_env_for_website()
+
+
+def test_transfer_config_is_read_from_env(monkeypatch: MonkeyPatch) -> None:
+    # given
+    monkeypatch.setenv("FTP_HOST", "test_host")
+    monkeypatch.setenv("FTP_USERNAME", "test_user")
+    monkeypatch.setenv("FTP_PASSWORD", "test_password")
+    monkeypatch.setenv("BLOG_FTP_PATH", "test/path/blog")
+    monkeypatch.setenv("SFTP_HIGH_THROUGHPUT", "true")
+    monkeypatch.setenv("SFTP_WINDOW_SIZE", "8388608")
+
+    # when
+    config = FTPConfig.from_env_for_blog()
+
+    # then
+    assert config.transfer.high_throughput
+    assert config.transfer.window_size == 8388608
+    assert config.transfer.buffer_size == TransferConfig().buffer_size
+
+
+def test_should_raise_an_exception_if_transfer_size_is_invalid(monkeypatch: MonkeyPatch) -> None:
+    # given
+    monkeypatch.setenv("SFTP_BUFFER_SIZE", "1MB")
+
+    # then
+    with pytest.raises(FTPConfigError):
+        TransferConfig.from_env()
+
+
+def test_mirrors_share_credentials_and_path_of_main_host(monkeypatch: MonkeyPatch) -> None:
+    # given
+    monkeypatch.setenv("FTP_MIRROR_HOSTS", "mirror-1.example.com, mirror-2.example.com:2222")
+    config = FTPConfig(host="main.example.com", username="user", password="secret", path="/var/www")
+
+    # when
+    configs = config.with_mirrors_from_env()
+
+    # then
+    assert [(elem.host, elem.port) for elem in configs] == [
+        ("main.example.com", 22),
+        ("mirror-1.example.com", 22),
+        ("mirror-2.example.com", 2222),
+    ]
+    assert all(elem.path == "/var/www" and elem.password == "secret" for elem in configs)
@@ -0,0 +1,100 @@
+from pathlib import Path
+
+import pytest
+
+from szymonmiks_deployment.dedup import Deduplicator
+from szymonmiks_deployment.deployment_manager import DeploymentManager
+from szymonmiks_deployment.file_collector import BlogFileCollector
+from szymonmiks_deployment.hashing import FileHasher
+from szymonmiks_deployment.retry import RetryPolicy
+from tests.fakes import LocalFTPClient
+
+ICON = b"<svg>" + b"0" * 1000 + b"</svg>"
+
+
+@pytest.fixture
+def site_dir(tmp_path: Path) -> Path:
+    site_dir = tmp_path / "public"
+    for post in ("first", "second", "third"):
+        (site_dir / "p" / post).mkdir(parents=True)
+        (site_dir / "p" / post / "icon.svg").write_bytes(ICON)
+        (site_dir / "p" / post / "index.html").write_text(f"<html>{post}</html>")
+
+    return site_dir
+
+
+@pytest.fixture
+def remote_dir(tmp_path: Path) -> Path:
+    remote_dir = tmp_path / "remote"
+    remote_dir.mkdir()
+
+    return remote_dir
+
+
+def test_identical_files_are_uploaded_once_and_linked_on_server(site_dir: Path, remote_dir: Path) -> None:
+    # given
+    client = LocalFTPClient(remote_dir, shell_access=True)
+    hasher = FileHasher()
+    deduplicator = Deduplicator(client, str(remote_dir), hasher)
+    deployment_manager = DeploymentManager(
+        client, BlogFileCollector(site_dir), hasher, workers=2, deduplicator=deduplicator
+    )
+
+    # when
+    report = deployment_manager.deploy()
+
+    # then
+    assert [path for path in client.uploaded if path.name == "icon.svg"] == [Path("p/first/icon.svg")]
+    for post in ("first", "second", "third"):
+        assert (remote_dir / "p" / post / "icon.svg").read_bytes() == ICON
+    assert report.summary()["deduplicated_files"] == 2
+    assert report.summary()["deduplicated_bytes"] == 2 * len(ICON)
+    assert not list(remote_dir.rglob("*.deploy-link"))
+
+
+def test_identical_files_are_uploaded_separately_without_shell_access(site_dir: Path, remote_dir: Path) -> None:
+    # given
+    client = LocalFTPClient(remote_dir)
+    hasher = FileHasher()
+    deduplicator = Deduplicator(client, str(remote_dir), hasher)
+    deployment_manager = DeploymentManager(client, BlogFileCollector(site_dir), hasher, deduplicator=deduplicator)
+
+    # when
+    report = deployment_manager.deploy()
+
+    # then
+    assert len([path for path in client.uploaded if path.name == "icon.svg"]) == 3
+    assert report.summary()["deduplicated_files"] == 0
+
+
+class FailingFTPClient(LocalFTPClient):
+    def put(self, local_path: Path, remote_path: Path) -> None:
+        if remote_path == Path("p/first/icon.svg"):
+            raise EOFError("Connection dropped")
+        super().put(local_path, remote_path)
+
+
+def test_duplicates_of_failed_file_are_uploaded_instead_of_linked(site_dir: Path, remote_dir: Path) -> None:
+    # given
+    (remote_dir / "p" / "first").mkdir(parents=True)
+    (remote_dir / "p" / "first" / "icon.svg").write_bytes(b"<svg>old</svg>")
+    client = FailingFTPClient(remote_dir, shell_access=True)
+    hasher = FileHasher()
+    deduplicator = Deduplicator(client, str(remote_dir), hasher)
+    deployment_manager = DeploymentManager(
+        client,
+        BlogFileCollector(site_dir),
+        hasher,
+        deduplicator=deduplicator,
+        retry_policy=RetryPolicy(attempts=1),
+        failure_budget=1,
+    )
+
+    # when
+    report = deployment_manager.deploy()
+
+    # then
+    assert list(report.failures) == ["p/first/icon.svg"]
+    for post in ("second", "third"):
+        assert (remote_dir / "p" / post / "icon.svg").read_bytes() == ICON
+    assert report.summary()["deduplicated_files"] == 0
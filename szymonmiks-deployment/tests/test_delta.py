@@ -0,0 +1,92 @@
+import os
+import shutil
+from pathlib import Path
+
+from szymonmiks_deployment.delta import Delta, DeltaTransfer, Signature
+from tests.fakes import LocalFTPClient
+
+BLOCK_SIZE = 1024
+
+
+def test_delta_is_not_computed_for_rewritten_file() -> None:
+    # given
+    old = os.urandom(20 * BLOCK_SIZE)
+    new = os.urandom(20 * BLOCK_SIZE)
+
+    # when
+    delta = Delta.compute(new, Signature.of(old, BLOCK_SIZE), max_literal_bytes=5 * BLOCK_SIZE)
+
+    # then
+    assert delta is None
+
+
+def test_delta_of_file_with_inserted_bytes_reuses_shifted_blocks() -> None:
+    # given
+    old = os.urandom(20 * BLOCK_SIZE + 100)
+    new = old[: 5 * BLOCK_SIZE + 10] + b"inserted" + old[5 * BLOCK_SIZE + 10 :]
+
+    # when
+    delta = Delta.compute(new, Signature.of(old, BLOCK_SIZE))
+
+    # then
+    assert delta is not None
+    assert delta.literal_bytes < 2 * BLOCK_SIZE
+    rebuilt = b"".join(op if isinstance(op, bytes) else old[op.offset : op.offset + op.length] for op in delta.ops)
+    assert rebuilt == new
+
+
+def test_changed_blocks_are_applied_to_remote_file_with_shell_access(tmp_path: Path) -> None:
+    # given
+    remote_dir = tmp_path / "remote"
+    remote_dir.mkdir()
+    old = os.urandom(50 * BLOCK_SIZE)
+    (remote_dir / "cv.pdf").write_bytes(old)
+    local_file = tmp_path / "cv.pdf"
+    local_file.write_bytes(old[:BLOCK_SIZE] + b"changed" + old[BLOCK_SIZE:])
+    client = LocalFTPClient(remote_dir, shell_access=True)
+    delta_transfer = DeltaTransfer(client, str(remote_dir), threshold=BLOCK_SIZE, block_size=BLOCK_SIZE)
+
+    # when
+    sent = delta_transfer.upload(local_file, Path("cv.pdf"))
+
+    # then
+    assert sent is not None and sent < 3 * BLOCK_SIZE
+    assert (remote_dir / "cv.pdf").read_bytes() == local_file.read_bytes()
+    assert sorted(path.name for path in remote_dir.iterdir()) == ["cv.pdf"]
+
+
+def test_changed_blocks_are_written_in_place_using_stored_signature(tmp_path: Path) -> None:
+    # given
+    remote_dir = tmp_path / "remote"
+    remote_dir.mkdir()
+    local_file = tmp_path / "index.json"
+    local_file.write_bytes(os.urandom(50 * BLOCK_SIZE))
+    client = LocalFTPClient(remote_dir)
+    delta_transfer = DeltaTransfer(client, str(remote_dir), threshold=BLOCK_SIZE, block_size=BLOCK_SIZE)
+    shutil.copyfile(local_file, remote_dir / "index.json")
+    delta_transfer.remember(local_file, Path("index.json"))
+
+    # when
+    with open(local_file, "ab") as file:
+        file.write(b'{"title": "new post"}')
+    sent = delta_transfer.upload(local_file, Path("index.json"))
+
+    # then
+    assert sent == len(b'{"title": "new post"}')
+    assert (remote_dir / "index.json").read_bytes() == local_file.read_bytes()
+
+
+def test_file_without_remote_copy_is_not_sent_as_delta(tmp_path: Path) -> None:
+    # given
+    remote_dir = tmp_path / "remote"
+    remote_dir.mkdir()
+    local_file = tmp_path / "new.pdf"
+    local_file.write_bytes(os.urandom(4 * BLOCK_SIZE))
+    client = LocalFTPClient(remote_dir, shell_access=True)
+    delta_transfer = DeltaTransfer(client, str(remote_dir), threshold=BLOCK_SIZE, block_size=BLOCK_SIZE)
+
+    # when
+    sent = delta_transfer.upload(local_file, Path("new.pdf"))
+
+    # then
+    assert sent is None
@@ -0,0 +1,331 @@
+import gzip
+from pathlib import Path
+from typing import Dict, List
+
+import pytest
+
+from szymonmiks_deployment.archive_deployer import ArchiveDeployer
+from szymonmiks_deployment.deployment_manager import DeploymentManager, DeploymentStrategy
+from szymonmiks_deployment.file_collector import BlogFileCollector
+from szymonmiks_deployment.hashing import FileHasher
+from szymonmiks_deployment.ignore_rules import IgnoreRules
+from szymonmiks_deployment.journal import DeploymentJournal
+from szymonmiks_deployment.manifest import RemoteManifestStore
+from szymonmiks_deployment.pipeline import IDeploymentStage
+from szymonmiks_deployment.precompression import PrecompressionStage
+from szymonmiks_deployment.retry import FailureBudgetExceededError, RetryPolicy
+from tests.fakes import LocalFTPClient
+
+
+class DroppingFTPClient(LocalFTPClient):
+    def __init__(self, root: Path, drop_after: int) -> None:
+        super().__init__(root)
+        self.drop_after = drop_after
+
+    def put(self, local_path: Path, remote_path: Path) -> None:
+        if (
+            local_path.is_file()
+            and len([path for path in self.uploaded if (self.root / path).is_file()]) == self.drop_after
+        ):
+            raise EOFError("Connection dropped")
+        super().put(local_path, remote_path)
+
+
+class FlakyFTPClient(LocalFTPClient):
+    def __init__(self, root: Path, failures: Dict[str, int]) -> None:
+        super().__init__(root)
+        self.failures = failures
+
+    def put(self, local_path: Path, remote_path: Path) -> None:
+        if self.failures.get(remote_path.as_posix(), 0) > 0:
+            self.failures[remote_path.as_posix()] -= 1
+            raise EOFError("Connection dropped")
+        super().put(local_path, remote_path)
+
+
+@pytest.fixture
+def site_dir(tmp_path: Path) -> Path:
+    site_dir = tmp_path / "public"
+    (site_dir / "css").mkdir(parents=True)
+    (site_dir / "index.html").write_text("<html></html>")
+    (site_dir / "css" / "style.css").write_text("body {}")
+
+    return site_dir
+
+
+@pytest.fixture
+def remote_dir(tmp_path: Path) -> Path:
+    remote_dir = tmp_path / "remote"
+    remote_dir.mkdir()
+
+    return remote_dir
+
+
+def test_can_deploy_all_files(site_dir: Path, remote_dir: Path) -> None:
+    # given
+    client = LocalFTPClient(remote_dir)
+    deployment_manager = DeploymentManager(client, BlogFileCollector(site_dir))
+
+    # when
+    deployment_manager.deploy()
+
+    # then
+    assert (remote_dir / "index.html").read_text() == "<html></html>"
+    assert (remote_dir / "css" / "style.css").read_text() == "body {}"
+
+
+def test_incremental_deploy_uploads_only_changed_files(site_dir: Path, remote_dir: Path) -> None:
+    # given
+    client = LocalFTPClient(remote_dir)
+    deployment_manager = DeploymentManager(client, BlogFileCollector(site_dir))
+    deployment_manager.deploy(incremental=True)
+    client.uploaded.clear()
+
+    # when
+    (site_dir / "index.html").write_text("<html>typo fixed</html>")
+    deployment_manager.deploy(incremental=True)
+
+    # then
+    assert client.uploaded == [Path("index.html"), Path(RemoteManifestStore.FILE_NAME)]
+    assert (remote_dir / "index.html").read_text() == "<html>typo fixed</html>"
+
+
+def test_incremental_deploy_after_full_deploy_compares_with_the_full_deploy(site_dir: Path, remote_dir: Path) -> None:
+    # given
+    client = LocalFTPClient(remote_dir)
+    deployment_manager = DeploymentManager(client, BlogFileCollector(site_dir))
+    deployment_manager.deploy(incremental=True)
+    (site_dir / "index.html").write_text("<html>draft</html>")
+    deployment_manager.deploy()
+
+    # when
+    (site_dir / "index.html").write_text("<html></html>")
+    deployment_manager.deploy(incremental=True)
+
+    # then
+    assert (remote_dir / "index.html").read_text() == "<html></html>"
+
+
+def test_can_deploy_files_in_parallel(site_dir: Path, remote_dir: Path) -> None:
+    # given
+    (site_dir / "post" / "first" / "img").mkdir(parents=True)
+    for index in range(20):
+        (site_dir / "post" / "first" / "img" / f"{index}.png").write_bytes(b"\x89PNG" * index)
+    client = LocalFTPClient(remote_dir)
+    deployment_manager = DeploymentManager(client, BlogFileCollector(site_dir), workers=4)
+
+    # when
+    deployment_manager.deploy()
+
+    # then
+    assert len(list((remote_dir / "post" / "first" / "img").iterdir())) == 20
+    assert (remote_dir / "index.html").is_file()
+
+
+def test_can_deploy_site_as_single_archive(site_dir: Path, remote_dir: Path) -> None:
+    # given
+    (remote_dir / "stale.html").write_text("<html>old</html>")
+    client = LocalFTPClient(remote_dir, shell_access=True)
+    archive_deployer = ArchiveDeployer(client, str(remote_dir))
+    deployment_manager = DeploymentManager(client, BlogFileCollector(site_dir), archive_deployer=archive_deployer)
+
+    # when
+    deployment_manager.deploy(strategy=DeploymentStrategy.ARCHIVE)
+
+    # then
+    assert (remote_dir / "index.html").read_text() == "<html></html>"
+    assert (remote_dir / "css" / "style.css").read_text() == "body {}"
+    assert (remote_dir / RemoteManifestStore.FILE_NAME).is_file()
+    assert (remote_dir / "stale.html").read_text() == "<html>old</html>"
+    assert not (remote_dir / ArchiveDeployer.ARCHIVE_NAME).exists()
+    assert not remote_dir.with_name("remote.staging").exists()
+
+
+def test_mirrored_archive_deploy_prunes_stale_files_but_keeps_ignored_ones(site_dir: Path, remote_dir: Path) -> None:
+    # given
+    (remote_dir / "stale.html").write_text("<html>old</html>")
+    (remote_dir / "blog" / "post").mkdir(parents=True)
+    (remote_dir / "blog" / "post" / "index.html").write_text("<html>post</html>")
+    (remote_dir / ".htaccess").write_text("Options -Indexes")
+    client = LocalFTPClient(remote_dir, shell_access=True)
+    archive_deployer = ArchiveDeployer(client, str(remote_dir))
+    file_collector = BlogFileCollector(site_dir, IgnoreRules(["blog", ".*"]))
+    deployment_manager = DeploymentManager(client, file_collector, archive_deployer=archive_deployer)
+
+    # when
+    deployment_manager.deploy(strategy=DeploymentStrategy.ARCHIVE, mirror=True)
+
+    # then
+    assert (remote_dir / "index.html").read_text() == "<html></html>"
+    assert not (remote_dir / "stale.html").exists()
+    assert (remote_dir / "blog" / "post" / "index.html").read_text() == "<html>post</html>"
+    assert (remote_dir / ".htaccess").read_text() == "Options -Indexes"
+
+
+def test_archive_deploy_falls_back_to_per_file_mode_without_shell_access(site_dir: Path, remote_dir: Path) -> None:
+    # given
+    client = LocalFTPClient(remote_dir, shell_access=False)
+    archive_deployer = ArchiveDeployer(client, str(remote_dir))
+    deployment_manager = DeploymentManager(client, BlogFileCollector(site_dir), archive_deployer=archive_deployer)
+
+    # when
+    deployment_manager.deploy(strategy=DeploymentStrategy.ARCHIVE)
+
+    # then
+    assert Path(ArchiveDeployer.ARCHIVE_NAME) not in client.uploaded
+    assert (remote_dir / "index.html").read_text() == "<html></html>"
+
+
+def test_deploy_returns_report_of_uploaded_files(site_dir: Path, remote_dir: Path) -> None:
+    # given
+    client = LocalFTPClient(remote_dir)
+    deployment_manager = DeploymentManager(client, BlogFileCollector(site_dir), workers=2)
+
+    # when
+    report = deployment_manager.deploy()
+
+    # then
+    summary = report.summary()
+    assert summary["files"] == 2
+    assert summary["bytes"] == len("<html></html>") + len("body {}")
+    assert {"collect", "mkdir", "put"} <= set(summary["phases_seconds"])
+
+
+def test_existing_remote_directories_are_not_created_again(site_dir: Path, remote_dir: Path) -> None:
+    # given
+    (site_dir / "post" / "first").mkdir(parents=True)
+    (site_dir / "post" / "first" / "index.html").write_text("<html>post</html>")
+    client = LocalFTPClient(remote_dir)
+    deployment_manager = DeploymentManager(client, BlogFileCollector(site_dir), workers=2)
+
+    # when
+    deployment_manager.deploy()
+    deployment_manager.deploy()
+
+    # then
+    assert client.directory_batches == [[Path("css"), Path("post"), Path("post/first")]]
+    assert (remote_dir / "post" / "first" / "index.html").read_text() == "<html>post</html>"
+
+
+def test_resumed_deploy_skips_files_uploaded_before_connection_dropped(
+    site_dir: Path, remote_dir: Path, tmp_path: Path
+) -> None:
+    # given
+    for index in range(5):
+        (site_dir / f"page-{index}.html").write_text(f"<html>{index}</html>")
+    hasher = FileHasher()
+    journal = DeploymentJournal(tmp_path / "journal.jsonl", hasher)
+    dropping_client = DroppingFTPClient(remote_dir, drop_after=3)
+    with pytest.raises(FailureBudgetExceededError):
+        DeploymentManager(
+            dropping_client, BlogFileCollector(site_dir), hasher, journal=journal, retry_policy=RetryPolicy(attempts=1)
+        ).deploy()
+    client = LocalFTPClient(remote_dir)
+
+    # when
+    DeploymentManager(client, BlogFileCollector(site_dir), hasher, journal=journal).deploy(resume=True)
+
+    # then
+    assert len([path for path in client.uploaded if path.suffix and path.name != RemoteManifestStore.FILE_NAME]) == 4
+    assert sorted(path.name for path in remote_dir.glob("*.html")) == [
+        "index.html",
+        "page-0.html",
+        "page-1.html",
+        "page-2.html",
+        "page-3.html",
+        "page-4.html",
+    ]
+    assert not (tmp_path / "journal.jsonl").exists()
+
+
+def test_watch_pushes_changed_files_over_the_same_session(site_dir: Path, remote_dir: Path) -> None:
+    # given
+    client = LocalFTPClient(remote_dir)
+    deployment_manager = DeploymentManager(client, BlogFileCollector(site_dir))
+    deployment_manager.deploy(incremental=True)
+    client.uploaded.clear()
+    (site_dir / "post").mkdir()
+    (site_dir / "post" / "index.html").write_text("<html>post</html>")
+
+    # when
+    deployment_manager.watch(changes=[[site_dir / "post", site_dir / "post" / "index.html"]])
+    deployment_manager.deploy(incremental=True)
+
+    # then
+    assert (remote_dir / "post" / "index.html").read_text() == "<html>post</html>"
+    manifest = Path(RemoteManifestStore.FILE_NAME)
+    assert client.uploaded == [Path("post/index.html"), manifest, manifest]
+
+
+def test_watch_skips_rewritten_files_with_unchanged_content(site_dir: Path, remote_dir: Path) -> None:
+    # given
+    client = LocalFTPClient(remote_dir)
+    deployment_manager = DeploymentManager(client, BlogFileCollector(site_dir))
+    deployment_manager.deploy(incremental=True)
+    client.uploaded.clear()
+    (site_dir / "index.html").write_text("<html></html>")
+    (site_dir / "css" / "style.css").write_text("body { color: red }")
+
+    # when
+    deployment_manager.watch(changes=[[site_dir / "css" / "style.css", site_dir / "index.html"]])
+
+    # then
+    assert client.uploaded == [Path("css/style.css"), Path(RemoteManifestStore.FILE_NAME)]
+
+
+def test_watch_runs_changed_files_through_stages(site_dir: Path, remote_dir: Path, tmp_path: Path) -> None:
+    # given
+    client = LocalFTPClient(remote_dir)
+    hasher = FileHasher()
+    stages: List[IDeploymentStage] = [PrecompressionStage(tmp_path / "compressed", hasher)]
+    deployment_manager = DeploymentManager(client, BlogFileCollector(site_dir), hasher, stages=stages)
+    deployment_manager.deploy(incremental=True)
+    client.uploaded.clear()
+
+    # when
+    (site_dir / "index.html").write_text("<html>" + "typo fixed " * 100 + "</html>")
+    deployment_manager.watch(changes=[[site_dir / "index.html"]])
+
+    # then
+    assert Path("index.html") in client.uploaded
+    assert gzip.decompress((remote_dir / "index.html.gz").read_bytes()) == (site_dir / "index.html").read_bytes()
+    assert Path("css/style.css") not in client.uploaded
+
+
+def test_transient_upload_errors_are_retried_per_file(site_dir: Path, remote_dir: Path) -> None:
+    # given
+    client = FlakyFTPClient(remote_dir, {"index.html": 2})
+    retry_policy = RetryPolicy(attempts=3, sleep=lambda _: None)
+    deployment_manager = DeploymentManager(client, BlogFileCollector(site_dir), retry_policy=retry_policy)
+
+    # when
+    report = deployment_manager.deploy()
+
+    # then
+    assert (remote_dir / "index.html").read_text() == "<html></html>"
+    assert report.summary()["retries"] == 2
+    assert report.failures == {}
+
+
+def test_deploy_goes_on_while_failures_fit_in_the_budget(site_dir: Path, remote_dir: Path, tmp_path: Path) -> None:
+    # given
+    client = FlakyFTPClient(remote_dir, {"index.html": 10})
+    hasher = FileHasher()
+    journal = DeploymentJournal(tmp_path / "journal.jsonl", hasher)
+    deployment_manager = DeploymentManager(
+        client,
+        BlogFileCollector(site_dir),
+        hasher,
+        journal=journal,
+        retry_policy=RetryPolicy(attempts=2, sleep=lambda _: None),
+        failure_budget=1,
+    )
+
+    # when
+    report = deployment_manager.deploy(incremental=True)
+
+    # then
+    assert list(report.failures) == ["index.html"]
+    assert (remote_dir / "css" / "style.css").read_text() == "body {}"
+    assert "index.html" not in RemoteManifestStore(client).load()
+    assert (tmp_path / "journal.jsonl").exists()
@@ -0,0 +1,57 @@
+import json
+from pathlib import Path
+
+from szymonmiks_deployment.deployment_report import DeploymentReport
+
+
+def test_summary_contains_latency_percentiles_and_slowest_files() -> None:
+    # given
+    report = DeploymentReport()
+    for index in range(1, 101):
+        report.record_transfer(Path(f"p/{index}.html"), 1024, index / 100)
+
+    # when
+    report.finish()
+    summary = report.summary()
+
+    # then
+    assert summary["files"] == 100
+    assert summary["bytes"] == 100 * 1024
+    assert summary["latency_p50_seconds"] == 0.5
+    assert summary["latency_p95_seconds"] == 0.95
+    assert summary["slowest_files"][0]["remote_path"] == "p/100.html"
+    assert len(summary["slowest_files"]) == 20
+
+
+def test_can_write_report_as_json(tmp_path: Path) -> None:
+    # given
+    report = DeploymentReport()
+    report.add_phase_time("put", 1.5)
+    report.record_transfer(Path("index.html"), 10, 0.1)
+    report.finish()
+
+    # when
+    report.write(tmp_path / "report.json", labels={"target": "blog"})
+
+    # then
+    written = json.loads((tmp_path / "report.json").read_text())
+    assert written["labels"] == {"target": "blog"}
+    assert written["phases_seconds"] == {"put": 1.5}
+    assert written["files"] == 1
+
+
+def test_can_write_report_as_prometheus_textfile(tmp_path: Path) -> None:
+    # given
+    report = DeploymentReport()
+    report.add_phase_time("collect", 0.2)
+    report.add_phase_time("put", 1.0)
+    report.finish()
+
+    # when
+    report.write(tmp_path / "deploy.prom", labels={"target": "blog"})
+
+    # then
+    lines = (tmp_path / "deploy.prom").read_text().splitlines()
+    assert 'deploy_phase_seconds{phase="put",target="blog"} 1.0' in lines
+    assert lines.count("# TYPE deploy_phase_seconds gauge") == 1
+    assert lines.count("# TYPE deploy_file_latency_seconds gauge") == 1
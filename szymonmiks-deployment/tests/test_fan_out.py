@@ -0,0 +1,102 @@
+import time
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from szymonmiks_deployment.deployment_manager import DeploymentManager
+from szymonmiks_deployment.fan_out import Destination, FanOutDeployer, FanOutError
+from szymonmiks_deployment.file_collector import BlogFileCollector
+from szymonmiks_deployment.hashing import FileHasher
+from szymonmiks_deployment.pipeline import DeploymentFile, IDeploymentStage
+from szymonmiks_deployment.retry import RetryPolicy
+from tests.fakes import LocalFTPClient
+
+
+class CountingStage(IDeploymentStage):
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def process(self, files: List[DeploymentFile]) -> List[DeploymentFile]:
+        self.calls += 1
+        return files
+
+
+class SlowFTPClient(LocalFTPClient):
+    def put(self, local_path: Path, remote_path: Path) -> None:
+        time.sleep(0.1)
+        super().put(local_path, remote_path)
+
+
+class BrokenFTPClient(LocalFTPClient):
+    def put(self, local_path: Path, remote_path: Path) -> None:
+        raise EOFError("Connection dropped")
+
+
+@pytest.fixture
+def site_dir(tmp_path: Path) -> Path:
+    site_dir = tmp_path / "public"
+    site_dir.mkdir()
+    for index in range(3):
+        (site_dir / f"page-{index}.html").write_text(f"<html>{index}</html>")
+
+    return site_dir
+
+
+def _mirror(tmp_path: Path, name: str) -> Path:
+    remote_dir = tmp_path / name
+    remote_dir.mkdir()
+    return remote_dir
+
+
+def test_site_is_prepared_once_and_uploaded_to_all_mirrors_concurrently(site_dir: Path, tmp_path: Path) -> None:
+    # given
+    stage = CountingStage()
+    hasher = FileHasher()
+    mirrors = [_mirror(tmp_path, f"mirror-{index}") for index in range(3)]
+    deployer = FanOutDeployer(
+        [
+            Destination(
+                "blog",
+                mirror.name,
+                DeploymentManager(SlowFTPClient(mirror), BlogFileCollector(site_dir), hasher, stages=[stage]),
+            )
+            for mirror in mirrors
+        ]
+    )
+
+    # when
+    start = time.perf_counter()
+    reports = deployer.deploy()
+    seconds = time.perf_counter() - start
+
+    # then
+    assert stage.calls == 1
+    assert sorted(reports) == ["blog@mirror-0", "blog@mirror-1", "blog@mirror-2"]
+    assert all((mirror / "page-2.html").read_text() == "<html>2</html>" for mirror in mirrors)
+    assert seconds < 2 * 3 * 0.1
+
+
+def test_failed_mirror_does_not_stop_the_others(site_dir: Path, tmp_path: Path) -> None:
+    # given
+    healthy, broken = _mirror(tmp_path, "healthy"), _mirror(tmp_path, "broken")
+    deployer = FanOutDeployer(
+        [
+            Destination("blog", "healthy", DeploymentManager(LocalFTPClient(healthy), BlogFileCollector(site_dir))),
+            Destination(
+                "blog",
+                "broken",
+                DeploymentManager(
+                    BrokenFTPClient(broken), BlogFileCollector(site_dir), retry_policy=RetryPolicy(attempts=1)
+                ),
+            ),
+        ]
+    )
+
+    # then
+    with pytest.raises(FanOutError, match="blog@broken") as error:
+        deployer.deploy()
+    assert (healthy / "page-0.html").is_file()
+    assert list(error.value.errors) == ["blog@broken"]
+    assert list(error.value.reports) == ["blog@healthy"]
+    assert error.value.reports["blog@healthy"].summary()["files"] == 3
@@ -1,13 +1,13 @@
 from pathlib import Path
 
-from szymonmiks_deployment.file_collector import WebsiteFileCollector
+from szymonmiks_deployment.file_collector import BlogFileCollector, WebsiteFileCollector
+from szymonmiks_deployment.ignore_rules import IgnoreRules
 
 
 def test_can_collect_files() -> None:
     # given
     base_dir = Path(__file__).parent
-    collector = WebsiteFileCollector(base_dir)
-    collector.EXCLUDED = []
+    collector = WebsiteFileCollector(base_dir, IgnoreRules([]))
 
     # when
     result = collector.collect()
@@ -20,11 +20,61 @@ def test_can_collect_files() -> None:
 def test_can_collect_files_if_excluded_defined() -> None:
     # given
     base_dir = Path(__file__).parent
-    collector = WebsiteFileCollector(base_dir)
-    collector.EXCLUDED = ["tests"]
+    collector = WebsiteFileCollector(base_dir, IgnoreRules(["*", "!fixtures/", "!upload.json"]))
 
     # when
     result = collector.collect()
 
     # then
-    assert result == []
+    assert result == [base_dir / "fixtures", base_dir / "fixtures" / "upload.json"]
+
+
+def test_does_not_descend_into_excluded_directories(tmp_path: Path) -> None:
+    # given
+    (tmp_path / ".git" / "objects").mkdir(parents=True)
+    (tmp_path / ".git" / "objects" / "pack").write_text("pack")
+    (tmp_path / "blog" / "public").mkdir(parents=True)
+    (tmp_path / "css").mkdir()
+    (tmp_path / "css" / "style.css").write_text("body {}")
+    (tmp_path / "index.html").write_text("<html></html>")
+    collector = WebsiteFileCollector(tmp_path)
+
+    # when
+    result = list(collector.iter_files())
+
+    # then
+    assert result == [tmp_path / "css", tmp_path / "css" / "style.css", tmp_path / "index.html"]
+
+
+def test_yields_directory_before_its_content(tmp_path: Path) -> None:
+    # given
+    base_dir = tmp_path / "public"
+    (base_dir / "p" / "post" / "img").mkdir(parents=True)
+    (base_dir / "p" / "post" / "img" / "cover.jpg").write_bytes(b"jpg")
+    collector = BlogFileCollector(base_dir)
+
+    # when
+    result = collector.iter_files()
+
+    # then
+    assert next(result) == base_dir / "p"
+    assert next(result) == base_dir / "p" / "post"
+    assert next(result) == base_dir / "p" / "post" / "img"
+    assert next(result) == base_dir / "p" / "post" / "img" / "cover.jpg"
+
+
+def test_reads_rules_from_deployignore(tmp_path: Path) -> None:
+    # given
+    base_dir = tmp_path / "public"
+    (base_dir / "drafts" / "post").mkdir(parents=True)
+    (base_dir / "drafts" / "post" / "index.html").write_text("<html></html>")
+    (base_dir / "index.html").write_text("<html></html>")
+    (base_dir / "index.xml").write_text("<rss></rss>")
+    (base_dir / ".deployignore").write_text("/drafts/\n*.xml\n")
+    collector = BlogFileCollector(base_dir)
+
+    # when
+    result = collector.collect()
+
+    # then
+    assert result == [base_dir / "index.html"]
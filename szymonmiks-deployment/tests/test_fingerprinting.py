@@ -0,0 +1,89 @@
+from pathlib import Path
+from typing import Dict
+
+import pytest
+
+from szymonmiks_deployment.fingerprinting import FingerprintingStage
+from szymonmiks_deployment.hashing import FileHasher
+from szymonmiks_deployment.pipeline import DeploymentFile
+
+
+@pytest.fixture
+def site_files(tmp_path: Path) -> Dict[str, Path]:
+    site_dir = tmp_path / "site"
+    (site_dir / "css").mkdir(parents=True)
+    (site_dir / "cv").mkdir()
+    files = {
+        "index.html": '<link href="css/style.css?ver=1.02" rel="stylesheet"><a href="https://x.pl/css/style.css">',
+        "cv/index.html": "<link href='../css/style.css'><img src=\"/img/photo.jpg\">",
+        "css/style.css": "body {}",
+        ".htaccess": "Options -Indexes\n",
+    }
+    for name, content in files.items():
+        (site_dir / name).write_text(content)
+
+    return {name: site_dir / name for name in files}
+
+
+def test_fingerprints_assets_and_rewrites_html_references(tmp_path: Path, site_files: Dict[str, Path]) -> None:
+    # given
+    files = [DeploymentFile(path, Path(name)) for name, path in site_files.items()]
+    stage = FingerprintingStage(tmp_path / "cache", FileHasher())
+
+    # when
+    result = stage.process(files)
+
+    # then
+    by_remote_path = {file.remote_path.as_posix(): file.local_path for file in result}
+    fingerprinted_name = next(
+        name for name in by_remote_path if name.startswith("css/style.") and name != "css/style.css"
+    )
+    assert by_remote_path["index.html"].read_text() == (
+        f'<link href="{fingerprinted_name}?ver=1.02" rel="stylesheet"><a href="https://x.pl/css/style.css">'
+    )
+    assert (
+        by_remote_path["cv/index.html"].read_text()
+        == f"<link href='../{fingerprinted_name}'><img src=\"/img/photo.jpg\">"
+    )
+    assert by_remote_path[".htaccess"].read_text().startswith("Options -Indexes\n")
+    assert "immutable" in by_remote_path[".htaccess"].read_text()
+    assert "css/style.css" in by_remote_path
+
+
+def test_cache_rules_are_not_deployed_without_site_htaccess(tmp_path: Path, site_files: Dict[str, Path]) -> None:
+    # given
+    files = [DeploymentFile(path, Path(name)) for name, path in site_files.items() if name != ".htaccess"]
+    stage = FingerprintingStage(tmp_path / "cache", FileHasher())
+
+    # when
+    result = stage.process(files)
+
+    # then
+    assert Path(".htaccess") not in [file.remote_path for file in result]
+
+
+def test_absolute_urls_of_the_site_are_rewritten(tmp_path: Path) -> None:
+    # given
+    (tmp_path / "site" / "css").mkdir(parents=True)
+    html = tmp_path / "site" / "index.html"
+    html.write_text(
+        '<link href="https://blog.example.com/css/style.css"><link href="//BLOG.example.com/css/style.css">'
+        '<link href="https://x.pl/css/style.css">'
+    )
+    css = tmp_path / "site" / "css" / "style.css"
+    css.write_text("body {}")
+    files = [DeploymentFile(html, Path("index.html")), DeploymentFile(css, Path("css/style.css"))]
+    stage = FingerprintingStage(tmp_path / "cache", FileHasher(), site_url="https://blog.example.com/")
+
+    # when
+    result = stage.process(files)
+
+    # then
+    by_remote_path = {file.remote_path.as_posix(): file.local_path for file in result}
+    fingerprinted_name = next(
+        name for name in by_remote_path if name.startswith("css/style.") and name != "css/style.css"
+    )
+    assert by_remote_path["index.html"].read_text() == (
+        f'<link href="https://blog.example.com/{fingerprinted_name}"><link href="//BLOG.example.com/{fingerprinted_name}">'
+        '<link href="https://x.pl/css/style.css">'
+    )
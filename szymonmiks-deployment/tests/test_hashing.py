@@ -0,0 +1,47 @@
+from pathlib import Path
+
+from szymonmiks_deployment.hashing import FileHasher, HashCache, hash_file
+
+
+def test_can_hash_file(tmp_path: Path) -> None:
+    # given
+    file = tmp_path / "index.html"
+    file.write_text("<html></html>")
+
+    # when
+    result = FileHasher().hash(file)
+
+    # then
+    assert result == hash_file(file)
+
+
+def test_should_reuse_cached_hash_if_file_did_not_change(tmp_path: Path) -> None:
+    # given
+    file = tmp_path / "index.html"
+    file.write_text("<html></html>")
+    cache_path = tmp_path / "cache" / "hashes.json"
+    hasher = FileHasher(HashCache(cache_path))
+    first_hash = hasher.hash(file)
+    hasher.save()
+
+    # when
+    result = FileHasher(HashCache(cache_path)).hash(file)
+
+    # then
+    assert cache_path.is_file()
+    assert result == first_hash
+
+
+def test_should_rehash_file_if_it_changed(tmp_path: Path) -> None:
+    # given
+    file = tmp_path / "index.html"
+    file.write_text("<html></html>")
+    hasher = FileHasher()
+    first_hash = hasher.hash(file)
+
+    # when
+    file.write_text("<html><body></body></html>")
+    result = hasher.hash(file)
+
+    # then
+    assert result != first_hash
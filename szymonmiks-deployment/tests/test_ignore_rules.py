@@ -0,0 +1,57 @@
+from pathlib import Path
+
+import pytest
+
+from szymonmiks_deployment.ignore_rules import IgnoreRules
+
+
+@pytest.mark.parametrize(
+    "rule, path, is_dir, expected",
+    [
+        ("README.md", "README.md", False, True),
+        ("README.md", "docs/README.md", False, True),
+        ("/README.md", "docs/README.md", False, False),
+        ("docs/*.md", "docs/index.md", False, True),
+        ("docs/*.md", "docs/api/index.md", False, False),
+        ("docs/**/*.md", "docs/api/v1/index.md", False, True),
+        ("**/drafts", "p/2022/drafts", True, True),
+        ("build/", "build", True, True),
+        ("build/", "build", False, False),
+        ("img/cover-?.jpg", "img/cover-1.jpg", False, True),
+        ("*.[ch]", "main.c", False, True),
+        ("*.[!ch]", "main.c", False, False),
+        (".*", ".git", True, True),
+        ("\\#notes", "#notes", False, True),
+    ],
+)
+def test_matches_like_gitignore(rule: str, path: str, is_dir: bool, expected: bool) -> None:
+    # given
+    rules = IgnoreRules([rule])
+
+    # when
+    result = rules.is_ignored(path, is_dir)
+
+    # then
+    assert result is expected
+
+
+def test_last_matching_rule_wins() -> None:
+    # given
+    rules = IgnoreRules(["# drafts are not public", "*.html", "!index.html", "/index.html"])
+
+    # when
+    result = [rules.is_ignored(path, False) for path in ("about.html", "p/index.html", "index.html")]
+
+    # then
+    assert result == [True, False, True]
+
+
+def test_rules_file_itself_is_ignored(tmp_path: Path) -> None:
+    # given
+    rules = IgnoreRules.load(tmp_path)
+
+    # when
+    result = rules.is_ignored(".deployignore", False)
+
+    # then
+    assert result
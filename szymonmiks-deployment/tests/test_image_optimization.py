@@ -0,0 +1,88 @@
+from pathlib import Path
+
+import pytest
+
+from szymonmiks_deployment.hashing import FileHasher
+from szymonmiks_deployment.image_optimization import ImageOptimizationStage
+from szymonmiks_deployment.pipeline import DeploymentFile
+
+Image = pytest.importorskip("PIL.Image")
+features = pytest.importorskip("PIL.features")
+
+
+@pytest.fixture
+def photo(tmp_path: Path) -> Path:
+    photo = tmp_path / "cover.jpg"
+    exif = Image.Exif()
+    exif[0x010E] = "a very long image description " * 50
+    Image.new("RGB", (2000, 1000), color=(200, 30, 30)).save(photo, "JPEG", quality=100, exif=exif)
+
+    return photo
+
+
+def test_optimizes_image_and_adds_responsive_variants(tmp_path: Path, photo: Path) -> None:
+    # given
+    files = [DeploymentFile(photo, Path("p/my-post/img/cover.jpg"))]
+    stage = ImageOptimizationStage(tmp_path / "cache", FileHasher(), widths=[640], workers=1)
+
+    # when
+    result = stage.process(files)
+
+    # then
+    by_remote_path = {file.remote_path.as_posix(): file.local_path for file in result}
+    assert by_remote_path["p/my-post/img/cover.jpg"].stat().st_size < photo.stat().st_size
+    with Image.open(by_remote_path["p/my-post/img/cover.jpg"]) as optimized:
+        assert not optimized.getexif()
+    with Image.open(by_remote_path["p/my-post/img/cover-640w.jpg"]) as variant:
+        assert variant.size == (640, 320)
+
+
+def test_skips_images_already_in_cache(tmp_path: Path, photo: Path) -> None:
+    # given
+    files = [DeploymentFile(photo, Path("p/my-post/img/cover.jpg"))]
+    stage = ImageOptimizationStage(tmp_path / "cache", FileHasher(), widths=[640], workers=1)
+    first_result = stage.process(files)
+
+    # when
+    result = stage.process(files)
+
+    # then
+    assert result == first_result
+
+
+def test_unreadable_images_are_deployed_unchanged(tmp_path: Path, photo: Path) -> None:
+    # given
+    not_an_image = tmp_path / "bad.jpg"
+    not_an_image.write_bytes(b"plain bytes")
+    truncated = tmp_path / "truncated.jpg"
+    truncated.write_bytes(photo.read_bytes()[:2000])
+    files = [
+        DeploymentFile(not_an_image, Path("img/bad.jpg")),
+        DeploymentFile(truncated, Path("img/truncated.jpg")),
+        DeploymentFile(photo, Path("img/cover.jpg")),
+    ]
+    stage = ImageOptimizationStage(tmp_path / "cache", FileHasher(), widths=[640], workers=1)
+
+    # when
+    result = stage.process(files)
+
+    # then
+    assert result[:2] == files[:2]
+    assert Path("img/cover-640w.jpg") in {file.remote_path for file in result}
+
+
+def test_webp_variants_of_images_differing_only_in_suffix_keep_the_suffix(tmp_path: Path, photo: Path) -> None:
+    # given
+    png = tmp_path / "cover.png"
+    Image.new("RGB", (2000, 1000), color=(30, 30, 200)).save(png, "PNG")
+    files = [DeploymentFile(photo, Path("img/cover.jpg")), DeploymentFile(png, Path("img/cover.png"))]
+    stage = ImageOptimizationStage(tmp_path / "cache", FileHasher(), widths=[640], workers=1)
+
+    # when
+    result = stage.process(files)
+
+    # then
+    remote_paths = [file.remote_path.as_posix() for file in result]
+    assert len(remote_paths) == len(set(remote_paths))
+    if features.check("webp"):
+        assert {"img/cover.jpg.webp", "img/cover-640w.jpg.webp", "img/cover.png.webp"} <= set(remote_paths)
@@ -0,0 +1,40 @@
+from pathlib import Path
+
+from szymonmiks_deployment.hashing import FileHasher
+from szymonmiks_deployment.journal import DeploymentJournal
+
+
+def test_journal_of_interrupted_deployment_can_be_resumed(tmp_path: Path) -> None:
+    # given
+    page = tmp_path / "index.html"
+    page.write_text("<html></html>")
+    journal = DeploymentJournal(tmp_path / "journal.jsonl", FileHasher())
+    journal.start()
+    journal.record(page, Path("index.html"))
+    journal.close()
+    with open(tmp_path / "journal.jsonl", "a") as file:
+        file.write('{"path": "ab')
+
+    # when
+    completed = journal.start(resume=True)
+
+    # then
+    assert list(completed) == ["index.html"]
+    assert journal.is_completed(completed, page, Path("index.html"))
+
+
+def test_file_changed_since_it_was_journaled_is_not_completed(tmp_path: Path) -> None:
+    # given
+    page = tmp_path / "index.html"
+    page.write_text("<html></html>")
+    journal = DeploymentJournal(tmp_path / "journal.jsonl", FileHasher())
+    journal.start()
+    journal.record(page, Path("index.html"))
+    journal.close()
+
+    # when
+    page.write_text("<html>changed</html>")
+    completed = journal.start(resume=True)
+
+    # then
+    assert not journal.is_completed(completed, page, Path("index.html"))
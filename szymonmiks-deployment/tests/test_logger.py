@@ -0,0 +1,112 @@
+import json
+import logging
+import time
+from logging.handlers import QueueHandler
+from typing import List
+
+import pytest
+
+from szymonmiks_deployment.logger import ROOT_LOGGER_NAME, JsonFormatter, LoggerFactory, RateLimitFilter
+
+
+def _record(message: str, level: int = logging.INFO, lineno: int = 1) -> logging.LogRecord:
+    return logging.LogRecord("szymonmiks_deployment.test", level, "uploader.py", lineno, message, None, None)
+
+
+def test_json_formatter_writes_one_compact_object_per_record() -> None:
+    # given
+    record = _record("Uploading index.html")
+
+    # when
+    line = JsonFormatter().format(record)
+
+    # then
+    entry = json.loads(line)
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "szymonmiks_deployment.test"
+    assert entry["message"] == "Uploading index.html"
+    assert "\n" not in line
+
+
+def test_rate_limit_filter_drops_excess_records_from_the_same_call_site() -> None:
+    # given
+    rate_limit_filter = RateLimitFilter(limit=2, interval=60)
+
+    # when
+    passed = [rate_limit_filter.filter(_record(f"Uploading file {i}")) for i in range(5)]
+    other_call_site = rate_limit_filter.filter(_record("Creating directories", lineno=2))
+    warning = rate_limit_filter.filter(_record("Retrying", level=logging.WARNING))
+
+    # then
+    assert passed == [True, True, False, False, False]
+    assert other_call_site
+    assert warning
+
+
+def test_rate_limit_filter_reports_suppressed_records_in_the_next_window(monkeypatch: pytest.MonkeyPatch) -> None:
+    # given
+    now = [100.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    rate_limit_filter = RateLimitFilter(limit=1, interval=1)
+    for i in range(3):
+        rate_limit_filter.filter(_record(f"Uploading file {i}"))
+    now[0] += 1
+    record = _record("Uploading file 3")
+
+    # when
+    passed = rate_limit_filter.filter(record)
+
+    # then
+    assert passed
+    assert record.getMessage() == "Uploading file 3 (2 similar message(s) suppressed)"
+
+
+class _ListHandler(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__()
+        self.messages: List[str] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.messages.append(record.getMessage())
+
+
+@pytest.fixture
+def listener_handler() -> _ListHandler:
+    handler = _ListHandler()
+    LoggerFactory.configure()
+    assert LoggerFactory._listener is not None
+    LoggerFactory._listener.handlers = (handler,)
+
+    return handler
+
+
+def test_loggers_share_a_single_queued_handler(listener_handler: _ListHandler) -> None:
+    # given
+    first = LoggerFactory.create("szymonmiks_deployment.first")
+    second = LoggerFactory.create("szymonmiks_deployment.second")
+    LoggerFactory.create("szymonmiks_deployment.first")
+
+    # when
+    first.info("from first")
+    second.info("from second")
+    LoggerFactory.shutdown()
+
+    # then
+    assert listener_handler.messages == ["from first", "from second"]
+    assert [type(handler) for handler in logging.getLogger(ROOT_LOGGER_NAME).handlers].count(QueueHandler) == 1
+    assert not first.handlers and not second.handlers
+
+
+def test_loggers_outside_of_the_package_are_written_too(listener_handler: _ListHandler) -> None:
+    # given
+    logger = LoggerFactory.create("deploy_hooks")
+    child = LoggerFactory.create("deploy_hooks.cache")
+
+    # when
+    logger.info("from outside")
+    child.info("from a child")
+    LoggerFactory.shutdown()
+
+    # then
+    assert listener_handler.messages == ["from outside", "from a child"]
+    assert not child.handlers
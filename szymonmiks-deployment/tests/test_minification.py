@@ -0,0 +1,53 @@
+from pathlib import Path
+
+import pytest
+
+from szymonmiks_deployment.hashing import FileHasher
+from szymonmiks_deployment.minification import MinificationStage
+from szymonmiks_deployment.pipeline import DeploymentFile
+
+pytest.importorskip("minify_html")
+pytest.importorskip("rcssmin")
+
+
+def test_minifies_html_and_css_files(tmp_path: Path) -> None:
+    # given
+    html = tmp_path / "index.html"
+    html.write_text("<html>\n  <body>\n    <!-- comment -->\n    <p>  hello  </p>\n  </body>\n</html>\n")
+    css = tmp_path / "style.css"
+    css.write_text("body {\n  color : red ;\n}\n/* comment */\n")
+    vendor_css = tmp_path / "bootstrap.min.css"
+    vendor_css.write_text("a { color : red }")
+    files = [
+        DeploymentFile(html, Path("index.html")),
+        DeploymentFile(css, Path("css/style.css")),
+        DeploymentFile(vendor_css, Path("css/bootstrap.min.css")),
+    ]
+    stage = MinificationStage(tmp_path / "cache", FileHasher(), workers=1)
+
+    # when
+    result = stage.process(files)
+
+    # then
+    by_remote_path = {file.remote_path.as_posix(): file.local_path for file in result}
+    assert "comment" not in by_remote_path["index.html"].read_text()
+    assert by_remote_path["css/style.css"].read_text() == "body{color:red}"
+    assert by_remote_path["css/bootstrap.min.css"] == vendor_css
+
+
+def test_file_that_is_not_utf8_is_deployed_unminified(tmp_path: Path) -> None:
+    # given
+    latin2 = tmp_path / "index.html"
+    latin2.write_bytes("<p>  zażółć  </p>".encode("iso-8859-2"))
+    css = tmp_path / "style.css"
+    css.write_text("body {\n  color : red ;\n}\n")
+    files = [DeploymentFile(latin2, Path("index.html")), DeploymentFile(css, Path("css/style.css"))]
+    stage = MinificationStage(tmp_path / "cache", FileHasher(), workers=1)
+
+    # when
+    result = stage.process(files)
+
+    # then
+    by_remote_path = {file.remote_path.as_posix(): file.local_path for file in result}
+    assert by_remote_path["index.html"] == latin2
+    assert by_remote_path["css/style.css"].read_text() == "body{color:red}"
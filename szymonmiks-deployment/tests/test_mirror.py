@@ -0,0 +1,75 @@
+from pathlib import Path
+
+import pytest
+
+from szymonmiks_deployment.deployment_manager import DeploymentManager
+from szymonmiks_deployment.file_collector import BlogFileCollector, WebsiteFileCollector
+from szymonmiks_deployment.ignore_rules import IgnoreRules
+from tests.fakes import LocalFTPClient
+
+
+@pytest.fixture
+def site_dir(tmp_path: Path) -> Path:
+    site_dir = tmp_path / "public"
+    (site_dir / "p" / "first").mkdir(parents=True)
+    (site_dir / "p" / "first" / "index.html").write_text("<html>first</html>")
+    (site_dir / "index.html").write_text("<html></html>")
+
+    return site_dir
+
+
+@pytest.fixture
+def remote_dir(tmp_path: Path) -> Path:
+    remote_dir = tmp_path / "remote"
+    remote_dir.mkdir()
+
+    return remote_dir
+
+
+def test_mirror_removes_files_that_are_not_deployed_anymore(site_dir: Path, remote_dir: Path) -> None:
+    # given
+    (remote_dir / "p" / "deleted" / "img").mkdir(parents=True)
+    (remote_dir / "p" / "deleted" / "index.html").write_text("<html>deleted</html>")
+    (remote_dir / "p" / "deleted" / "img" / "cover.jpg").write_bytes(b"jpg")
+    (remote_dir / "old-style.css").write_text("body {}")
+    (remote_dir / ".deploy-manifest.json").write_text("{}")
+    client = LocalFTPClient(remote_dir)
+    deployment_manager = DeploymentManager(client, BlogFileCollector(site_dir), workers=2)
+
+    # when
+    deployment_manager.deploy(mirror=True)
+
+    # then
+    remote_files = sorted(path.relative_to(remote_dir).as_posix() for path in remote_dir.rglob("*"))
+    assert remote_files == [".deploy-manifest.json", "index.html", "p", "p/first", "p/first/index.html"]
+
+
+def test_mirror_keeps_remote_paths_ignored_by_the_collector(site_dir: Path, remote_dir: Path) -> None:
+    # given
+    (remote_dir / "blog" / "p").mkdir(parents=True)
+    (remote_dir / "blog" / "p" / "index.html").write_text("<html>blog</html>")
+    client = LocalFTPClient(remote_dir)
+    deployment_manager = DeploymentManager(client, WebsiteFileCollector(site_dir, IgnoreRules(["/blog/"])))
+
+    # when
+    deployment_manager.deploy(mirror=True)
+
+    # then
+    assert (remote_dir / "blog" / "p" / "index.html").exists()
+    assert client.removed == []
+
+
+def test_mirrored_incremental_deploy_skips_files_matching_by_size_and_mtime(site_dir: Path, remote_dir: Path) -> None:
+    # given
+    client = LocalFTPClient(remote_dir)
+    DeploymentManager(client, BlogFileCollector(site_dir)).deploy(mirror=True)
+    (remote_dir / ".deploy-manifest.json").unlink(missing_ok=True)
+    (site_dir / "index.html").write_text("<html>changed</html>")
+    client.uploaded.clear()
+
+    # when
+    DeploymentManager(client, BlogFileCollector(site_dir)).deploy(incremental=True, mirror=True)
+
+    # then
+    assert Path("index.html") in client.uploaded
+    assert Path("p/first/index.html") not in client.uploaded
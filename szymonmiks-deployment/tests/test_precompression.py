@@ -0,0 +1,41 @@
+import gzip
+from pathlib import Path
+
+from szymonmiks_deployment.hashing import FileHasher
+from szymonmiks_deployment.pipeline import DeploymentFile
+from szymonmiks_deployment.precompression import PrecompressionStage
+
+
+def test_adds_gzip_variant_of_text_assets(tmp_path: Path) -> None:
+    # given
+    html = tmp_path / "index.html"
+    html.write_text("<html>" + "<p>hello</p>" * 100 + "</html>")
+    image = tmp_path / "photo.jpg"
+    image.write_bytes(b"\xff\xd8" * 100)
+    files = [DeploymentFile(html, Path("index.html")), DeploymentFile(image, Path("photo.jpg"))]
+    stage = PrecompressionStage(tmp_path / "cache", FileHasher(), workers=1)
+
+    # when
+    result = stage.process(files)
+
+    # then
+    variant = next(file for file in result if file.remote_path == Path("index.html.gz"))
+    assert gzip.decompress(variant.local_path.read_bytes()) == html.read_bytes()
+    assert not any(file.remote_path == Path("photo.jpg.gz") for file in result)
+
+
+def test_reuses_compressed_files_from_cache(tmp_path: Path) -> None:
+    # given
+    html = tmp_path / "index.html"
+    html.write_text("<html>" + "<p>hello</p>" * 100 + "</html>")
+    files = [DeploymentFile(html, Path("index.html"))]
+    stage = PrecompressionStage(tmp_path / "cache", FileHasher(), workers=1)
+    first_result = stage.process(files)
+    cached = next(file.local_path for file in first_result if file.remote_path == Path("index.html.gz"))
+    modification_time = cached.stat().st_mtime_ns
+
+    # when
+    stage.process(files)
+
+    # then
+    assert cached.stat().st_mtime_ns == modification_time
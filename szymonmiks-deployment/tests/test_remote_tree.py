@@ -0,0 +1,31 @@
+from pathlib import Path
+
+from szymonmiks_deployment.remote_tree import RemoteTree
+from tests.fakes import LocalFTPClient
+
+
+def test_missing_directories_are_returned_parents_first() -> None:
+    # given
+    tree = RemoteTree(LocalFTPClient(Path(".")), existing=["post"])
+
+    # when
+    missing = tree.missing([Path("post/first/img"), Path("about"), Path("post/second")])
+
+    # then
+    assert missing == [Path("about"), Path("post/first"), Path("post/second"), Path("post/first/img")]
+
+
+def test_ensure_creates_only_missing_directories_in_single_batch(tmp_path: Path) -> None:
+    # given
+    (tmp_path / "post").mkdir()
+    client = LocalFTPClient(tmp_path)
+    tree = RemoteTree.from_listing(client)
+
+    # when
+    tree.ensure([Path("post/first/img"), Path("post")])
+    tree.ensure([Path("post/first")])
+
+    # then
+    assert client.directory_batches == [[Path("post/first"), Path("post/first/img")]]
+    assert (tmp_path / "post" / "first" / "img").is_dir()
+    assert Path("post/first/img") in tree
@@ -0,0 +1,55 @@
+from typing import List
+
+import pytest
+
+from szymonmiks_deployment.retry import RetryPolicy
+
+
+class Flaky:
+    def __init__(self, failures: int, error: Exception) -> None:
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+
+    def __call__(self) -> str:
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error
+        return "done"
+
+
+def test_retries_transient_errors_with_growing_delays() -> None:
+    # given
+    delays: List[float] = []
+    retry_policy = RetryPolicy(attempts=4, base_delay=1.0, max_delay=3.0, sleep=delays.append)
+    operation = Flaky(3, EOFError("Connection dropped"))
+
+    # when
+    result, retries = retry_policy.call(operation)
+
+    # then
+    assert (result, retries) == ("done", 3)
+    assert len(delays) == 3
+    assert 0 <= delays[0] <= 1.0 and 0 <= delays[1] <= 2.0 and 0 <= delays[2] <= 3.0
+
+
+def test_raises_last_error_when_attempts_are_exhausted() -> None:
+    # given
+    retry_policy = RetryPolicy(attempts=2, sleep=lambda _: None)
+    operation = Flaky(5, OSError("Socket is closed"))
+
+    # then
+    with pytest.raises(OSError, match="Socket is closed"):
+        retry_policy.call(operation)
+    assert operation.calls == 2
+
+
+def test_does_not_retry_permanent_errors() -> None:
+    # given
+    retry_policy = RetryPolicy(attempts=4, sleep=lambda _: None)
+    operation = Flaky(1, PermissionError("Permission denied"))
+
+    # then
+    with pytest.raises(PermissionError):
+        retry_policy.call(operation)
+    assert operation.calls == 1
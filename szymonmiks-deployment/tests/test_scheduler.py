@@ -0,0 +1,72 @@
+from pathlib import Path
+from typing import Iterator, List
+
+from szymonmiks_deployment.deployment_manager import DeploymentManager
+from szymonmiks_deployment.file_collector import BlogFileCollector
+from szymonmiks_deployment.manifest import RemoteManifestStore
+from szymonmiks_deployment.pipeline import DeploymentFile
+from szymonmiks_deployment.scheduler import UploadScheduler
+from tests.fakes import LocalFTPClient
+
+
+def _file(base_dir: Path, name: str, size: int) -> DeploymentFile:
+    path = base_dir / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    return DeploymentFile(path, Path(name))
+
+
+def test_scheduler_orders_directories_first_and_then_largest_files(tmp_path: Path) -> None:
+    # given
+    small = _file(tmp_path, "a/b/small.html", 10)
+    large = _file(tmp_path, "a/large.png", 10_000)
+    medium = _file(tmp_path, "medium.css", 1_000)
+    nested = DeploymentFile(tmp_path / "a" / "b", Path("a/b"))
+    parent = DeploymentFile(tmp_path / "a", Path("a"))
+
+    # when
+    ordered = list(UploadScheduler().order([small, nested, large, medium, parent]))
+
+    # then
+    assert ordered == [parent, nested, large, medium, small]
+
+
+def test_scheduler_orders_within_lookahead_window_without_waiting_for_all_files(tmp_path: Path) -> None:
+    # given
+    files = [_file(tmp_path, name, size) for name, size in (("a.css", 10), ("b.png", 1_000), ("c.js", 100))]
+    consumed: List[DeploymentFile] = []
+
+    def collect() -> Iterator[DeploymentFile]:
+        for file in files:
+            consumed.append(file)
+            yield file
+
+    # when
+    ordered = UploadScheduler(lookahead=2).order(collect())
+    first = next(ordered)
+
+    # then
+    assert first == files[1]
+    assert consumed == files[:2]
+    assert list(ordered) == [files[0], files[2]]
+
+
+def test_deployment_uploads_largest_files_first(tmp_path: Path) -> None:
+    # given
+    site_dir = tmp_path / "public"
+    remote_dir = tmp_path / "remote"
+    remote_dir.mkdir()
+    for name, size in (("index.html", 10), ("images/cover.png", 50_000), ("style.css", 500)):
+        _file(site_dir, name, size)
+    client = LocalFTPClient(remote_dir)
+
+    # when
+    DeploymentManager(client, BlogFileCollector(site_dir)).deploy()
+
+    # then
+    assert client.uploaded == [
+        Path("images/cover.png"),
+        Path("style.css"),
+        Path("index.html"),
+        Path(RemoteManifestStore.FILE_NAME),
+    ]
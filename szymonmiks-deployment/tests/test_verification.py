@@ -0,0 +1,95 @@
+from pathlib import Path
+
+import pytest
+
+from szymonmiks_deployment.deployment_manager import DeploymentManager
+from szymonmiks_deployment.file_collector import BlogFileCollector, WebsiteFileCollector
+from szymonmiks_deployment.hashing import FileHasher
+from szymonmiks_deployment.ignore_rules import IgnoreRules
+from szymonmiks_deployment.verification import RemoteVerifier, VerificationError
+from tests.fakes import LocalFTPClient
+
+
+@pytest.fixture
+def site_dir(tmp_path: Path) -> Path:
+    site_dir = tmp_path / "public"
+    (site_dir / "css").mkdir(parents=True)
+    (site_dir / "css" / "style.css").write_text("body {}")
+    (site_dir / "index.html").write_text("<html></html>")
+    (site_dir / "about.html").write_text("<html>about</html>")
+
+    return site_dir
+
+
+@pytest.fixture
+def remote_dir(tmp_path: Path) -> Path:
+    remote_dir = tmp_path / "remote"
+    remote_dir.mkdir()
+
+    return remote_dir
+
+
+def test_reports_missing_extra_and_different_files(site_dir: Path, remote_dir: Path) -> None:
+    # given
+    client = LocalFTPClient(remote_dir, shell_access=True)
+    deployment_manager = DeploymentManager(
+        client, BlogFileCollector(site_dir), FileHasher(), verifier=RemoteVerifier(client, str(remote_dir))
+    )
+    deployment_manager.deploy(incremental=True)
+    (remote_dir / "about.html").unlink()
+    (remote_dir / "css" / "style.css").write_text("body { color: red }")
+    (remote_dir / "old.html").write_text("<html>old</html>")
+
+    # when
+    result = deployment_manager.verify()
+
+    # then
+    assert result.missing == ["about.html"]
+    assert result.different == ["css/style.css"]
+    assert result.extra == ["old.html"]
+    assert not result.ok
+
+
+def test_remote_matches_after_deployment(site_dir: Path, remote_dir: Path) -> None:
+    # given
+    client = LocalFTPClient(remote_dir, shell_access=True)
+    deployment_manager = DeploymentManager(
+        client, BlogFileCollector(site_dir), FileHasher(), verifier=RemoteVerifier(client, str(remote_dir))
+    )
+    deployment_manager.deploy(incremental=True)
+
+    # when
+    result = deployment_manager.verify()
+
+    # then
+    assert result.ok
+    assert result.extra == []
+
+
+def test_paths_ignored_by_the_collector_are_not_verified(site_dir: Path, remote_dir: Path) -> None:
+    # given
+    client = LocalFTPClient(remote_dir, shell_access=True)
+    file_collector = WebsiteFileCollector(site_dir, IgnoreRules(["blog", "README.md"]))
+    deployment_manager = DeploymentManager(
+        client, file_collector, FileHasher(), verifier=RemoteVerifier(client, str(remote_dir))
+    )
+    deployment_manager.deploy(incremental=True)
+    (remote_dir / "blog" / "p" / "first").mkdir(parents=True)
+    (remote_dir / "blog" / "p" / "first" / "index.html").write_text("<html>first</html>")
+    (remote_dir / "README.md").write_text("# Website")
+
+    # when
+    result = deployment_manager.verify()
+
+    # then
+    assert result.ok
+    assert result.extra == []
+
+
+def test_verification_needs_shell_access(site_dir: Path, remote_dir: Path) -> None:
+    # given
+    verifier = RemoteVerifier(LocalFTPClient(remote_dir), str(remote_dir))
+
+    # then
+    with pytest.raises(VerificationError):
+        verifier.verify({}, BlogFileCollector(site_dir))
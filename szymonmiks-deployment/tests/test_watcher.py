@@ -0,0 +1,26 @@
+import os
+from pathlib import Path
+
+from szymonmiks_deployment.file_collector import BlogFileCollector
+from szymonmiks_deployment.watcher import FileWatcher
+
+
+def test_poll_returns_new_and_modified_files(tmp_path: Path) -> None:
+    # given
+    site_dir = tmp_path / "public"
+    site_dir.mkdir()
+    (site_dir / "index.html").write_text("<html></html>")
+    (site_dir / "about.html").write_text("<html>about</html>")
+    watcher = FileWatcher(BlogFileCollector(site_dir))
+    watcher.poll()
+
+    # when
+    (site_dir / "index.html").write_text("<html>new post</html>")
+    os.utime(site_dir / "index.html", ns=(0, 0))
+    (site_dir / "post").mkdir()
+    (site_dir / "post" / "index.html").write_text("<html>post</html>")
+    changed = watcher.poll()
+
+    # then
+    assert sorted(changed) == [site_dir / "index.html", site_dir / "post", site_dir / "post" / "index.html"]
+    assert watcher.poll() == []